@@ -0,0 +1,45 @@
+"""
+Almacén de imágenes biométricas direccionado por contenido.
+
+Cada imagen se guarda una sola vez en disco bajo su SHA-256:
+    biometria/ab/abcdef....jpg
+En la tabla ohem solo queda la referencia (BiometricHash). El hash sirve también
+como ETag al servir la imagen.
+"""
+import hashlib
+import os
+import uuid
+
+BIOMETRIA_DIR = os.getenv("BIOMETRIA_DIR", "biometria")
+
+
+def calcular_hash(contenido):
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def ruta(hash_imagen, base_dir=BIOMETRIA_DIR):
+    return os.path.join(base_dir, hash_imagen[:2], f"{hash_imagen}.jpg")
+
+
+def existe(hash_imagen, base_dir=BIOMETRIA_DIR):
+    return os.path.exists(ruta(hash_imagen, base_dir))
+
+
+def guardar(contenido, base_dir=BIOMETRIA_DIR):
+    """Guarda la imagen (si no existía ya) y devuelve su hash."""
+    hash_imagen = calcular_hash(contenido)
+    destino = ruta(hash_imagen, base_dir)
+    if os.path.exists(destino):
+        return hash_imagen
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(contenido)
+    os.replace(tmp, destino)  # ✅ Nunca queda un archivo a medio escribir con el nombre final
+    return hash_imagen
+
+
+def leer(hash_imagen, base_dir=BIOMETRIA_DIR):
+    with open(ruta(hash_imagen, base_dir), "rb") as f:
+        return f.read()
@@ -0,0 +1,153 @@
+"""
+Caché en memoria para catálogos pequeños (departamentos, puestos).
+
+Lectura a través: si la entrada no existe o venció su TTL se consulta la BD y se
+guarda ya serializada a JSON, junto con su ETag (hash del contenido) y su
+Last-Modified. Crear, editar, eliminar o restaurar invalida la caché completa del
+catálogo. Con varios procesos uvicorn cada uno tiene su propia caché; el TTL acota
+cuánto puede tardar en verse un cambio hecho en otro proceso.
+
+Las claves incluyen parámetros del cliente (cursor, límite, código), así que cada
+caché guarda a lo más CATALOGO_CACHE_MAX_ENTRADAS: al insertar se quitan las
+vencidas y, si aún sobran, las usadas hace más tiempo.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+CATALOGO_CACHE_TTL = float(os.getenv("CATALOGO_CACHE_TTL", "300"))  # segundos
+CATALOGO_CACHE_MAX_ENTRADAS = int(os.getenv("CATALOGO_CACHE_MAX_ENTRADAS", "256"))
+
+_caches = []
+
+
+class Entrada:
+    def __init__(self, valor, modificado, expira):
+        self.valor = valor
+        self.cuerpo = json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha1(self.cuerpo).hexdigest()}"'
+        self.modificado = modificado
+        self.expira = expira
+
+
+class CatalogCache:
+    def __init__(self, nombre, ttl=CATALOGO_CACHE_TTL, max_entradas=CATALOGO_CACHE_MAX_ENTRADAS):
+        self.nombre = nombre
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # Orden de uso: la primera es la usada hace más tiempo
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.desalojadas = 0
+        _caches.append(self)
+
+    async def obtener(self, clave, cargar):
+        """
+        Devuelve la Entrada de `clave`; si no está vigente llama a `cargar()` (async),
+        que debe devolver datos serializables a JSON (None = no existe).
+        """
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada.expira > time.monotonic():
+            self.aciertos += 1
+            self._entradas.move_to_end(clave)
+            return entrada
+
+        self.fallos += 1
+        generacion = self._generacion
+        valor = await cargar()
+
+        # Si el contenido no cambió se conserva la fecha, así If-Modified-Since sigue valiendo;
+        # si cambió, la fecha siempre avanza (Last-Modified solo tiene resolución de segundos)
+        ahora = datetime.now(timezone.utc).replace(microsecond=0)
+        nueva = Entrada(valor, ahora, time.monotonic() + self.ttl)
+        if entrada is not None:
+            if entrada.etag == nueva.etag:
+                nueva.modificado = entrada.modificado
+            else:
+                nueva.modificado = max(ahora, entrada.modificado + timedelta(seconds=1))
+
+        # ⚠️ Si hubo una invalidación mientras se consultaba, el resultado puede ser viejo
+        if generacion == self._generacion:
+            self._guardar(clave, nueva)
+        return nueva
+
+    def _guardar(self, clave, entrada):
+        ahora = time.monotonic()
+        for vencida in [c for c, e in self._entradas.items() if e.expira <= ahora and c != clave]:
+            del self._entradas[vencida]
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.desalojadas += 1
+
+    def invalidar(self):
+        """Vence todas las entradas; se conservan solo para comparar su ETag al recargar."""
+        self._generacion += 1
+        for entrada in self._entradas.values():
+            entrada.expira = 0.0
+        self.invalidaciones += 1
+
+    def estado(self):
+        total = self.aciertos + self.fallos
+        return {
+            "cache": self.nombre,
+            "ttl": self.ttl,
+            "entradas": sum(1 for e in self._entradas.values() if e.expira > time.monotonic()),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / total, 4) if total else None,
+            "invalidaciones": self.invalidaciones,
+            "desalojadas": self.desalojadas,
+        }
+
+
+def estado_caches():
+    return [cache.estado() for cache in _caches]
+
+
+def coincide_etag(if_none_match, etag):
+    """
+    Compara If-None-Match con el ETag (comparación débil, como pide el RFC 9110 para GET):
+    acepta una lista separada por comas, "*" y validadores W/"...".
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    fuerte = lambda e: e[2:] if e.startswith("W/") else e
+    return any(fuerte(e.strip()) == fuerte(etag) for e in if_none_match.split(","))
+
+
+def _no_modificado(request, entrada):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return coincide_etag(if_none_match, entrada.etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return entrada.modificado <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def responder(request: Request, entrada):
+    """Respuesta JSON ya serializada con ETag/Last-Modified, o 304 si el cliente está al día."""
+    headers = {
+        "ETag": entrada.etag,
+        "Last-Modified": format_datetime(entrada.modificado, usegmt=True),
+        "Cache-Control": "private, no-cache",  # El navegador revalida siempre y recibe 304
+    }
+    if _no_modificado(request, entrada):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entrada.cuerpo, media_type="application/json", headers=headers)
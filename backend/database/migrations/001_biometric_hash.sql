@@ -0,0 +1,4 @@
+-- Referencia a la imagen biométrica guardada en disco (database/blob_store.py).
+-- Después de aplicar, ejecutar: python tools/migrar_biometria.py
+ALTER TABLE `ohem`
+  ADD COLUMN `BiometricHash` char(64) COLLATE ascii_general_ci DEFAULT NULL AFTER `BiometricImage`;
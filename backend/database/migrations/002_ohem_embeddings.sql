@@ -0,0 +1,15 @@
+-- Encodings faciales por empleado, llenados por tools/entrenar_modelo.py --bd.
+-- Sin FK a ohem: la carpeta del dataset puede existir antes que el registro del empleado.
+-- Los nodos de reconocimiento los cargan al arrancar y consultan deltas por UpdateDate.
+CREATE TABLE `ohem_embeddings` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `empID` int NOT NULL,
+  `Name` varchar(101) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  `ModelVersion` varchar(50) COLLATE ascii_general_ci NOT NULL,
+  `Vector` varbinary(512) NOT NULL,
+  `Active` char(1) COLLATE utf8mb4_general_ci DEFAULT 'Y',
+  `UpdateDate` datetime(6) NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_embeddings_update` (`UpdateDate`),
+  KEY `idx_embeddings_emp` (`empID`, `Active`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
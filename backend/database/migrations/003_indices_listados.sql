@@ -0,0 +1,15 @@
+-- Índices compuestos para los listados paginados por llave (database/paginacion.py).
+-- Cada índice termina en la llave primaria: MySQL filtra y recorre en orden de
+-- empID/Code/jobTitle sin ordenar en memoria, y nunca toca BiometricImage.
+ALTER TABLE `ohem`
+  ADD INDEX `idx_ohem_active` (`Active`, `empID`),
+  ADD INDEX `idx_ohem_dept` (`dept`, `Active`, `empID`),
+  ADD INDEX `idx_ohem_jobtitle` (`jobTitle`, `Active`, `empID`),
+  ADD INDEX `idx_ohem_tipo` (`type_emp`, `Active`, `empID`),
+  ADD INDEX `idx_ohem_status` (`biometric_status`, `Active`, `empID`);
+
+ALTER TABLE `oudp`
+  ADD INDEX `idx_oudp_active` (`Active`, `Code`);
+
+ALTER TABLE `positions`
+  ADD INDEX `idx_positions_active` (`Active`, `jobTitle`);
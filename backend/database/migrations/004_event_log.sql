@@ -0,0 +1,5 @@
+-- EVENT_LOG ahora lo llena recognition/eventos.py con el empID de ohem.
+-- La FK heredada apuntaba a la tabla EMPLEADOS, que ya no se usa, y rechazaría esos IDs.
+ALTER TABLE `event_log`
+  DROP FOREIGN KEY `event_log_ibfk_1`,
+  ADD INDEX `idx_event_log_fecha` (`fecha_hora`);
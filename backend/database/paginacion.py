@@ -0,0 +1,27 @@
+"""
+Paginación por llave (keyset) sobre la llave primaria.
+
+En lugar de OFFSET (que obliga a MySQL a recorrer y descartar todas las filas
+anteriores) cada página pide `WHERE pk > cursor ORDER BY pk LIMIT n`; el costo es
+el mismo en la primera página que en la número mil.
+"""
+LIMITE_DEFAULT = 50
+LIMITE_MAX = 500
+
+
+def keyset(query, columna, despues_de=None, limite=None):
+    """Ordena por `columna` y pide una fila extra para saber si hay otra página."""
+    query = query.order_by(columna)
+    if despues_de is not None:
+        query = query.where(columna > despues_de)
+    if limite is not None:
+        query = query.limit(limite + 1)
+    return query
+
+
+def cortar(filas, limite, llave):
+    """Devuelve (filas de la página, cursor de la siguiente o None)."""
+    if limite is None or len(filas) <= limite:
+        return list(filas), None
+    filas = list(filas[:limite])
+    return filas, llave(filas[-1])
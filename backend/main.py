@@ -4,7 +4,16 @@ from routes import department
 from routes import position
 from routes import recognition
 from routes import employee  # ✅ ¡Agregar!
+from routes import access
+from routes import jobs as trabajos
+from routes import metricas
 from models.biometric_status import BiometricStatus
+from database.db import cerrar_async_engine
+from recognition.gallery import iniciar_recarga_automatica, detener_recarga_automatica
+from recognition.batcher import batcher
+from recognition.executor import executor
+from recognition.jobs import jobs
+from recognition.eventos import eventos
 
 
 app = FastAPI(
@@ -20,10 +29,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Siguiente"],  # Cursor de paginación de los catálogos
 )
 
 # ✅ Routers habilitados
 app.include_router(department.router)
 app.include_router(position.router)
 app.include_router(recognition.router)
-app.include_router(employee.router)  # ✅ ¡Agregar!
\ No newline at end of file
+app.include_router(employee.router)  # ✅ ¡Agregar!
+app.include_router(access.router)
+app.include_router(trabajos.router)
+app.include_router(metricas.router)
+
+
+# ✅ La galería se recarga sola cuando el entrenamiento publica una versión nueva
+@app.on_event("startup")
+def iniciar_galeria():
+    iniciar_recarga_automatica()
+
+
+@app.on_event("shutdown")
+async def detener_servicios():
+    await batcher.detener()
+    executor.detener()
+    eventos.detener()  # ✅ Escribe los eventos que quedaron en cola
+    jobs.detener()
+    detener_recarga_automatica()
+    await cerrar_async_engine()
@@ -1,2 +1,5 @@
 from .department import Department
-from .position import Position
\ No newline at end of file
+from .position import Position
+from .face_embedding import FaceEmbedding
+from .event_log import EventLog
+from .device import Device
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, String, SmallInteger, Boolean
+from sqlalchemy import Column, String, SmallInteger, Boolean, Index
 from sqlalchemy.dialects.mysql import INTEGER
 from database.db import Base
 
 class Department(Base):
     __tablename__ = "oudp"
-    __table_args__ = {"schema": "umg_biometria"}
+    __table_args__ = (
+        Index("idx_oudp_active", "Active", "Code"),
+        {"schema": "umg_biometria"},
+    )
 
     Code = Column(SmallInteger, primary_key=True, index=True, autoincrement=True)
     Name = Column(String(100), nullable=False)
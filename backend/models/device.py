@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Enum, SmallInteger, Integer, DateTime, Text
+from database.db import Base
+from datetime import datetime
+
+class Device(Base):
+    __tablename__ = "DEVICES"
+    __table_args__ = {"schema": "umg_biometria"}
+
+    DeviceID = Column(Integer, primary_key=True, autoincrement=True)
+    DeviceName = Column(String(100), nullable=False)
+    DeviceType = Column(Enum("Cámara", "Lector Huella", "Otro"), nullable=False)
+    Department_d = Column(SmallInteger, default=-2, index=True)  # Departamento (oudp.Code) que atiende la puerta
+    IPAddress = Column(String(45), unique=True)
+    MACAddress = Column(String(17), unique=True)
+    Status = Column(Enum("Activo", "Inactivo", "En mantenimiento"), default="Activo")
+    LastCheck = Column(DateTime)
+    Notes = Column(Text)
+    RegisteredAt = Column(DateTime, default=datetime.now)
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, String, Enum, SmallInteger, Integer, DateTime, LargeBinary, ForeignKey
+from sqlalchemy import Column, String, Enum, SmallInteger, Integer, DateTime, LargeBinary, ForeignKey, Index
+from sqlalchemy.orm import deferred
 from database.db import Base
 from datetime import datetime
 
 class Employee(Base):
     __tablename__ = "ohem"
-    __table_args__ = {"schema": "umg_biometria"}
+    __table_args__ = (
+        # ✅ Filtros del listado + empID al final para paginar por llave sin ordenar en memoria
+        Index("idx_ohem_active", "Active", "empID"),
+        Index("idx_ohem_dept", "dept", "Active", "empID"),
+        Index("idx_ohem_jobtitle", "jobTitle", "Active", "empID"),
+        Index("idx_ohem_tipo", "type_emp", "Active", "empID"),
+        Index("idx_ohem_status", "biometric_status", "Active", "empID"),
+        {"schema": "umg_biometria"},
+    )
 
     empID = Column(Integer, primary_key=True, autoincrement=True)
     lastName = Column(String(50))
@@ -19,7 +28,10 @@ class Employee(Base):
     Active = Column(String(1), default="Y")
     CreateDate = Column(DateTime, default=datetime.now)
     Code = Column(String(50), nullable=True)
-    BiometricImage = Column(LargeBinary, nullable=True)
+    # ✅ La imagen vive en database/blob_store.py; aquí solo queda su hash
+    BiometricHash = Column(String(64), nullable=True)
+    # Columna heredada: solo se carga si se pide explícitamente (undefer)
+    BiometricImage = deferred(Column(LargeBinary, nullable=True))
     type_emp = Column(Enum("E", "V"), nullable=False, default="E")
 
     biometric_status = Column(
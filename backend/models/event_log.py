@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from database.db import Base
+
+class EventLog(Base):
+    __tablename__ = "event_log"
+    __table_args__ = (
+        Index("idx_event_log_fecha", "fecha_hora"),
+        {"schema": "umg_biometria"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    empleado_id = Column(Integer, index=True)  # empID de ohem (None = rostro no reconocido)
+    fecha_hora = Column(DateTime)
+    imagen_path = Column(String(255))  # Snapshot en events/, escrito por recognition/eventos.py
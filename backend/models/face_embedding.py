@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary, Index
+from database.db import Base
+from datetime import datetime
+
+class FaceEmbedding(Base):
+    __tablename__ = "ohem_embeddings"
+    __table_args__ = (
+        Index("idx_embeddings_update", "UpdateDate"),
+        Index("idx_embeddings_emp", "empID", "Active"),
+        {"schema": "umg_biometria"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    empID = Column(Integer, nullable=False)  # Sin FK: la carpeta del dataset puede existir antes que el empleado
+    Name = Column(String(101))
+    ModelVersion = Column(String(50), nullable=False)
+    Vector = Column(LargeBinary, nullable=False)  # 128 float32 empaquetados (512 bytes)
+    Active = Column(String(1), default="Y")  # 'N' = reemplazado/eliminado (para propagar deltas)
+    UpdateDate = Column(DateTime, default=datetime.now, nullable=False)
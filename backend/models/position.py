@@ -1,8 +1,9 @@
-from sqlalchemy import Column, SmallInteger, String, Boolean
+from sqlalchemy import Column, SmallInteger, String, Boolean, Index
 from database.db import Base
 
 class Position(Base):
     __tablename__ = "positions"
+    __table_args__ = (Index("idx_positions_active", "Active", "jobTitle"),)
     jobTitle = Column(SmallInteger, primary_key=True, autoincrement=True)
     Name = Column(String(20), nullable=False)
     Remarks = Column(String(100))
@@ -0,0 +1,118 @@
+"""
+Micro-batching de peticiones de reconocimiento.
+
+Las peticiones concurrentes de un solo frame se acumulan durante unos pocos
+milisegundos (o hasta llenar el lote) y se procesan juntas con reconocer_lote en
+el ejecutor de procesos. La cola es acotada: si se llena, se rechaza el frame.
+"""
+import asyncio
+import functools
+import os
+
+from recognition import metricas
+from recognition.executor import executor, ColaLlena
+from recognition.pipeline import reconocer_lote_con_tiempos
+
+MAX_BATCH = int(os.getenv("RECOGNITION_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.getenv("RECOGNITION_MAX_WAIT_MS", "5"))
+MAX_PENDIENTES = int(os.getenv("RECOGNITION_MAX_PENDIENTES", "64"))
+
+
+class MicroBatcher:
+    def __init__(self, procesar=reconocer_lote_con_tiempos, max_batch=MAX_BATCH,
+                 max_wait_ms=MAX_WAIT_MS, max_pendientes=MAX_PENDIENTES, ejecutor=executor):
+        self.procesar = procesar
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pendientes = max_pendientes
+        self.ejecutor = ejecutor
+        self._cola = None
+        self._tarea = None
+        self._lotes = set()
+        self._espacio = None
+
+    def _asegurar_iniciado(self):
+        if self._tarea is None or self._tarea.done():
+            self._cola = asyncio.Queue(maxsize=self.max_pendientes)
+            self._espacio = asyncio.Semaphore(self.ejecutor.max_en_vuelo)
+            self._tarea = asyncio.get_running_loop().create_task(self._ciclo())
+
+    @property
+    def pendientes(self):
+        return self._cola.qsize() if self._cola is not None else 0
+
+    async def enviar(self, frame, dispositivo=None):
+        """
+        Encola un frame y espera (resultado, tiempos). Lanza ColaLlena si no hay espacio.
+        `dispositivo` es el DeviceID de la puerta; frames de puertas distintas comparten lote.
+        """
+        self._asegurar_iniciado()
+        futuro = asyncio.get_running_loop().create_future()
+        try:
+            self._cola.put_nowait((frame, dispositivo, futuro))
+        except asyncio.QueueFull:
+            raise ColaLlena()
+        return await futuro
+
+    async def _recolectar(self):
+        """Espera el primer frame y junta los que lleguen dentro de max_wait."""
+        lote = [await self._cola.get()]
+        limite = asyncio.get_running_loop().time() + self.max_wait
+        while len(lote) < self.max_batch:
+            restante = limite - asyncio.get_running_loop().time()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._cola.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _ciclo(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Varios lotes pueden estar en vuelo a la vez, uno por espacio del ejecutor.
+            # Mientras no haya espacio los frames se quedan en la cola acotada.
+            await self._espacio.acquire()
+            lote = await self._recolectar()
+            tarea = loop.create_task(self._despachar(lote))
+            self._lotes.add(tarea)
+            tarea.add_done_callback(self._lotes.discard)
+            tarea.add_done_callback(lambda _: self._espacio.release())
+
+    async def _despachar(self, lote):
+        frames = [frame for frame, _, _ in lote]
+        dispositivos = [dispositivo for _, dispositivo, _ in lote]
+        procesar = self.procesar
+        if any(d is not None for d in dispositivos):
+            procesar = functools.partial(self.procesar, dispositivos=dispositivos)
+        try:
+            (resultados, tiempos), tiempos_ejecutor = await self.ejecutor.ejecutar(
+                procesar, frames, esperar=True
+            )
+        except Exception as e:
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        tiempos = {**tiempos, **tiempos_ejecutor, "lote": len(frames)}
+        metricas.observar_tiempos(tiempos, len(frames))
+        for (_, _, futuro), resultado in zip(lote, resultados):
+            if not futuro.done():
+                futuro.set_result((resultado, tiempos))
+
+    async def detener(self):
+        for tarea in [self._tarea, *self._lotes]:
+            if tarea is not None:
+                tarea.cancel()
+        if self._tarea is not None:
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+
+# 🔽 Un batcher compartido por todo el proceso de la API
+batcher = MicroBatcher()
@@ -0,0 +1,145 @@
+"""
+Caché persistente de encodings por contenido de imagen.
+
+La clave es el SHA-256 de la versión del codificador más los bytes de la imagen:
+renombrar carpetas, restaurar el dataset o cambiar el esquema de la BD no invalida
+nada, y un cambio de modelo/detector simplemente deja de encontrar las claves
+viejas (que luego salen por antigüedad).
+
+Se guarda en un solo archivo SQLite (clave de 32 bytes -> vector de 512 bytes, o
+vacío si la imagen no tenía rostro). Al cerrar, si el archivo pasa de
+ENCODINGS_CACHE_MAX_MB se borran las entradas usadas hace más tiempo.
+
+    cache = EncodingCache(version=VERSION_CODIFICADOR)
+    encontrados = cache.buscar(claves)      # {clave: encoding o None}
+    cache.guardar([(clave, encoding), ...])
+    cache.cerrar()
+"""
+import hashlib
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+DIMENSION = 128
+ENCODINGS_CACHE = os.getenv("ENCODINGS_CACHE", os.path.join("cache", "encodings.sqlite"))  # "" = deshabilitado
+ENCODINGS_CACHE_MAX_MB = float(os.getenv("ENCODINGS_CACHE_MAX_MB", "256"))
+VARIABLES_POR_CONSULTA = 500  # SQLite antiguo admite máximo 999 parámetros por sentencia
+SIN_ROSTRO = b""
+
+
+class EncodingCache:
+    def __init__(self, version, ruta=ENCODINGS_CACHE, max_mb=ENCODINGS_CACHE_MAX_MB):
+        self.version = version.encode("utf-8")
+        self.ruta = ruta
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.aciertos = 0
+        self.fallos = 0
+        self.escritos = 0
+        self.desalojados = 0
+
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, timeout=30)
+        # auto_vacuum solo aplica si se fija antes de crear la tabla
+        self._conexion.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._conexion.execute("PRAGMA journal_mode = WAL")  # Un entrenamiento puede leer mientras otro escribe
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS encodings ("
+            " clave BLOB PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " usado INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_encodings_usado ON encodings (usado)")
+        self._conexion.commit()
+
+    def clave(self, contenido):
+        return hashlib.sha256(self.version + b"\0" + contenido).digest()
+
+    def buscar(self, claves):
+        """{clave: encoding (float32) o None si la imagen no tenía rostro} de las claves encontradas."""
+        claves = [c for c in set(claves) if c is not None]
+        encontrados = {}
+        ahora = int(time.time())
+        for i in range(0, len(claves), VARIABLES_POR_CONSULTA):
+            lote = claves[i:i + VARIABLES_POR_CONSULTA]
+            marcas = ",".join("?" * len(lote))
+            for clave, vector in self._conexion.execute(
+                f"SELECT clave, vector FROM encodings WHERE clave IN ({marcas})", lote
+            ):
+                encontrados[clave] = None if vector == SIN_ROSTRO else np.frombuffer(vector, dtype=np.float32).copy()
+            # Marca de uso para desalojar primero lo que no se ha usado en más tiempo
+            self._conexion.execute(f"UPDATE encodings SET usado = ? WHERE clave IN ({marcas})", [ahora, *lote])
+        self._conexion.commit()
+        self.aciertos += len(encontrados)
+        self.fallos += len(claves) - len(encontrados)
+        return encontrados
+
+    def guardar(self, pares):
+        """pares: [(clave, encoding o None)]"""
+        ahora = int(time.time())
+        filas = [
+            (clave, SIN_ROSTRO if encoding is None else np.asarray(encoding, dtype=np.float32).reshape(DIMENSION).tobytes(), ahora)
+            for clave, encoding in pares
+            if clave is not None
+        ]
+        if filas:
+            self._conexion.executemany("INSERT OR REPLACE INTO encodings (clave, vector, usado) VALUES (?, ?, ?)", filas)
+            self._conexion.commit()
+            self.escritos += len(filas)
+
+    def _tamano(self):
+        pagina = self._conexion.execute("PRAGMA page_size").fetchone()[0]
+        paginas = self._conexion.execute("PRAGMA page_count").fetchone()[0]
+        libres = self._conexion.execute("PRAGMA freelist_count").fetchone()[0]
+        return (paginas - libres) * pagina
+
+    def desalojar(self):
+        """Si el archivo pasa del máximo, borra las entradas más antiguas hasta quedar en ~90%."""
+        tamano = self._tamano()
+        if not self.max_bytes or tamano <= self.max_bytes:
+            return 0
+        filas = self._conexion.execute("SELECT COUNT(*) FROM encodings").fetchone()[0]
+        sobran = filas - int(filas * 0.9 * self.max_bytes / tamano)
+        self._conexion.execute(
+            "DELETE FROM encodings WHERE clave IN (SELECT clave FROM encodings ORDER BY usado LIMIT ?)", (sobran,)
+        )
+        self._conexion.commit()
+        # executescript corre el pragma hasta el final (execute solo libera una página)
+        self._conexion.executescript("PRAGMA incremental_vacuum;")
+        self._conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        self.desalojados += sobran
+        return sobran
+
+    def cerrar(self):
+        try:
+            self.desalojar()
+        finally:
+            self._conexion.close()
+
+    @property
+    def tasa_aciertos(self):
+        consultas = self.aciertos + self.fallos
+        return self.aciertos / consultas if consultas else 0.0
+
+    def estado(self):
+        return {
+            "ruta": self.ruta,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.tasa_aciertos, 3),
+            "escritos": self.escritos,
+            "desalojados": self.desalojados,
+        }
+
+
+def abrir_cache(version, ruta=ENCODINGS_CACHE):
+    """EncodingCache en `ruta`, o None si el caché está deshabilitado o no se pudo abrir."""
+    if not ruta:
+        return None
+    try:
+        return EncodingCache(version, ruta)
+    except sqlite3.Error as e:
+        print(f"[ADVERTENCIA] Caché de encodings no disponible ({ruta}): {e}")
+        return None
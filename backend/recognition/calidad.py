@@ -0,0 +1,113 @@
+"""
+Puntaje de calidad de un rostro candidato y descarte de casi-duplicados.
+
+Cada candidato recibe cuatro puntajes entre 0 y 1:
+- nitidez: varianza del Laplaciano (las fotos movidas o desenfocadas dan poco).
+- tamano: ancho del rostro en píxeles respecto a un tamaño de referencia.
+- pose: simetría izquierda/derecha del rostro (de frente ~1, de perfil ~0).
+- exposicion: brillo medio cercano al centro y pocos píxeles quemados o negros.
+
+El total es un promedio ponderado. Los duplicados se detectan por distancia entre
+encodings: dos frames casi iguales aportan lo mismo al modelo y solo hacen más
+grande la galería, así que se conserva el de mejor puntaje.
+"""
+import os
+
+import cv2
+import numpy as np
+
+NITIDEZ_REFERENCIA = float(os.getenv("CALIDAD_NITIDEZ_REF", "120"))  # Varianza del Laplaciano que ya vale 1.0
+TAMANO_REFERENCIA = int(os.getenv("CALIDAD_TAMANO_REF", "140"))  # Ancho de rostro en px que ya vale 1.0
+CALIDAD_MINIMA = float(os.getenv("CALIDAD_MINIMA", "0.45"))
+DISTANCIA_DUPLICADO = float(os.getenv("CALIDAD_DISTANCIA_DUPLICADO", "0.15"))
+PESOS = {"nitidez": 0.4, "tamano": 0.2, "pose": 0.2, "exposicion": 0.2}
+LADO = 150  # Tamaño al que se normaliza el rostro para puntuar y guardar
+
+
+def _nitidez(gray):
+    return min(1.0, cv2.Laplacian(gray, cv2.CV_64F).var() / NITIDEZ_REFERENCIA)
+
+
+def _pose(gray):
+    mitad = gray.shape[1] // 2
+    izquierda = gray[:, :mitad].astype(np.float32)
+    derecha = np.fliplr(gray[:, -mitad:]).astype(np.float32)
+    diferencia = np.abs(izquierda - derecha).mean() / 255.0
+    return max(0.0, 1.0 - 4.0 * diferencia)
+
+
+def _exposicion(gray):
+    media = gray.mean() / 255.0
+    recortados = np.mean((gray < 10) | (gray > 245))
+    return max(0.0, 1.0 - 2.0 * abs(media - 0.5) - 2.0 * recortados)
+
+
+def puntuar(rostro_bgr, ancho_original):
+    """
+    Puntajes de un recorte de rostro (BGR, ya normalizado a LADO x LADO).
+    `ancho_original` es el ancho del rostro en el frame, antes de redimensionar.
+    """
+    gray = cv2.cvtColor(rostro_bgr, cv2.COLOR_BGR2GRAY)
+    puntajes = {
+        "nitidez": _nitidez(gray),
+        "tamano": min(1.0, ancho_original / TAMANO_REFERENCIA),
+        "pose": _pose(gray),
+        "exposicion": _exposicion(gray),
+    }
+    puntajes["total"] = sum(PESOS[k] * puntajes[k] for k in PESOS)
+    return {k: round(float(v), 3) for k, v in puntajes.items()}
+
+
+class Candidato:
+    def __init__(self, imagen, puntajes, encoding):
+        self.imagen = imagen
+        self.puntajes = puntajes
+        self.encoding = np.asarray(encoding, dtype=np.float32)
+
+    @property
+    def total(self):
+        return self.puntajes["total"]
+
+
+class SeleccionMuestras:
+    """
+    Conserva hasta `maximo` candidatos distintos entre sí, priorizando el puntaje.
+    - Un candidato a menos de `distancia_duplicado` de otro ya aceptado lo reemplaza
+      solo si tiene mejor puntaje.
+    - Con el cupo lleno, un candidato nuevo y distinto desplaza al peor.
+    """
+
+    def __init__(self, maximo, distancia_duplicado=DISTANCIA_DUPLICADO):
+        self.maximo = maximo
+        self.distancia_duplicado = distancia_duplicado
+        self.muestras = []
+        self.duplicados = 0
+
+    def __len__(self):
+        return len(self.muestras)
+
+    def agregar(self, candidato):
+        """Devuelve True si el candidato quedó en la selección."""
+        if self.muestras:
+            encodings = np.stack([m.encoding for m in self.muestras])
+            distancias = np.linalg.norm(encodings - candidato.encoding, axis=1)
+            cercano = int(np.argmin(distancias))
+            if distancias[cercano] < self.distancia_duplicado:
+                self.duplicados += 1
+                if candidato.total > self.muestras[cercano].total:
+                    self.muestras[cercano] = candidato
+                    return True
+                return False
+
+        if len(self.muestras) < self.maximo:
+            self.muestras.append(candidato)
+            return True
+
+        peor = min(range(len(self.muestras)), key=lambda i: self.muestras[i].total)
+        if candidato.total > self.muestras[peor].total:
+            self.muestras[peor] = candidato
+            return True
+        return False
+
+    def ordenadas(self):
+        return sorted(self.muestras, key=lambda m: m.total, reverse=True)
@@ -0,0 +1,103 @@
+"""
+Detección de rostros en cascada.
+
+1. Se reduce el frame a un ancho máximo (DETECCION_ANCHO).
+2. Se detecta sobre la imagen reducida:
+   - "haar": solo el clasificador Haar (el más barato).
+   - "hog" / "cnn": detectores de face_recognition.
+   - "haar+hog" (default): Haar como filtro previo; solo si encuentra algo se corre HOG.
+3. Las cajas se escalan a la resolución original y solo esas regiones se codifican.
+
+La mayoría de frames en una puerta inactiva no tienen a nadie, así que salen en el
+paso 2 sin llegar nunca a HOG ni a dlib.
+"""
+import os
+
+import cv2
+import face_recognition
+
+MODELOS = ("haar", "hog", "cnn", "haar+hog")
+
+
+class DetectionConfig:
+    def __init__(self, modelo=None, ancho=None, upsample=None, num_jitters=None,
+                 haar_scale_factor=1.2, haar_min_neighbors=5, haar_min_size=20):
+        self.modelo = modelo or os.getenv("DETECCION_MODELO", "haar+hog")
+        self.ancho = int(ancho if ancho is not None else os.getenv("DETECCION_ANCHO", "320"))
+        self.upsample = int(upsample if upsample is not None else os.getenv("DETECCION_UPSAMPLE", "1"))
+        self.num_jitters = int(num_jitters if num_jitters is not None else os.getenv("ENCODING_JITTERS", "1"))
+        self.haar_scale_factor = haar_scale_factor
+        self.haar_min_neighbors = haar_min_neighbors
+        self.haar_min_size = haar_min_size
+        if self.modelo not in MODELOS:
+            raise ValueError(f"Modelo de detección no válido: {self.modelo}. Usa: {', '.join(MODELOS)}")
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+config_default = DetectionConfig()
+
+# Clasificador Haar: se carga una sola vez por proceso
+_face_cascade = None
+
+
+def _cascade():
+    global _face_cascade
+    if _face_cascade is None:
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    return _face_cascade
+
+
+def _reducir(rgb, ancho):
+    """Devuelve (imagen_reducida, escala) con escala = reducida / original."""
+    alto_original, ancho_original = rgb.shape[:2]
+    if ancho <= 0 or ancho_original <= ancho:
+        return rgb, 1.0
+    escala = ancho / ancho_original
+    reducida = cv2.resize(rgb, (ancho, int(round(alto_original * escala))), interpolation=cv2.INTER_AREA)
+    return reducida, escala
+
+
+def _haar(reducida, config):
+    gray = cv2.cvtColor(reducida, cv2.COLOR_RGB2GRAY)
+    rostros = _cascade().detectMultiScale(
+        gray, config.haar_scale_factor, config.haar_min_neighbors,
+        minSize=(config.haar_min_size, config.haar_min_size),
+    )
+    # (x, y, w, h) -> (top, right, bottom, left) como face_recognition
+    return [(int(y), int(x + w), int(y + h), int(x)) for (x, y, w, h) in rostros]
+
+
+def detectar(rgb, config=None):
+    """Ubicaciones (top, right, bottom, left) de los rostros en coordenadas de `rgb`."""
+    config = config or config_default
+    reducida, escala = _reducir(rgb, config.ancho)
+
+    if config.modelo in ("haar", "haar+hog"):
+        ubicaciones = _haar(reducida, config)
+        if not ubicaciones:
+            return []  # ✅ Salida temprana: frame sin rostros
+        if config.modelo == "haar+hog":
+            ubicaciones = face_recognition.face_locations(reducida, config.upsample, "hog")
+    else:
+        ubicaciones = face_recognition.face_locations(reducida, config.upsample, config.modelo)
+
+    alto, ancho = rgb.shape[:2]
+    return [
+        (
+            max(0, int(top / escala)),
+            min(ancho, int(right / escala)),
+            min(alto, int(bottom / escala)),
+            max(0, int(left / escala)),
+        )
+        for (top, right, bottom, left) in ubicaciones
+    ]
+
+
+def codificar(rgb, ubicaciones, config=None):
+    """Encodings de las regiones detectadas, calculados a resolución completa."""
+    if not ubicaciones:
+        return []
+    config = config or config_default
+    return face_recognition.face_encodings(rgb, ubicaciones, config.num_jitters)
@@ -0,0 +1,168 @@
+"""
+Encodings faciales persistidos en la base de datos (tabla ohem_embeddings).
+
+El entrenamiento reescribe completas las filas de cada empleado que cambió: las
+anteriores se marcan Active='N' y se insertan las nuevas, todas con el mismo
+UpdateDate. Las filas dadas de baja se borran en una escritura posterior, cuando
+ya quedaron fuera de la ventana de solape. Así un nodo de reconocimiento puede:
+  1. Cargar todo al arrancar con una sola consulta en streaming.
+  2. Consultar periódicamente qué empleados cambiaron desde su última marca y
+     reemplazar solo esos en su galería.
+
+UpdateDate se toma del reloj de quien escribe antes del commit, así que una
+escritura lenta puede hacerse visible con una fecha menor que la marca de un nodo
+que ya consultó. Por eso cada consulta vuelve a revisar los últimos
+EMBEDDINGS_SOLAPE segundos bajo la marca y descarta las filas ya aplicadas.
+"""
+import datetime
+import os
+
+import numpy as np
+from sqlalchemy import select, update, insert, delete, func
+
+from models.face_embedding import FaceEmbedding
+
+DIMENSION = 128
+# Identifica el modelo de dlib que generó los vectores; no se mezclan versiones
+MODEL_VERSION = "dlib_face_recognition_resnet_model_v1"
+FILAS_POR_LOTE = 5000
+# Ventana (segundos) bajo la marca que se vuelve a revisar; debe cubrir la transacción más larga
+EMBEDDINGS_SOLAPE = float(os.getenv("EMBEDDINGS_SOLAPE", "120"))
+
+
+class Marca:
+    """Último UpdateDate aplicado y las filas (id, UpdateDate) ya vistas dentro de la ventana de solape."""
+
+    def __init__(self, fecha=None, vistas=frozenset()):
+        self.fecha = fecha
+        self.vistas = vistas
+
+    def __str__(self):
+        return self.fecha.isoformat(timespec="seconds") if self.fecha is not None else "sin datos"
+
+
+def _ventana(fecha):
+    return fecha - datetime.timedelta(seconds=EMBEDDINGS_SOLAPE)
+
+
+def _marca(db, desde):
+    """
+    Marca actual de la tabla y las filas (id, empID, UpdateDate) revisadas para calcularla.
+    Sin `desde` solo se revisa la ventana bajo el UpdateDate más reciente; con una Marca
+    vacía (galería cargada sin datos) se revisa toda la tabla.
+    """
+    consulta = select(FaceEmbedding.id, FaceEmbedding.empID, FaceEmbedding.UpdateDate)
+    if desde is None:
+        fecha = db.execute(select(func.max(FaceEmbedding.UpdateDate))).scalar()
+        if fecha is None:
+            return Marca(), []
+        consulta = consulta.where(FaceEmbedding.UpdateDate > _ventana(fecha))
+    elif desde.fecha is not None:
+        consulta = consulta.where(FaceEmbedding.UpdateDate > _ventana(desde.fecha))
+    filas = db.execute(consulta).all()
+    fechas = [f[2] for f in filas] + ([desde.fecha] if desde is not None and desde.fecha is not None else [])
+    if not fechas:
+        return Marca(), filas
+    fecha = max(fechas)
+    vistas = frozenset((f[0], f[2]) for f in filas if f[2] > _ventana(fecha))
+    return Marca(fecha, vistas), filas
+
+
+def empaquetar(encoding):
+    return np.asarray(encoding, dtype=np.float32).reshape(DIMENSION).tobytes()
+
+
+def _desempaquetar_filas(filas):
+    """[(empID, Name, Vector)] -> (encodings, ids, names)"""
+    if not filas:
+        return np.empty((0, DIMENSION), dtype=np.float32), np.empty(0, dtype=np.int64), []
+    encodings = np.frombuffer(b"".join(f[2] for f in filas), dtype=np.float32).reshape(-1, DIMENSION)
+    ids = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+    return encodings, ids, [f[1] for f in filas]
+
+
+def guardar_embeddings(db, por_empleado, eliminados=(), completo=False):
+    """
+    Reescribe los encodings de los empleados indicados.
+    - por_empleado: {emp_id: (nombre, [encodings])}
+    - eliminados: empleados cuyos encodings se dan de baja.
+    - completo=True: reentrenamiento completo; da de baja todo lo activo antes de insertar.
+    """
+    ahora = datetime.datetime.now()
+    afectados = set(por_empleado) | set(eliminados)
+
+    # En modo completo se da de baja todo lo activo; los vigentes se reinsertan abajo
+    baja = update(FaceEmbedding).where(FaceEmbedding.Active == "Y")
+    if not completo:
+        baja = baja.where(FaceEmbedding.empID.in_(list(afectados)))
+    if completo or afectados:
+        db.execute(baja.values(Active="N", UpdateDate=ahora))
+
+    filas = [
+        {
+            "empID": emp_id,
+            "Name": nombre,
+            "ModelVersion": MODEL_VERSION,
+            "Vector": empaquetar(encoding),
+            "Active": "Y",
+            "UpdateDate": ahora,
+        }
+        for emp_id, (nombre, encodings) in por_empleado.items()
+        for encoding in encodings
+    ]
+    # INSERT multi-fila por lotes
+    for i in range(0, len(filas), FILAS_POR_LOTE):
+        db.execute(insert(FaceEmbedding), filas[i:i + FILAS_POR_LOTE])
+    # 🧹 Las bajas solo sirven para que los nodos vean el cambio dentro de la ventana de solape;
+    # sin esto cada reentrenamiento completo deja una copia más de la galería en la tabla
+    db.execute(delete(FaceEmbedding).where(FaceEmbedding.Active == "N", FaceEmbedding.UpdateDate < _ventana(ahora)))
+    db.commit()
+    return len(filas)
+
+
+def contar_activos(db):
+    return db.execute(
+        select(func.count())
+        .select_from(FaceEmbedding)
+        .where(FaceEmbedding.Active == "Y", FaceEmbedding.ModelVersion == MODEL_VERSION)
+    ).scalar()
+
+
+def cargar_todo(db):
+    """Todos los encodings activos en una sola consulta en streaming. Devuelve (encodings, ids, names, marca)."""
+    # La marca se toma antes de leer: lo que se confirme en medio se vuelve a aplicar, sin perderse
+    marca, _ = _marca(db, None)
+    resultado = db.execute(
+        select(FaceEmbedding.empID, FaceEmbedding.Name, FaceEmbedding.Vector)
+        .where(FaceEmbedding.Active == "Y", FaceEmbedding.ModelVersion == MODEL_VERSION)
+        .order_by(FaceEmbedding.empID)
+        .execution_options(yield_per=FILAS_POR_LOTE)
+    )
+    filas = []
+    for particion in resultado.partitions():
+        filas.extend(particion)
+    return (*_desempaquetar_filas(filas), marca)
+
+
+def cargar_cambios(db, desde):
+    """
+    Empleados con filas que la Marca `desde` no ha visto y sus encodings activos actuales.
+    Devuelve (emp_ids_cambiados, encodings, ids, names, marca). Cada empleado se
+    reemplaza completo en la galería, así que aplicar un cambio dos veces es inofensivo.
+    """
+    desde = desde if desde is not None else Marca()
+    marca, filas = _marca(db, desde)
+    cambiados = sorted({emp_id for id_, emp_id, fecha in filas if (id_, fecha) not in desde.vistas})
+    if not cambiados:
+        return [], *_desempaquetar_filas([]), desde
+
+    filas = db.execute(
+        select(FaceEmbedding.empID, FaceEmbedding.Name, FaceEmbedding.Vector)
+        .where(
+            FaceEmbedding.empID.in_(cambiados),
+            FaceEmbedding.Active == "Y",
+            FaceEmbedding.ModelVersion == MODEL_VERSION,
+        )
+        .order_by(FaceEmbedding.empID)
+    ).all()
+    return list(cambiados), *_desempaquetar_filas(filas), marca
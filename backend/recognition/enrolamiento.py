@@ -0,0 +1,183 @@
+"""
+Sesiones de enrolamiento: cada operador (o estación) captura y registra sobre su
+propia sesión, así varias altas pueden correr en paralelo.
+
+La captura deja la imagen de referencia del empleado en la sesión (en memoria) y
+el registro la toma por sesion_id. Las sesiones que nadie usa vencen solas tras
+ENROLAMIENTO_TTL segundos; el vencimiento se revisa en cada acceso, sin hilos.
+"""
+import datetime
+import os
+import threading
+import time
+import uuid
+
+ENROLAMIENTO_TTL = float(os.getenv("ENROLAMIENTO_TTL", "900"))
+ENROLAMIENTO_MAX_SESIONES = int(os.getenv("ENROLAMIENTO_MAX_SESIONES", "100"))
+
+
+def _estaciones(valor):
+    """ENROLAMIENTO_ESTACIONES="recepcion=0,planta=rtsp://..." -> {"recepcion": "0", ...}"""
+    estaciones = {}
+    for par in valor.split(","):
+        if "=" in par:
+            nombre, fuente = par.split("=", 1)
+            estaciones[nombre.strip()] = fuente.strip()
+    return estaciones
+
+
+# Cámara de cada estación de enrolamiento; sin estación se usa CAMARA_FUENTE
+ESTACIONES = _estaciones(os.getenv("ENROLAMIENTO_ESTACIONES", ""))
+
+
+class SesionEnrolamiento:
+    def __init__(self, estacion=None, ttl=ENROLAMIENTO_TTL):
+        self.id = uuid.uuid4().hex
+        self.estacion = estacion
+        self.ttl = ttl
+        self.creada = datetime.datetime.now()
+        self.imagen = None  # JPEG de la mejor muestra capturada
+        self.capturas = 0
+        self.job_id = None
+        self.capturando = False  # El job de la sesión sigue en la fase de cámara (no en el entrenamiento)
+        self.expira = time.monotonic() + ttl
+
+    @property
+    def fuente(self):
+        return ESTACIONES.get(self.estacion) if self.estacion else None
+
+    def vencida(self, ahora=None):
+        return (ahora if ahora is not None else time.monotonic()) >= self.expira
+
+    def renovar(self):
+        self.expira = time.monotonic() + self.ttl
+
+    def to_dict(self):
+        return {
+            "sesion_id": self.id,
+            "estacion": self.estacion,
+            "creada": self.creada.isoformat(timespec="seconds"),
+            "imagen_capturada": self.imagen is not None,
+            "capturas": self.capturas,
+            "job_id": self.job_id,
+            "capturando": self.capturando,
+            "expira_en_s": max(0, round(self.expira - time.monotonic())),
+        }
+
+
+class SesionesEnrolamiento:
+    def __init__(self, ttl=ENROLAMIENTO_TTL, max_sesiones=ENROLAMIENTO_MAX_SESIONES):
+        self.ttl = ttl
+        self.max_sesiones = max_sesiones
+        self._sesiones = {}
+        self._lock = threading.Lock()
+        self.creadas = 0
+        self.vencidas = 0
+
+    def _purgar(self, reservar=0):
+        """Quita las vencidas y, si aún no hay lugar, las más antiguas. Se llama con el lock tomado."""
+        ahora = time.monotonic()
+        for sesion_id in [s.id for s in self._sesiones.values() if s.vencida(ahora)]:
+            self._descartar(sesion_id)
+        sobrantes = len(self._sesiones) - self.max_sesiones + reservar
+        if sobrantes > 0:
+            for sesion in sorted(self._sesiones.values(), key=lambda s: s.expira)[:sobrantes]:
+                self._descartar(sesion.id)
+
+    def _descartar(self, sesion_id, vencida=True):
+        from recognition.jobs import jobs
+
+        sesion = self._sesiones.pop(sesion_id)
+        if vencida:
+            self.vencidas += 1
+        if sesion.job_id and sesion.capturando:
+            # Una captura de una sesión abandonada no tiene a quién entregar; el entrenamiento sí sigue
+            jobs.cancelar(sesion.job_id)
+
+    def crear(self, estacion=None):
+        if estacion is not None and estacion not in ESTACIONES:
+            raise ValueError(f"Estación desconocida: {estacion}")
+        sesion = SesionEnrolamiento(estacion, self.ttl)
+        with self._lock:
+            self._purgar(reservar=1)
+            self._sesiones[sesion.id] = sesion
+            self.creadas += 1
+        return sesion
+
+    def obtener(self, sesion_id):
+        """La sesión vigente (y renueva su vencimiento), o None si no existe o venció."""
+        with self._lock:
+            sesion = self._sesiones.get(sesion_id)
+            if sesion is None:
+                return None
+            if sesion.vencida():
+                self._descartar(sesion_id)
+                return None
+            sesion.renovar()
+            return sesion
+
+    def guardar_imagen(self, sesion_id, imagen, capturas=None):
+        """Deja la imagen capturada en la sesión. Devuelve False si la sesión ya no existe."""
+        sesion = self.obtener(sesion_id)
+        if sesion is None:
+            return False
+        sesion.imagen = imagen
+        if capturas is not None:
+            sesion.capturas = capturas
+        return True
+
+    def tomar_imagen(self, sesion_id):
+        """Saca la imagen de la sesión (solo un registro puede usarla). None si no hay."""
+        with self._lock:
+            sesion = self._sesiones.get(sesion_id)
+            if sesion is None or sesion.vencida() or sesion.imagen is None:
+                return None
+            imagen, sesion.imagen = sesion.imagen, None
+            return imagen
+
+    def iniciar_captura(self, sesion, enviar):
+        """
+        Encola la captura de la sesión con enviar() -> Job, salvo que la cámara de su
+        estación ya esté capturando para otra sesión. Devuelve el Job o None si está ocupada.
+        """
+        from recognition.jobs import TERMINADOS, jobs
+
+        with self._lock:
+            for otra in self._sesiones.values():
+                job = jobs.obtener(otra.job_id) if otra.job_id else None
+                if otra.estacion == sesion.estacion and otra.capturando and job is not None and job.estado not in TERMINADOS:
+                    return None
+            sesion.capturando = True
+            try:
+                job = enviar()
+            except Exception:
+                sesion.capturando = False
+                raise
+            sesion.job_id = job.id
+            return job
+
+    def fin_captura(self, sesion):
+        """La cámara quedó libre: desde aquí cerrar la sesión ya no cancela su job."""
+        with self._lock:
+            sesion.capturando = False
+
+    def cerrar(self, sesion_id):
+        with self._lock:
+            if sesion_id not in self._sesiones:
+                return False
+            self._descartar(sesion_id, vencida=False)
+            return True
+
+    def estado(self):
+        with self._lock:
+            self._purgar()
+            return {
+                "activas": len(self._sesiones),
+                "con_imagen": sum(1 for s in self._sesiones.values() if s.imagen is not None),
+                "creadas": self.creadas,
+                "vencidas": self.vencidas,
+                "ttl_s": self.ttl,
+            }
+
+
+sesiones = SesionesEnrolamiento()
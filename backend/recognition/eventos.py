@@ -0,0 +1,175 @@
+"""
+Registro asíncrono de eventos de acceso (tabla event_log).
+
+Abrir la puerta nunca espera al registro: registrar() solo deja el evento en una
+cola acotada y regresa. Un hilo en segundo plano junta los eventos en lotes,
+escribe los snapshots en disco (reducidos y recomprimidos si se configuró) y los
+inserta con un solo INSERT multi-fila por lote. Si la cola se llena, el evento se
+descarta y se cuenta; el acceso no se bloquea.
+"""
+import datetime
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+from sqlalchemy import insert
+
+from recognition import metricas
+
+EVENTOS_DIR = os.getenv("EVENTOS_DIR", "events")
+EVENTOS_MAX_PENDIENTES = int(os.getenv("EVENTOS_MAX_PENDIENTES", "1000"))
+EVENTOS_MAX_LOTE = int(os.getenv("EVENTOS_MAX_LOTE", "100"))
+EVENTOS_INTERVALO = float(os.getenv("EVENTOS_INTERVALO", "1.0"))  # segundos máximos antes de escribir un lote
+EVENTOS_ANCHO = int(os.getenv("EVENTOS_ANCHO", "320"))  # 0 = snapshot a tamaño original
+EVENTOS_CALIDAD_JPEG = int(os.getenv("EVENTOS_CALIDAD_JPEG", "80"))
+
+_FIN = object()
+
+
+class EventLogger:
+    def __init__(self, eventos_dir=EVENTOS_DIR, max_pendientes=EVENTOS_MAX_PENDIENTES, max_lote=EVENTOS_MAX_LOTE,
+                 intervalo=EVENTOS_INTERVALO, ancho=EVENTOS_ANCHO, calidad=EVENTOS_CALIDAD_JPEG):
+        self.eventos_dir = eventos_dir
+        self.max_lote = max_lote
+        self.intervalo = intervalo
+        self.ancho = ancho
+        self.calidad = calidad
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._hilo = None
+        self._lock = threading.Lock()
+        self.registrados = 0
+        self.descartados = 0
+        self.escritos = 0
+        self.errores = 0
+
+    def _asegurar_iniciado(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or not self._hilo.is_alive():
+                    self._hilo = threading.Thread(target=self._ciclo, name="event-log", daemon=True)
+                    self._hilo.start()
+
+    def registrar(self, empleado_id, imagen=None):
+        """
+        Encola un evento sin bloquear. `imagen` puede ser el JPEG original (bytes) o
+        un frame BGR de OpenCV. Devuelve la ruta que tendrá el snapshot, o None si
+        no hay imagen o el evento se descartó por cola llena.
+        """
+        self._asegurar_iniciado()
+        fecha = datetime.datetime.now()
+        ruta = None
+        if imagen is not None:
+            ruta = os.path.join(self.eventos_dir, f"{empleado_id}_{fecha:%Y%m%d_%H%M%S_%f}.jpg")
+        try:
+            self._cola.put_nowait((empleado_id, fecha, ruta, imagen))
+        except queue.Full:
+            self.descartados += 1
+            return None
+        self.registrados += 1
+        return ruta
+
+    @property
+    def pendientes(self):
+        return self._cola.qsize()
+
+    def _recolectar(self):
+        """Espera el primer evento y junta los que ya estén en cola, hasta max_lote."""
+        try:
+            lote = [self._cola.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        while len(lote) < self.max_lote and lote[-1] is not _FIN:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _ciclo(self):
+        while True:
+            lote = self._recolectar()
+            fin = bool(lote) and lote[-1] is _FIN
+            eventos = [e for e in lote if e is not _FIN]
+            if eventos:
+                self._escribir(eventos)
+            if fin:
+                return
+
+    def _guardar_imagen(self, ruta, imagen):
+        """Escribe el snapshot; lo reduce a `ancho` y lo recomprime solo si hace falta."""
+        if isinstance(imagen, (bytes, bytearray)):
+            if not self.ancho:
+                with open(ruta, "wb") as f:
+                    f.write(imagen)
+                return
+            imagen = cv2.imdecode(np.frombuffer(imagen, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if imagen is None:
+                raise ValueError("imagen no decodificable")
+
+        alto, ancho = imagen.shape[:2]
+        if self.ancho and ancho > self.ancho:
+            imagen = cv2.resize(imagen, (self.ancho, int(alto * self.ancho / ancho)), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", imagen, [cv2.IMWRITE_JPEG_QUALITY, self.calidad])
+        if not ok:
+            raise ValueError("no se pudo codificar el JPEG")
+        with open(ruta, "wb") as f:
+            f.write(jpeg.tobytes())
+
+    def _escribir(self, eventos):
+        from database.db import SessionLocal
+        from models.event_log import EventLog
+
+        filas = []
+        for empleado_id, fecha, ruta, imagen in eventos:
+            if ruta is not None:
+                try:
+                    os.makedirs(self.eventos_dir, exist_ok=True)
+                    t0 = time.perf_counter()
+                    self._guardar_imagen(ruta, imagen)
+                    metricas.eventos_segundos.observar(time.perf_counter() - t0, "snapshot")
+                except Exception as e:
+                    print(f"[ERROR] Snapshot {ruta}: {e}")
+                    ruta = None
+            filas.append({"empleado_id": empleado_id, "fecha_hora": fecha, "imagen_path": ruta})
+
+        inicio = time.perf_counter()
+        db = SessionLocal()
+        try:
+            # ✅ Un solo INSERT ... VALUES (...), (...), ... por lote
+            db.execute(insert(EventLog).values(filas))
+            db.commit()
+            self.escritos += len(filas)
+            print(f"[EVENTOS] {len(filas)} eventos registrados en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+        except Exception as e:
+            db.rollback()
+            self.errores += len(filas)
+            print(f"[ERROR] No se registraron {len(filas)} eventos de acceso: {e}")
+        finally:
+            db.close()
+        metricas.eventos_segundos.observar(time.perf_counter() - inicio, "insertar_bd")
+
+    def estado(self):
+        return {
+            "pendientes": self.pendientes,
+            "registrados": self.registrados,
+            "descartados": self.descartados,
+            "escritos": self.escritos,
+            "errores": self.errores,
+        }
+
+    def detener(self, timeout=10.0):
+        """Escribe lo que quede en cola y detiene el hilo (se llama al apagar la API)."""
+        if self._hilo is None or not self._hilo.is_alive():
+            return
+        try:
+            self._cola.put(_FIN, timeout=timeout)
+        except queue.Full:
+            print("⚠️ Cola de eventos llena al apagar; algunos eventos pueden perderse.")
+            return
+        self._hilo.join(timeout)
+
+
+eventos = EventLogger()
@@ -0,0 +1,111 @@
+"""
+Ejecutor dedicado para el trabajo pesado de reconocimiento.
+
+La detección HOG y el encoding de dlib son CPU y retienen el GIL en parte del
+trabajo, así que se ejecutan en un pool de procesos propio y acotado, fuera del
+event loop de uvicorn. Cuando el pool está lleno se rechaza el trabajo (503) en
+lugar de acumularlo.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+WORKERS = int(os.getenv("RECOGNITION_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Lotes admitidos a la vez: los que se están procesando más los que esperan en el pool
+MAX_EN_VUELO = int(os.getenv("RECOGNITION_MAX_EN_VUELO", str(WORKERS * 2)))
+TIMEOUT = float(os.getenv("RECOGNITION_TIMEOUT", "10"))
+
+
+class ColaLlena(Exception):
+    """El ejecutor no admite más trabajo en este momento."""
+
+
+def _iniciar_worker():
+    # Cada worker mantiene su propia galería (mapeada en memoria) y la recarga sola
+    from recognition.gallery import iniciar_recarga_automatica
+    iniciar_recarga_automatica()
+
+
+class RecognitionExecutor:
+    def __init__(self, workers=WORKERS, max_en_vuelo=MAX_EN_VUELO, timeout=TIMEOUT):
+        self.workers = workers
+        self.max_en_vuelo = max_en_vuelo
+        self.timeout = timeout
+        self._pool = None
+        self._espacio = None
+        self.en_vuelo = 0
+        self.rechazados = 0
+        self.expirados = 0
+
+    def _asegurar_pool(self):
+        if self._pool is None:
+            # spawn: no heredamos los hilos del proceso de uvicorn
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar_worker,
+            )
+            self._espacio = asyncio.Semaphore(self.max_en_vuelo)
+
+    def saturado(self):
+        return self._espacio is not None and self._espacio.locked()
+
+    async def ejecutar(self, fn, *args, esperar=False):
+        """
+        Ejecuta fn(*args) en el pool y devuelve (resultado, tiempos) donde tiempos
+        incluye la espera en cola y el total en milisegundos.
+        - esperar=False: si no hay espacio lanza ColaLlena de inmediato.
+        - esperar=True: espera a que se libere espacio (lo usa el micro-batcher,
+          que a su vez tiene su propia cola acotada).
+        """
+        self._asegurar_pool()
+        if not esperar and self._espacio.locked():
+            self.rechazados += 1
+            raise ColaLlena()
+
+        inicio = time.perf_counter()
+        await self._espacio.acquire()
+        self.en_vuelo += 1
+
+        def _liberar(_):
+            self.en_vuelo -= 1
+            self._espacio.release()
+
+        loop = asyncio.get_running_loop()
+        futuro = loop.run_in_executor(self._pool, _cronometrar, fn, args)
+        # El espacio se libera cuando el worker termina de verdad, aunque expire la espera
+        futuro.add_done_callback(_liberar)
+        try:
+            resultado, tiempo_worker = await asyncio.wait_for(asyncio.shield(futuro), self.timeout)
+        except asyncio.TimeoutError:
+            self.expirados += 1
+            raise
+
+        total_ms = (time.perf_counter() - inicio) * 1000
+        return resultado, {"cola_ms": total_ms - tiempo_worker, "total_ms": total_ms}
+
+    def estado(self):
+        return {
+            "workers": self.workers,
+            "en_vuelo": self.en_vuelo,
+            "capacidad": self.max_en_vuelo,
+            "rechazados": self.rechazados,
+            "expirados": self.expirados,
+        }
+
+    def detener(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _cronometrar(fn, args):
+    inicio = time.perf_counter()
+    resultado = fn(*args)
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+# 🔽 Un ejecutor compartido por todo el proceso de la API
+executor = RecognitionExecutor()
@@ -0,0 +1,286 @@
+"""
+Fuentes de frames para captura y reconocimiento, sin depender de una ventana.
+
+- CamaraSource: webcam (índice) o stream de red (rtsp://, http://) vía OpenCV.
+- VideoSource: archivo de video, para reproducir grabaciones reales.
+- DirectorioSource: carpeta de imágenes, en orden alfabético.
+- GeneradorSource: cualquier iterable de frames BGR (pruebas, carga sintética).
+
+Cada fuente lee en su propio hilo y deja los frames en un buffer pequeño que
+descarta el más viejo cuando el consumidor va lento: el reconocimiento siempre
+trabaja sobre lo más reciente en lugar de acumular atraso. Opcionalmente limita
+la tasa (fps_max) y, para videos/carpetas, reproduce al ritmo original
+(tiempo_real) para simular carga real.
+
+    with abrir_fuente("rtsp://camara-puerta-1/stream", fps_max=10) as fuente:
+        for frame in fuente:
+            ...
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp")
+BUFFER_DEFAULT = int(os.getenv("FUENTE_BUFFER", "2"))
+FUENTE_DEFAULT = os.getenv("CAMARA_FUENTE", "0")  # Índice de webcam, URL rtsp://, video o carpeta
+
+
+class FrameSource:
+    nombre_tipo = "fuente"
+
+    def __init__(self, buffer=BUFFER_DEFAULT, fps_max=None, tiempo_real=False, fps=None, nombre=None):
+        """
+        - buffer: frames que se guardan sin consumir; al llenarse se descarta el más viejo.
+        - fps_max: frames por segundo máximos entregados (el resto se descarta al leer).
+        - tiempo_real: en videos/carpetas/generadores, espera entre frames según `fps`.
+        """
+        self.fps_max = fps_max
+        self.tiempo_real = tiempo_real
+        self.fps = fps
+        self.nombre = nombre or self.nombre_tipo
+        self._buffer = deque(maxlen=max(1, buffer))
+        self._condicion = threading.Condition()
+        self._detener = threading.Event()
+        self._terminado = False
+        self._hilo = None
+        self.leidos = 0
+        self.entregados = 0
+        self.descartados = 0
+        self.decimados = 0
+        self._inicio = None
+
+    # --- Lo que implementa cada fuente ---
+
+    def _abrir(self):
+        pass
+
+    def _siguiente(self):
+        """Devuelve el siguiente frame BGR, o None cuando la fuente se agotó."""
+        raise NotImplementedError
+
+    def _cerrar(self):
+        pass
+
+    # --- Hilo lector ---
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._abrir()
+            self._inicio = time.monotonic()
+            self._hilo = threading.Thread(target=self._leer, name=f"fuente-{self.nombre}", daemon=True)
+            self._hilo.start()
+        return self
+
+    def _leer(self):
+        intervalo_min = 1.0 / self.fps_max if self.fps_max else 0.0
+        intervalo_real = 1.0 / self.fps if (self.tiempo_real and self.fps) else 0.0
+        proximo = 0.0
+        try:
+            while not self._detener.is_set():
+                frame = self._siguiente()
+                if frame is None:
+                    break
+                self.leidos += 1
+
+                ahora = time.monotonic()
+                if intervalo_real:
+                    # Reproducción al ritmo original: el frame n sale en inicio + n / fps
+                    espera = self._inicio + self.leidos * intervalo_real - ahora
+                    if espera > 0 and self._detener.wait(espera):
+                        break
+                    ahora = time.monotonic()
+                if intervalo_min:
+                    if ahora < proximo:
+                        self.decimados += 1
+                        continue
+                    # Agenda fija (no "desde el último") para no perder frames por variaciones mínimas
+                    proximo = proximo + intervalo_min if ahora - proximo < intervalo_min else ahora + intervalo_min
+
+                with self._condicion:
+                    if len(self._buffer) == self._buffer.maxlen:
+                        self.descartados += 1  # ✅ Se pierde el más viejo, no el más reciente
+                    self._buffer.append(frame)
+                    self._condicion.notify()
+        except Exception as e:
+            print(f"[ERROR] Fuente {self.nombre}: {e}")
+        finally:
+            self._cerrar()
+            with self._condicion:
+                self._terminado = True
+                self._condicion.notify_all()
+
+    # --- Consumidor ---
+
+    def leer(self, timeout=None):
+        """Siguiente frame disponible; None si la fuente terminó (o si venció `timeout`)."""
+        self.iniciar()
+        with self._condicion:
+            if not self._condicion.wait_for(lambda: self._buffer or self._terminado, timeout):
+                return None
+            if not self._buffer:
+                return None
+            self.entregados += 1
+            return self._buffer.popleft()
+
+    def __iter__(self):
+        while True:
+            frame = self.leer()
+            if frame is None:
+                return
+            yield frame
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def estado(self):
+        transcurrido = time.monotonic() - self._inicio if self._inicio else 0.0
+        return {
+            "fuente": self.nombre,
+            "tipo": self.nombre_tipo,
+            "leidos": self.leidos,
+            "entregados": self.entregados,
+            "descartados": self.descartados,
+            "decimados": self.decimados,
+            "fps_entregados": round(self.entregados / transcurrido, 1) if transcurrido > 0 else 0.0,
+            "terminado": self._terminado,
+        }
+
+
+class CamaraSource(FrameSource):
+    """Webcam o stream de red. Los streams se reconectan solos si se cortan."""
+    nombre_tipo = "camara"
+
+    def __init__(self, origen=0, reconectar=None, espera_reconexion=2.0, **kwargs):
+        kwargs.setdefault("nombre", str(origen))
+        super().__init__(**kwargs)
+        self.origen = origen
+        self.reconectar = isinstance(origen, str) if reconectar is None else reconectar
+        self.espera_reconexion = espera_reconexion
+        self._cap = None
+
+    def _abrir(self):
+        self._cap = cv2.VideoCapture(self.origen)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"No se pudo abrir la cámara {self.origen}.")
+
+    def _siguiente(self):
+        while not self._detener.is_set():
+            ret, frame = self._cap.read()
+            if ret:
+                return frame
+            if not self.reconectar:
+                return None
+            print(f"⚠️ Se perdió la señal de {self.origen}; reconectando...")
+            self._cap.release()
+            if self._detener.wait(self.espera_reconexion):
+                return None
+            self._cap = cv2.VideoCapture(self.origen)
+        return None
+
+    def _cerrar(self):
+        if self._cap is not None:
+            self._cap.release()
+
+
+class VideoSource(FrameSource):
+    nombre_tipo = "video"
+
+    def __init__(self, ruta, **kwargs):
+        kwargs.setdefault("nombre", os.path.basename(ruta))
+        super().__init__(**kwargs)
+        self.ruta = ruta
+        self._cap = None
+
+    def _abrir(self):
+        self._cap = cv2.VideoCapture(self.ruta)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"No se pudo abrir el video {self.ruta}.")
+        if self.fps is None:
+            self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def _siguiente(self):
+        ret, frame = self._cap.read()
+        return frame if ret else None
+
+    def _cerrar(self):
+        if self._cap is not None:
+            self._cap.release()
+
+
+class DirectorioSource(FrameSource):
+    nombre_tipo = "directorio"
+
+    def __init__(self, carpeta, repetir=False, **kwargs):
+        kwargs.setdefault("nombre", os.path.basename(os.path.normpath(carpeta)))
+        kwargs.setdefault("fps", 10.0)
+        super().__init__(**kwargs)
+        self.carpeta = carpeta
+        self.repetir = repetir
+        self._rutas = []
+        self._posicion = 0
+
+    def _abrir(self):
+        self._rutas = sorted(
+            os.path.join(self.carpeta, f) for f in os.listdir(self.carpeta)
+            if f.lower().endswith(EXTENSIONES_IMAGEN)
+        )
+        if not self._rutas:
+            raise RuntimeError(f"No hay imágenes en {self.carpeta}.")
+
+    def _siguiente(self):
+        while True:
+            if self._posicion >= len(self._rutas):
+                if not self.repetir:
+                    return None
+                self._posicion = 0
+            ruta = self._rutas[self._posicion]
+            self._posicion += 1
+            frame = cv2.imread(ruta)
+            if frame is not None:
+                return frame
+            print(f"⚠️ Imagen no válida: {ruta}")
+
+
+class GeneradorSource(FrameSource):
+    nombre_tipo = "generador"
+
+    def __init__(self, frames, **kwargs):
+        super().__init__(**kwargs)
+        self._iterador = iter(frames)
+
+    def _siguiente(self):
+        return next(self._iterador, None)
+
+
+def abrir_fuente(origen, **kwargs):
+    """
+    Crea la fuente adecuada para `origen`:
+    - FrameSource: se devuelve tal cual.
+    - int o "0", "1"...: webcam.   - "rtsp://", "http(s)://": stream de red.
+    - carpeta: DirectorioSource.   - archivo: VideoSource.
+    - cualquier otro iterable: GeneradorSource.
+    """
+    if isinstance(origen, FrameSource):
+        return origen
+    if isinstance(origen, int) or (isinstance(origen, str) and origen.isdigit()):
+        return CamaraSource(int(origen), **kwargs)
+    if isinstance(origen, str):
+        if origen.startswith(("rtsp://", "http://", "https://")):
+            return CamaraSource(origen, **kwargs)
+        if os.path.isdir(origen):
+            return DirectorioSource(origen, **kwargs)
+        if os.path.isfile(origen):
+            return VideoSource(origen, **kwargs)
+        raise ValueError(f"Fuente de frames no encontrada: {origen}")
+    return GeneradorSource(origen, **kwargs)
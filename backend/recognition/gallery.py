@@ -0,0 +1,293 @@
+"""
+Galería de rostros residente en memoria.
+
+Todos los encodings conocidos viven en una sola matriz float32 contigua (N x 128)
+con arreglos paralelos de IDs y nombres. Cada consulta calcula las distancias
+contra toda la galería en una sola operación vectorizada, sin bucles de Python
+por encoding.
+"""
+import datetime
+import os
+import threading
+
+import numpy as np
+
+from recognition import store
+from recognition.index import ExactIndex, crear_indice
+
+DIMENSION = store.DIMENSION
+TOLERANCIA_DEFAULT = 0.6  # Misma tolerancia que face_recognition.compare_faces
+GALLERY_INDEX = os.getenv("GALLERY_INDEX", ExactIndex.nombre)
+# De dónde se carga la galería: "archivo" (modelo/ publicado por el entrenamiento) o "bd" (ohem_embeddings)
+GALLERY_SOURCE = os.getenv("GALLERY_SOURCE", "archivo")
+# Filas que se piden al índice por cada empleado solicitado (un empleado tiene varias muestras)
+FILAS_POR_EMPLEADO = 8
+
+
+class FaceGallery:
+    def __init__(self, encodings, ids, names, version=None, indice=None):
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, DIMENSION)
+        ids = np.asarray(ids, dtype=np.int64)
+        names = np.asarray(names, dtype=object)
+        self.version = version
+
+        # ✅ Las muestras de cada empleado deben quedar contiguas. El store ya las
+        # guarda ordenadas, así que una matriz mapeada en memoria se usa sin copiarla.
+        if len(ids) > 1 and np.any(ids[1:] < ids[:-1]):
+            orden = np.argsort(ids, kind="stable")
+            encodings, ids, names = encodings[orden], ids[orden], names[orden]
+        self.encodings = np.ascontiguousarray(encodings)
+        self.ids = ids
+        self.names = names
+
+        # Normas al cuadrado precalculadas: ||a - b||² = ||a||² + ||b||² - 2·a·b
+        self._sq_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+        # Inicio de cada bloque de muestras por empleado (para reduceat)
+        if len(self.ids):
+            self._inicios = np.flatnonzero(np.r_[True, self.ids[1:] != self.ids[:-1]])
+        else:
+            self._inicios = np.empty(0, dtype=np.int64)
+        self.empleados = self.ids[self._inicios]
+        self.nombres_empleados = self.names[self._inicios]
+
+        # Índice aproximado opcional; sin índice se usa la búsqueda exacta por empleado
+        self.indice = indice.build(self.encodings, self.ids) if indice is not None else None
+        self._nombre_por_id = dict(zip(self.empleados.tolist(), self.nombres_empleados))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def total_empleados(self):
+        return len(self.empleados)
+
+    @classmethod
+    def vacia(cls):
+        return cls(np.empty((0, DIMENSION), dtype=np.float32), [], [])
+
+    @classmethod
+    def desde_store(cls, base_dir=store.MODEL_DIR, version=None, tipo_indice=GALLERY_INDEX):
+        """Abre (mapeada en memoria) la versión publicada por tools/entrenar_modelo.py."""
+        data = store.cargar(base_dir, version=version)
+        if data is None:
+            return None
+        return cls(data["encodings"], data["ids"], data["names"], version=data["version"],
+                   indice=_nuevo_indice(tipo_indice))
+
+    @classmethod
+    def desde_bd(cls, tipo_indice=GALLERY_INDEX):
+        """Carga todos los encodings activos de ohem_embeddings; la versión es su embeddings_db.Marca."""
+        from database.db import SessionLocal
+        from recognition import embeddings_db
+
+        db = SessionLocal()
+        try:
+            encodings, ids, names, marca = embeddings_db.cargar_todo(db)
+        finally:
+            db.close()
+        return cls(encodings, ids, names, version=marca, indice=_nuevo_indice(tipo_indice))
+
+    def con_cambios(self, emp_ids, encodings, ids, names, version):
+        """Nueva galería con las muestras de `emp_ids` reemplazadas por las recibidas."""
+        conservar = ~np.isin(self.ids, list(emp_ids))
+        return FaceGallery(
+            np.concatenate([self.encodings[conservar], np.asarray(encodings, dtype=np.float32).reshape(-1, DIMENSION)]),
+            np.concatenate([self.ids[conservar], np.asarray(ids, dtype=np.int64)]),
+            list(self.names[conservar]) + list(names),
+            version=version,
+            indice=_nuevo_indice(self.indice.nombre) if self.indice is not None else None,
+        )
+
+    def subconjunto(self, emp_ids):
+        """Galería solo con las muestras de `emp_ids` (un shard; se compara en forma exacta)."""
+        conservar = np.isin(self.ids, np.asarray(list(emp_ids), dtype=np.int64))
+        return FaceGallery(self.encodings[conservar], self.ids[conservar], self.names[conservar], version=self.version)
+
+    def distancias(self, probes):
+        """Distancias euclidianas (P x N) entre cada probe y todas las muestras."""
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, DIMENSION)
+        sq_probes = np.einsum("ij,ij->i", probes, probes)
+        d2 = sq_probes[:, None] + self._sq_norms[None, :] - 2.0 * (probes @ self.encodings.T)
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2)
+
+    def distancias_por_empleado(self, probes):
+        """Distancia mínima (P x E) de cada probe contra cada empleado."""
+        d = self.distancias(probes)
+        if d.shape[1] == 0:
+            return d
+        return np.minimum.reduceat(d, self._inicios, axis=1)
+
+    def match_batch(self, probes, tolerance=TOLERANCIA_DEFAULT, top_k=1):
+        """
+        Devuelve, por cada probe, hasta `top_k` empleados distintos cuya distancia
+        mínima sea <= `tolerance`, ordenados del más cercano al más lejano.
+        """
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, DIMENSION)
+        if len(probes) == 0:
+            return []
+        if self.total_empleados == 0:
+            return [[] for _ in range(len(probes))]
+        if self.indice is not None:
+            return self._match_indice(probes, tolerance, top_k)
+
+        d = self.distancias_por_empleado(probes)
+        k = min(top_k, d.shape[1])
+        candidatos = np.argpartition(d, k - 1, axis=1)[:, :k]
+
+        resultados = []
+        for fila, cols in zip(d, candidatos):
+            cols = cols[np.argsort(fila[cols])]
+            resultados.append([
+                {
+                    "empID": int(self.empleados[c]),
+                    "nombre": self.nombres_empleados[c],
+                    "distancia": float(fila[c]),
+                }
+                for c in cols
+                if fila[c] <= tolerance
+            ])
+        return resultados
+
+    def _match_indice(self, probes, tolerance, top_k):
+        """Consulta el índice por filas y se queda con la mejor muestra de cada empleado."""
+        distancias, ids = self.indice.search(probes, k=top_k * FILAS_POR_EMPLEADO)
+        resultados = []
+        for fila_d, fila_ids in zip(distancias.tolist(), ids.tolist()):
+            candidatos = []
+            vistos = set()
+            for distancia, emp_id in zip(fila_d, fila_ids):
+                if emp_id < 0 or distancia > tolerance or len(candidatos) == top_k:
+                    break
+                if emp_id in vistos:
+                    continue
+                vistos.add(emp_id)
+                candidatos.append({"empID": emp_id, "nombre": self._nombre_por_id[emp_id], "distancia": distancia})
+            resultados.append(candidatos)
+        return resultados
+
+    def match(self, probe, tolerance=TOLERANCIA_DEFAULT, top_k=1):
+        """Atajo de match_batch para un solo encoding."""
+        return self.match_batch([probe], tolerance=tolerance, top_k=top_k)[0]
+
+
+def _nuevo_indice(tipo_indice):
+    return None if tipo_indice == ExactIndex.nombre else crear_indice(tipo_indice)
+
+
+# 🔽 Una sola galería por proceso (se carga la primera vez que se usa)
+_galeria = None
+_lock = threading.Lock()
+_ultima_recarga = None
+_recargas = 0
+
+# Intervalo (segundos) con que el hilo de fondo revisa si hay una versión nueva
+RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+_watcher = None
+_detener = threading.Event()
+
+
+def _cargar(base_dir, version=None):
+    if GALLERY_SOURCE == "bd":
+        return FaceGallery.desde_bd()
+    galeria = FaceGallery.desde_store(base_dir, version=version)
+    if galeria is None:
+        print(f"[ADVERTENCIA] No hay modelo publicado en {base_dir}/, galería vacía.")
+        galeria = FaceGallery.vacia()
+    return galeria
+
+
+def get_gallery(base_dir=store.MODEL_DIR):
+    """
+    Galería vigente. Quien la obtiene conserva esa referencia hasta terminar, así
+    una petición en curso no se ve afectada si en medio se publica otra versión.
+    """
+    global _galeria, _ultima_recarga
+    if _galeria is None:
+        with _lock:
+            if _galeria is None:
+                _galeria = _cargar(base_dir)
+                _ultima_recarga = datetime.datetime.now()
+    return _galeria
+
+
+def recargar_si_cambio(base_dir=store.MODEL_DIR):
+    """Carga la versión publicada si es distinta de la vigente. Devuelve True si hubo cambio."""
+    global _galeria, _ultima_recarga, _recargas
+    if GALLERY_SOURCE == "bd":
+        nueva = _cambios_desde_bd()
+        if nueva is None:
+            return False
+    else:
+        version = store.version_actual(base_dir)
+        if version is None or (_galeria is not None and _galeria.version == version):
+            return False
+        # La nueva versión se abre fuera del lock; el reemplazo es una sola asignación
+        nueva = _cargar(base_dir, version=version)
+
+    with _lock:
+        anterior = _galeria.version if _galeria is not None else None
+        _galeria = nueva
+        _ultima_recarga = datetime.datetime.now()
+        _recargas += 1
+    print(f"[MODELO] Galería actualizada: versión {anterior} -> {nueva.version} ({len(nueva)} rostros)")
+    return True
+
+
+def _cambios_desde_bd():
+    """Galería con los empleados modificados en la BD desde la marca vigente, o None si no hubo cambios."""
+    from database.db import SessionLocal
+    from recognition import embeddings_db
+
+    actual = get_gallery()
+    db = SessionLocal()
+    try:
+        emp_ids, encodings, ids, names, marca = embeddings_db.cargar_cambios(db, actual.version)
+    finally:
+        db.close()
+    if not emp_ids:
+        return None
+    return actual.con_cambios(emp_ids, encodings, ids, names, version=marca)
+
+
+def _vigilar(base_dir, intervalo):
+    while not _detener.wait(intervalo):
+        try:
+            recargar_si_cambio(base_dir)
+        except Exception as e:  # Un modelo dañado no debe tumbar el hilo
+            print(f"[ERROR] No se pudo recargar el modelo: {e}")
+
+
+def iniciar_recarga_automatica(base_dir=store.MODEL_DIR, intervalo=RELOAD_INTERVAL):
+    """Arranca (una vez por proceso) el hilo que detecta y aplica versiones nuevas."""
+    global _watcher
+    if _watcher is not None and _watcher.is_alive():
+        return
+    _detener.clear()
+    get_gallery(base_dir)
+    _watcher = threading.Thread(target=_vigilar, args=(base_dir, intervalo), name="gallery-reload", daemon=True)
+    _watcher.start()
+
+
+def detener_recarga_automatica():
+    _detener.set()
+    if _watcher is not None:
+        _watcher.join(timeout=5)
+
+
+def estado_modelo():
+    """Métrica de la versión del modelo en uso por este proceso."""
+    galeria = _galeria
+    return {
+        "origen": GALLERY_SOURCE,
+        "version": str(galeria.version) if galeria is not None and galeria.version is not None else None,
+        "version_publicada": store.version_actual() if GALLERY_SOURCE != "bd" else None,
+        "rostros": len(galeria) if galeria is not None else 0,
+        "empleados": galeria.total_empleados if galeria is not None else 0,
+        "recargas": _recargas,
+        "ultima_recarga": _ultima_recarga.isoformat(timespec="seconds") if _ultima_recarga else None,
+        "recarga_automatica": _watcher is not None and _watcher.is_alive(),
+        "indice": galeria.indice.parametros() if galeria is not None and galeria.indice is not None
+        else {"tipo": ExactIndex.nombre},
+    }
@@ -0,0 +1,211 @@
+"""
+Índices de búsqueda de vecinos para la galería.
+
+- ExactIndex: fuerza bruta vectorizada (recall 100%).
+- IVFIndex: índice invertido por k-means. Los encodings se reparten en `nlist`
+  cubetas y cada probe solo se compara contra las `nprobe` cubetas más cercanas.
+  Más nprobe => más recall y más latencia.
+
+Ambos exponen la misma interfaz: build / insert / delete / search. search devuelve
+(distancias, emp_ids) de forma (P x k), rellenando con inf / -1 si hay menos de k.
+"""
+import os
+
+import numpy as np
+
+DIMENSION = 128
+# Asignación a cubetas por bloques de filas: nunca se arma la matriz completa N x nlist
+FILAS_POR_BLOQUE = 16384
+MAX_ELEMENTOS_BLOQUE = 1 << 24  # ~64 MB en float32 por bloque, aunque nlist sea grande
+
+
+def _distancias(probes, vectores, sq_vectores=None):
+    if sq_vectores is None:
+        sq_vectores = np.einsum("ij,ij->i", vectores, vectores)
+    sq_probes = np.einsum("ij,ij->i", probes, probes)
+    d2 = sq_probes[:, None] + sq_vectores[None, :] - 2.0 * (probes @ vectores.T)
+    np.maximum(d2, 0.0, out=d2)
+    return np.sqrt(d2)
+
+
+def _mas_cercano(datos, centroides):
+    """
+    Índice del centroide más cercano a cada fila, calculado por bloques de filas
+    (con 300k encodings la matriz completa de distancias ocupa varios GB).
+    Para el argmin basta ||c||² - 2·x·c: ||x||² es el mismo en toda la fila.
+    """
+    sq_centroides = np.einsum("ij,ij->i", centroides, centroides)
+    filas = max(1, min(FILAS_POR_BLOQUE, MAX_ELEMENTOS_BLOQUE // max(1, len(centroides))))
+    asignacion = np.empty(len(datos), dtype=np.int64)
+    for inicio in range(0, len(datos), filas):
+        puntaje = datos[inicio:inicio + filas] @ centroides.T
+        puntaje *= -2.0
+        puntaje += sq_centroides[None, :]
+        asignacion[inicio:inicio + filas] = np.argmin(puntaje, axis=1)
+    return asignacion
+
+
+def _top_k(d, ids, k):
+    """Los k menores de cada fila de d (P x N), ordenados."""
+    salida_d = np.full((d.shape[0], k), np.inf, dtype=np.float32)
+    salida_ids = np.full((d.shape[0], k), -1, dtype=np.int64)
+    n = min(k, d.shape[1])
+    if n == 0:
+        return salida_d, salida_ids
+    cols = np.argpartition(d, n - 1, axis=1)[:, :n]
+    filas = np.arange(d.shape[0])[:, None]
+    orden = np.argsort(d[filas, cols], axis=1)
+    cols = cols[filas, orden]
+    salida_d[:, :n] = d[filas, cols]
+    salida_ids[:, :n] = ids[cols]
+    return salida_d, salida_ids
+
+
+class ExactIndex:
+    nombre = "exacto"
+
+    def __init__(self):
+        self.vectores = np.empty((0, DIMENSION), dtype=np.float32)
+        self.ids = np.empty(0, dtype=np.int64)
+        self._sq = np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, encodings, ids):
+        self.vectores = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, DIMENSION))
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self._sq = np.einsum("ij,ij->i", self.vectores, self.vectores)
+        return self
+
+    def insert(self, encodings, ids):
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, DIMENSION)
+        return self.build(np.concatenate([self.vectores, encodings]),
+                          np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)]))
+
+    def delete(self, emp_ids):
+        conservar = ~np.isin(self.ids, list(emp_ids))
+        return self.build(self.vectores[conservar], self.ids[conservar])
+
+    def search(self, probes, k=1):
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, DIMENSION)
+        return _top_k(_distancias(probes, self.vectores, self._sq), self.ids, k)
+
+    def parametros(self):
+        return {"tipo": self.nombre, "total": len(self)}
+
+
+class IVFIndex:
+    nombre = "ivf"
+
+    def __init__(self, nlist=None, nprobe=8, iteraciones=10, muestra_entrenamiento=50000, semilla=0):
+        """
+        - nlist: número de cubetas (None = ~4·sqrt(N), calculado al construir).
+        - nprobe: cubetas revisadas por consulta (recall vs latencia).
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iteraciones = iteraciones
+        self.muestra_entrenamiento = muestra_entrenamiento
+        self.semilla = semilla
+        self.centroides = np.empty((0, DIMENSION), dtype=np.float32)
+        self._vectores = []
+        self._ids = []
+        self._sq = []
+
+    def __len__(self):
+        return int(sum(len(ids) for ids in self._ids))
+
+    def _kmeans(self, datos, k):
+        rng = np.random.default_rng(self.semilla)
+        if len(datos) > self.muestra_entrenamiento:
+            datos = datos[rng.choice(len(datos), self.muestra_entrenamiento, replace=False)]
+        centroides = datos[rng.choice(len(datos), k, replace=False)].copy()
+        for _ in range(self.iteraciones):
+            asignacion = _mas_cercano(datos, centroides)
+            sumas = np.zeros_like(centroides)
+            np.add.at(sumas, asignacion, datos)
+            conteos = np.bincount(asignacion, minlength=k)
+            vacias = conteos == 0
+            centroides[~vacias] = sumas[~vacias] / conteos[~vacias, None]
+            # Las cubetas vacías se reinician con puntos al azar
+            if vacias.any():
+                centroides[vacias] = datos[rng.choice(len(datos), int(vacias.sum()), replace=False)]
+        return centroides
+
+    def _asignar(self, encodings):
+        return _mas_cercano(encodings, self.centroides)
+
+    def build(self, encodings, ids):
+        encodings = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, DIMENSION))
+        ids = np.asarray(ids, dtype=np.int64)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(ids))))
+        nlist = max(1, min(nlist, len(ids)))
+
+        self.centroides = self._kmeans(encodings, nlist) if len(ids) else np.zeros((1, DIMENSION), np.float32)
+        self._vectores = [np.empty((0, DIMENSION), dtype=np.float32) for _ in range(len(self.centroides))]
+        self._ids = [np.empty(0, dtype=np.int64) for _ in range(len(self.centroides))]
+        self._sq = [np.empty(0, dtype=np.float32) for _ in range(len(self.centroides))]
+        if len(ids):
+            self._agregar(encodings, ids)
+        return self
+
+    def _agregar(self, encodings, ids):
+        asignacion = self._asignar(encodings)
+        for cubeta in np.unique(asignacion):
+            mascara = asignacion == cubeta
+            self._vectores[cubeta] = np.concatenate([self._vectores[cubeta], encodings[mascara]])
+            self._ids[cubeta] = np.concatenate([self._ids[cubeta], ids[mascara]])
+            self._sq[cubeta] = np.einsum("ij,ij->i", self._vectores[cubeta], self._vectores[cubeta])
+
+    def insert(self, encodings, ids):
+        """Agrega encodings a la cubeta de su centroide más cercano (sin reentrenar k-means)."""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, DIMENSION)
+        if len(self) == 0:
+            return self.build(encodings, ids)
+        self._agregar(encodings, np.asarray(ids, dtype=np.int64))
+        return self
+
+    def delete(self, emp_ids):
+        emp_ids = list(emp_ids)
+        for cubeta, ids in enumerate(self._ids):
+            conservar = ~np.isin(ids, emp_ids)
+            if not conservar.all():
+                self._vectores[cubeta] = self._vectores[cubeta][conservar]
+                self._ids[cubeta] = ids[conservar]
+                self._sq[cubeta] = self._sq[cubeta][conservar]
+        return self
+
+    def search(self, probes, k=1, nprobe=None):
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, DIMENSION)
+        nprobe = min(nprobe or self.nprobe, len(self.centroides))
+        salida_d = np.full((len(probes), k), np.inf, dtype=np.float32)
+        salida_ids = np.full((len(probes), k), -1, dtype=np.int64)
+        if len(probes) == 0 or len(self) == 0:
+            return salida_d, salida_ids
+
+        cercanas = np.argsort(_distancias(probes, self.centroides), axis=1)[:, :nprobe]
+        for p, cubetas in enumerate(cercanas):
+            vectores = np.concatenate([self._vectores[c] for c in cubetas])
+            if len(vectores) == 0:
+                continue
+            ids = np.concatenate([self._ids[c] for c in cubetas])
+            sq = np.concatenate([self._sq[c] for c in cubetas])
+            d, i = _top_k(_distancias(probes[p:p + 1], vectores, sq), ids, k)
+            salida_d[p], salida_ids[p] = d[0], i[0]
+        return salida_d, salida_ids
+
+    def parametros(self):
+        return {"tipo": self.nombre, "total": len(self), "nlist": len(self.centroides), "nprobe": self.nprobe}
+
+
+def crear_indice(tipo=None, **kwargs):
+    """Crea el índice configurado (GALLERY_INDEX=exacto|ivf, IVF_NLIST, IVF_NPROBE)."""
+    tipo = tipo or os.getenv("GALLERY_INDEX", "exacto")
+    if tipo == ExactIndex.nombre:
+        return ExactIndex()
+    if tipo == IVFIndex.nombre:
+        kwargs.setdefault("nlist", int(os.getenv("IVF_NLIST", "0")) or None)
+        kwargs.setdefault("nprobe", int(os.getenv("IVF_NPROBE", "8")))
+        return IVFIndex(**kwargs)
+    raise ValueError(f"Índice no válido: {tipo}. Usa: exacto o ivf")
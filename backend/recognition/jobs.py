@@ -0,0 +1,150 @@
+"""
+Cola de trabajos en segundo plano (captura, entrenamiento, etc.).
+
+Los trabajos corren en hilos de larga duración dentro del proceso de la API, así
+que OpenCV, dlib, el clasificador Haar y los modelos se cargan una sola vez. Las
+peticiones solo encolan el trabajo y devuelven su ID; el avance se consulta en
+/trabajos/{job_id}.
+"""
+import datetime
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_HISTORIAL = 200  # Trabajos terminados que se conservan para consulta
+
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+COMPLETADO = "completado"
+ERROR = "error"
+CANCELADO = "cancelado"
+TERMINADOS = (COMPLETADO, ERROR, CANCELADO)
+
+
+class Job:
+    def __init__(self, tipo, descripcion=None):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.descripcion = descripcion
+        self.estado = PENDIENTE
+        self.progreso = 0.0
+        self.mensaje = None
+        self.resultado = None
+        self.error = None
+        self.creado = datetime.datetime.now()
+        self.iniciado = None
+        self.terminado = None
+        self._cancelar = threading.Event()
+
+    def actualizar(self, progreso=None, mensaje=None):
+        """Lo llama el trabajo para informar avance (progreso entre 0 y 1)."""
+        if progreso is not None:
+            self.progreso = max(0.0, min(1.0, float(progreso)))
+        if mensaje is not None:
+            self.mensaje = mensaje
+
+    def cancelado(self):
+        """El trabajo debe revisarlo periódicamente y terminar en cuanto sea True."""
+        return self._cancelar.is_set()
+
+    def to_dict(self):
+        def iso(fecha):
+            return fecha.isoformat(timespec="seconds") if fecha else None
+
+        return {
+            "job_id": self.id,
+            "tipo": self.tipo,
+            "descripcion": self.descripcion,
+            "estado": self.estado,
+            "progreso": round(self.progreso, 3),
+            "mensaje": self.mensaje,
+            "resultado": self.resultado,
+            "error": self.error,
+            "creado": iso(self.creado),
+            "iniciado": iso(self.iniciado),
+            "terminado": iso(self.terminado),
+        }
+
+
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = workers
+        self._pool = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, tipo, fn, *args, descripcion=None, **kwargs):
+        """
+        Encola fn(job, *args, **kwargs) y devuelve el Job inmediatamente.
+        Lo que devuelva fn queda en job.resultado.
+        """
+        job = Job(tipo, descripcion)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._jobs[job.id] = job
+            self._purgar()
+        self._pool.submit(self._ejecutar, job, fn, args, kwargs)
+        return job
+
+    def _ejecutar(self, job, fn, args, kwargs):
+        # ⚠️ terminado se asigna siempre antes del estado final: _purgar ordena por esa fecha
+        if job.cancelado():
+            job.terminado = datetime.datetime.now()
+            job.estado = CANCELADO
+            return
+
+        job.estado = EN_PROCESO
+        job.iniciado = datetime.datetime.now()
+        estado = ERROR
+        try:
+            job.resultado = fn(job, *args, **kwargs)
+            estado = CANCELADO if job.cancelado() else COMPLETADO
+        except Exception as e:
+            job.error = str(e)
+            print(f"[ERROR] Trabajo {job.tipo} ({job.id}): {e}")
+        finally:
+            job.terminado = datetime.datetime.now()
+            if estado == COMPLETADO:
+                job.progreso = 1.0
+            job.estado = estado
+
+    def obtener(self, job_id):
+        return self._jobs.get(job_id)
+
+    def listar(self, tipo=None):
+        with self._lock:
+            jobs = list(self._jobs.values())  # enviar() inserta y purga desde otros hilos
+        jobs.sort(key=lambda j: j.creado, reverse=True)
+        return [j for j in jobs if tipo is None or j.tipo == tipo]
+
+    def cancelar(self, job_id):
+        """Marca el trabajo para cancelación. Devuelve False si no existe o ya terminó."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.estado in TERMINADOS:
+            return False
+        job._cancelar.set()
+        return True
+
+    def _purgar(self):
+        terminados = [j for j in self._jobs.values() if j.estado in TERMINADOS]
+        if len(terminados) > MAX_HISTORIAL:
+            terminados.sort(key=lambda j: j.terminado)
+            for job in terminados[:len(terminados) - MAX_HISTORIAL]:
+                del self._jobs[job.id]
+
+    def detener(self):
+        with self._lock:
+            pendientes = list(self._jobs.values())
+        for job in pendientes:
+            job._cancelar.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# 🔽 Un gestor de trabajos compartido por todo el proceso de la API
+jobs = JobManager()
@@ -0,0 +1,212 @@
+"""
+Métricas del proceso de la API en formato de texto de Prometheus (GET /metrics).
+
+- Histogramas por etapa del reconocimiento (decodificar, detectar, codificar,
+  comparar, cola, total) y del registro de eventos (snapshot, inserción en BD).
+- Contadores de solicitudes por resultado.
+- Valores instantáneos que se leen al momento de exponer: profundidad de colas,
+  tamaño de la galería, versión del modelo y uso del pool de conexiones.
+
+Los tiempos del pipeline se miden dentro de los workers y llegan en el dict
+`tiempos`; aquí solo se acumulan, así que observar no cuesta más que un lock.
+"""
+import threading
+
+# Límites en segundos: de 0.5 ms a 10 s
+BUCKETS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_LOTE = (1, 2, 4, 8, 16, 32)
+
+# Claves del dict `tiempos` del pipeline/ejecutor -> etiqueta de etapa
+ETAPAS = {
+    "decodificar_ms": "decodificar",
+    "detectar_ms": "detectar",
+    "codificar_ms": "codificar",
+    "comparar_ms": "comparar",
+    "cola_ms": "cola",
+    "total_ms": "total",
+}
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores))
+    return "{" + pares + "}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, buckets=BUCKETS_SEGUNDOS, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(buckets)
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}  # valores de etiquetas -> [conteos por bucket, suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        for valores, (conteos, suma, total) in sorted(series.items()):
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos + [total]):
+                etiquetas = _etiquetas(self.etiquetas + ("le",), valores + (_numero(limite),))
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {conteo}")
+            etiquetas = _etiquetas(self.etiquetas, valores)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {suma}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {total}")
+        return lineas
+
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *etiquetas, cantidad=1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + cantidad
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            valores = dict(self._valores)
+        for etiquetas, valor in sorted(valores.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {valor}")
+        return lineas
+
+
+etapa_segundos = Histograma(
+    "reconocimiento_etapa_segundos", "Tiempo por etapa del reconocimiento, por lote", etiquetas=("etapa",)
+)
+lote_frames = Histograma("reconocimiento_lote_frames", "Frames por lote procesado", buckets=BUCKETS_LOTE)
+solicitudes = Contador("reconocimiento_solicitudes_total", "Frames validados por resultado", etiquetas=("resultado",))
+coincidencias_galeria = Contador(
+    "reconocimiento_coincidencias_total", "Accesos permitidos por galería donde se resolvieron (departamento o global)",
+    etiquetas=("galeria",)
+)
+eventos_segundos = Histograma(
+    "eventos_etapa_segundos", "Tiempo del registro de eventos de acceso", etiquetas=("etapa",)
+)
+
+
+def observar_tiempos(tiempos, frames=None):
+    """Acumula un dict `tiempos` (en ms) del pipeline/ejecutor; se llama una vez por lote."""
+    for clave, etapa in ETAPAS.items():
+        if clave in tiempos:
+            etapa_segundos.observar(tiempos[clave] / 1000.0, etapa)
+    if frames:
+        lote_frames.observar(frames)
+
+
+def contar_resultado(resultado):
+    if resultado.get("error"):
+        solicitudes.incrementar("error")
+    else:
+        solicitudes.incrementar("permitido" if resultado.get("access") else "denegado")
+    if resultado.get("galeria"):
+        coincidencias_galeria.incrementar(resultado["galeria"])
+
+
+# --- Valores instantáneos (se calculan al exponer) ---
+
+def _gauge(nombre, ayuda, muestras, tipo="gauge"):
+    """muestras: [(dict de etiquetas, valor)]"""
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+    for etiquetas, valor in muestras:
+        if valor is None:
+            continue
+        lineas.append(f"{nombre}{_etiquetas(tuple(etiquetas), tuple(etiquetas.values()))} {_numero(valor)}")
+    return lineas
+
+
+def _pool(nombre_engine, engine):
+    """Uso del QueuePool de SQLAlchemy (SQLite usa otro pool y no reporta nada)."""
+    if engine is None:
+        return []
+    pool = getattr(engine, "sync_engine", engine).pool
+    muestras = []
+    for estado, metodo in (("tamano", "size"), ("en_uso", "checkedout"), ("libres", "checkedin"), ("overflow", "overflow")):
+        if hasattr(pool, metodo):
+            muestras.append(({"engine": nombre_engine, "estado": estado}, getattr(pool, metodo)()))
+    return muestras
+
+
+def _instantaneas():
+    from database import db
+    from database.cache import estado_caches
+    from recognition.batcher import batcher
+    from recognition.enrolamiento import sesiones
+    from recognition.eventos import eventos
+    from recognition.executor import executor
+    from recognition.gallery import estado_modelo
+
+    lineas = []
+    lineas += _gauge("reconocimiento_cola_frames", "Frames esperando formar lote", [({}, batcher.pendientes)])
+    estado = executor.estado()
+    lineas += _gauge("reconocimiento_lotes_en_vuelo", "Lotes en el pool de procesos", [({}, estado["en_vuelo"])])
+    lineas += _gauge("reconocimiento_lotes_capacidad", "Lotes admitidos a la vez", [({}, estado["capacidad"])])
+    lineas += _gauge("reconocimiento_rechazados_total", "Trabajos rechazados por saturación",
+                     [({}, estado["rechazados"])], tipo="counter")
+    lineas += _gauge("reconocimiento_expirados_total", "Trabajos que superaron el timeout",
+                     [({}, estado["expirados"])], tipo="counter")
+
+    modelo = estado_modelo()
+    lineas += _gauge("galeria_rostros", "Encodings en la galería cargada", [({}, modelo.get("rostros"))])
+    lineas += _gauge("galeria_empleados", "Empleados en la galería cargada", [({}, modelo.get("empleados"))])
+    lineas += _gauge("galeria_recargas_total", "Recargas de la galería", [({}, modelo.get("recargas"))], tipo="counter")
+    lineas += _gauge("modelo_info", "Versión del modelo cargada y publicada", [(
+        {"version": modelo.get("version"), "publicada": modelo.get("version_publicada"), "origen": modelo.get("origen")}, 1
+    )])
+
+    pendientes = eventos.estado()
+    lineas += _gauge("eventos_cola", "Eventos de acceso esperando escritura", [({}, pendientes["pendientes"])])
+    lineas += _gauge("eventos_total", "Eventos de acceso por estado", [
+        ({"estado": k}, pendientes[k]) for k in ("registrados", "descartados", "escritos", "errores")
+    ], tipo="counter")
+
+    enrolamiento = sesiones.estado()
+    lineas += _gauge("enrolamiento_sesiones", "Sesiones de enrolamiento activas",
+                     [({"con_imagen": "si"}, enrolamiento["con_imagen"]),
+                      ({"con_imagen": "no"}, enrolamiento["activas"] - enrolamiento["con_imagen"])])
+
+    lineas += _gauge("bd_pool_conexiones", "Conexiones del pool de SQLAlchemy",
+                     _pool("sync", db.engine) + _pool("async", db._async_engine))
+
+    caches = estado_caches()
+    lineas += _gauge("catalogo_cache_total", "Aciertos y fallos de la caché de catálogos", [
+        ({"cache": c["cache"], "resultado": r}, c[campo]) for c in caches for r, campo in (("acierto", "aciertos"), ("fallo", "fallos"))
+    ], tipo="counter")
+    return lineas
+
+
+def exponer():
+    """Texto completo para /metrics."""
+    lineas = []
+    for metrica in (etapa_segundos, lote_frames, solicitudes, coincidencias_galeria, eventos_segundos):
+        lineas += metrica.exponer()
+    lineas += _instantaneas()
+    return "\n".join(lineas) + "\n"
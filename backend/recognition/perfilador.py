@@ -0,0 +1,85 @@
+"""
+Perfilador por muestreo para solicitudes individuales.
+
+Mientras corre la función, un hilo toma cada `intervalo_ms` la pila del hilo que la
+ejecuta (sys._current_frames) y cuenta cuántas veces aparece cada función. Como no
+instrumenta cada llamada (a diferencia de cProfile), el costo es bajo y se puede
+activar en producción para una solicitud puntual.
+
+Se usa dentro del worker de reconocimiento, que es donde se gasta el tiempo:
+    executor.ejecutar(perfilar, reconocer_lote_con_tiempos, frames)
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PERFIL_INTERVALO_MS = float(os.getenv("PERFIL_INTERVALO_MS", "2"))
+PERFIL_TOP = int(os.getenv("PERFIL_TOP", "25"))
+
+
+def _nombre(frame):
+    codigo = frame.f_code
+    return f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}:{frame.f_lineno}"
+
+
+class Muestreador:
+    def __init__(self, hilo_id, intervalo_ms=PERFIL_INTERVALO_MS):
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo_ms / 1000.0
+        self.muestras = 0
+        self.propias = Counter()     # La función que estaba ejecutando (hoja de la pila)
+        self.acumuladas = Counter()  # Cualquier función presente en la pila
+        self.pilas = Counter()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._ciclo, name="perfilador", daemon=True)
+
+    def _ciclo(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            if frame is None:
+                continue
+            pila = []
+            while frame is not None:
+                pila.append(_nombre(frame))
+                frame = frame.f_back
+            self.muestras += 1
+            self.propias[pila[0]] += 1
+            self.acumuladas.update(set(pila))
+            self.pilas[";".join(reversed(pila))] += 1
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._detener.set()
+        self._hilo.join()
+
+    def resumen(self, top=PERFIL_TOP):
+        def porcentajes(contador):
+            return [
+                {"funcion": nombre, "muestras": n, "porcentaje": round(100.0 * n / self.muestras, 1)}
+                for nombre, n in contador.most_common(top)
+            ]
+
+        return {
+            "muestras": self.muestras,
+            "intervalo_ms": self.intervalo * 1000,
+            "propias": porcentajes(self.propias),
+            "acumuladas": porcentajes(self.acumuladas),
+            # Formato "collapsed" (una línea por pila) para generar flame graphs
+            "pilas": [f"{pila} {n}" for pila, n in self.pilas.most_common(top)],
+        }
+
+
+def perfilar(fn, *args):
+    """Ejecuta fn(*args) muestreando su pila. Devuelve (resultado, perfil)."""
+    inicio = time.perf_counter()
+    with Muestreador(threading.get_ident()) as muestreador:
+        resultado = fn(*args)
+    perfil = muestreador.resumen()
+    perfil["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+    perfil["pid"] = os.getpid()
+    return resultado, perfil
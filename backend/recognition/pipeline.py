@@ -0,0 +1,118 @@
+"""
+Pipeline de reconocimiento por lotes: decodificar -> detectar -> codificar -> comparar.
+
+Todos los rostros encontrados en todos los frames del lote se comparan contra la
+galería en una sola llamada vectorizada.
+"""
+import time
+
+import cv2
+import numpy as np
+
+from recognition.detection import detectar, codificar
+from recognition.gallery import get_gallery, TOLERANCIA_DEFAULT
+from recognition.shards import match_por_puerta
+
+
+def decodificar(image_bytes):
+    """JPEG/PNG en bytes -> imagen RGB, o None si no se pudo decodificar."""
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def reconocer_lote(frames, tolerance=TOLERANCIA_DEFAULT, config=None, dispositivos=None):
+    """
+    Recibe una lista de imágenes (bytes) y devuelve un resultado por imagen:
+    {"access": True, "empleado": ..., "empID": ..., "distancia": ...} o {"access": False}.
+    `config` es un DetectionConfig (por defecto el configurado por variables de entorno).
+    `dispositivos` es el DeviceID de la puerta de cada imagen (o None): con puerta se
+    compara primero contra el shard de su departamento (recognition/shards.py).
+    """
+    return reconocer_lote_con_tiempos(frames, tolerance, config, dispositivos)[0]
+
+
+def _resultado(candidatos, galeria=None):
+    if not candidatos:
+        return {"access": False}
+    resultado = {
+        "access": True,
+        "empleado": candidatos[0]["nombre"],
+        "empID": candidatos[0]["empID"],
+        "distancia": candidatos[0]["distancia"],
+    }
+    if galeria is not None:
+        resultado["galeria"] = galeria
+    return resultado
+
+
+def _comparar(encodings, dispositivos, tolerance):
+    """[(candidatos, galería donde se resolvió o None)] por encoding."""
+    galeria = get_gallery()
+    if dispositivos is None or all(d is None for d in dispositivos):
+        return [(candidatos, None) for candidatos in galeria.match_batch(encodings, tolerance=tolerance)]
+    return match_por_puerta(galeria, encodings, dispositivos, tolerance)
+
+
+def reconocer_lote_con_tiempos(frames, tolerance=TOLERANCIA_DEFAULT, config=None, dispositivos=None):
+    """Igual que reconocer_lote, pero devuelve además los milisegundos por etapa del lote."""
+    tiempos = {"decodificar_ms": 0.0, "detectar_ms": 0.0, "codificar_ms": 0.0, "comparar_ms": 0.0}
+    resultados = [{"access": False} for _ in frames]
+
+    encodings = []
+    origen = []  # índice del frame al que pertenece cada encoding
+    for i, image_bytes in enumerate(frames):
+        t0 = time.perf_counter()
+        rgb_frame = decodificar(image_bytes)
+        t1 = time.perf_counter()
+        tiempos["decodificar_ms"] += (t1 - t0) * 1000
+        if rgb_frame is None:
+            resultados[i]["error"] = "Imagen no válida"
+            continue
+
+        # Detección en cascada sobre la imagen reducida; sin rostros no se codifica nada
+        face_locations = detectar(rgb_frame, config)
+        t2 = time.perf_counter()
+        frame_encodings = codificar(rgb_frame, face_locations, config)
+        t3 = time.perf_counter()
+        tiempos["detectar_ms"] += (t2 - t1) * 1000
+        tiempos["codificar_ms"] += (t3 - t2) * 1000
+
+        for encoding in frame_encodings:
+            encodings.append(encoding)
+            origen.append(i)
+
+    if not encodings:
+        return resultados, tiempos
+
+    # ✅ Una sola comparación contra la galería (o por shard de puerta) para todo el lote
+    t0 = time.perf_counter()
+    puertas = [dispositivos[i] for i in origen] if dispositivos is not None else None
+    for i, (candidatos, galeria) in zip(origen, _comparar(encodings, puertas, tolerance)):
+        if candidatos and not resultados[i]["access"]:
+            resultados[i] = _resultado(candidatos, galeria)
+    tiempos["comparar_ms"] = (time.perf_counter() - t0) * 1000
+    return resultados, tiempos
+
+
+def reconocer_frame_rastreado(rgb_frame, tracker, tolerance=TOLERANCIA_DEFAULT, config=None, dispositivo=None):
+    """
+    Reconocimiento de un frame de cámara usando un FaceTracker: solo se codifican
+    los tracks nuevos o con identidad vencida; el resto reutiliza su resultado.
+    `dispositivo` es el DeviceID de la cámara, para comparar primero contra su shard.
+    Devuelve [(track, caja)] de los rostros visibles.
+    """
+    ahora = time.monotonic()
+    cajas = detectar(rgb_frame, config)
+    tracks = tracker.actualizar(cajas, ahora)
+
+    pendientes = [i for i, track in enumerate(tracks) if tracker.necesita_codificar(track, ahora)]
+    if pendientes:
+        encodings = codificar(rgb_frame, [cajas[i] for i in pendientes], config)
+        coincidencias = _comparar(encodings, [dispositivo] * len(encodings), tolerance)
+        for i, (candidatos, galeria) in zip(pendientes, coincidencias):
+            tracker.asignar(tracks[i], _resultado(candidatos, galeria), ahora)
+
+    return list(zip(tracks, cajas))
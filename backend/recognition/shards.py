@@ -0,0 +1,136 @@
+"""
+Shards de la galería por departamento (grupo de acceso de cada puerta).
+
+DEVICES.Department_d dice qué departamento atiende cada puerta y ohem.dept a qué
+departamento pertenece cada empleado. Un rostro que llega por una puerta se
+compara primero solo contra los empleados de ese departamento (unas decenas o
+cientos de encodings en lugar de toda la galería) y solo si no hay coincidencia
+se compara contra la galería global. Con SHARDS_FALLBACK_GLOBAL=0 la puerta solo
+acepta a su departamento.
+
+El mapa puerta -> departamento -> empleados se lee de la BD en cada worker y se
+refresca cada SHARDS_REFRESCO segundos. Los shards se construyen la primera vez
+que se usan y se descartan solos cuando cambia la galería o el mapa.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+SHARDS_HABILITADOS = os.getenv("GALLERY_SHARDS", "1") == "1"
+SHARDS_FALLBACK_GLOBAL = os.getenv("SHARDS_FALLBACK_GLOBAL", "1") == "1"
+SHARDS_REFRESCO = float(os.getenv("SHARDS_REFRESCO", "300"))
+
+SHARD = "departamento"
+GLOBAL = "global"
+
+
+class MapaAccesos:
+    def __init__(self, refresco=SHARDS_REFRESCO):
+        self.refresco = refresco
+        self.dispositivos = {}  # DeviceID -> Department_d
+        self.miembros = {}  # Department_d -> empIDs activos
+        self.generacion = 0
+        self._cargado = None
+        self._lock = threading.Lock()
+
+    def _cargar(self):
+        from sqlalchemy import select
+
+        from database.db import SessionLocal
+        from models.device import Device
+        from models.employee import Employee
+
+        db = SessionLocal()
+        try:
+            # Department_d negativo o nulo = puerta sin departamento (todos pasan por la galería global)
+            dispositivos = dict(db.execute(
+                select(Device.DeviceID, Device.Department_d)
+                .where(Device.Status == "Activo", Device.Department_d >= 0)
+            ).all())
+            miembros = {}
+            departamentos = sorted(set(dispositivos.values()))
+            if departamentos:
+                for dept, emp_id in db.execute(
+                    select(Employee.dept, Employee.empID)
+                    .where(Employee.dept.in_(departamentos), Employee.Active == "Y")
+                ):
+                    miembros.setdefault(dept, []).append(emp_id)
+        finally:
+            db.close()
+        return dispositivos, {dept: np.asarray(ids, dtype=np.int64) for dept, ids in miembros.items()}
+
+    def actualizar(self):
+        """Recarga el mapa si venció. Si la BD falla se sigue con el mapa anterior."""
+        ahora = time.monotonic()
+        if self._cargado is not None and ahora - self._cargado < self.refresco:
+            return
+        with self._lock:
+            if self._cargado is not None and ahora - self._cargado < self.refresco:
+                return
+            try:
+                dispositivos, miembros = self._cargar()
+            except Exception as e:
+                print(f"[ERROR] No se pudo leer el mapa de puertas y departamentos: {e}")
+            else:
+                self.dispositivos, self.miembros = dispositivos, miembros
+                self.generacion += 1
+            self._cargado = ahora
+
+    def departamento(self, dispositivo):
+        if dispositivo is None:
+            return None
+        self.actualizar()
+        return self.dispositivos.get(dispositivo)
+
+
+mapa = MapaAccesos()
+_shards = {}  # Department_d -> (galería, generación del mapa, shard)
+_lock = threading.Lock()
+
+
+def obtener_shard(galeria, dept):
+    """Shard del departamento para esta galería; se reconstruye si cambió la galería o el mapa."""
+    guardado = _shards.get(dept)
+    if guardado is not None and guardado[0] is galeria and guardado[1] == mapa.generacion:
+        return guardado[2]
+    with _lock:
+        guardado = _shards.get(dept)
+        if guardado is not None and guardado[0] is galeria and guardado[1] == mapa.generacion:
+            return guardado[2]
+        shard = galeria.subconjunto(mapa.miembros.get(dept, ()))
+        _shards[dept] = (galeria, mapa.generacion, shard)
+        return shard
+
+
+def match_por_puerta(galeria, encodings, dispositivos, tolerance, top_k=1):
+    """
+    Como galeria.match_batch, pero cada encoding trae el DeviceID de su puerta (o None).
+    Devuelve, por encoding, (candidatos, galería donde se resolvió: SHARD o GLOBAL).
+    """
+    resultados = [None] * len(encodings)
+    globales = []
+
+    por_departamento = {}
+    for i, dispositivo in enumerate(dispositivos):
+        dept = mapa.departamento(dispositivo) if SHARDS_HABILITADOS else None
+        if dept is None:
+            globales.append(i)
+        else:
+            por_departamento.setdefault(dept, []).append(i)
+
+    for dept, indices in por_departamento.items():
+        shard = obtener_shard(galeria, dept)
+        coincidencias = shard.match_batch([encodings[i] for i in indices], tolerance=tolerance, top_k=top_k)
+        for i, candidatos in zip(indices, coincidencias):
+            if candidatos or not SHARDS_FALLBACK_GLOBAL:
+                resultados[i] = (candidatos, SHARD)
+            else:
+                globales.append(i)  # ✅ Sin coincidencia en su puerta: se intenta contra todos
+
+    if globales:
+        coincidencias = galeria.match_batch([encodings[i] for i in globales], tolerance=tolerance, top_k=top_k)
+        for i, candidatos in zip(globales, coincidencias):
+            resultados[i] = (candidatos, GLOBAL)
+    return resultados
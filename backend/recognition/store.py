@@ -0,0 +1,163 @@
+"""
+Almacén versionado de encodings en disco.
+
+Estructura:
+    modelo/
+        CURRENT              -> nombre de la versión publicada (p. ej. "v000003")
+        v000003/
+            encodings.npy    matriz float32 (N x 128), ordenada por empID
+            ids.npy          int64 (N)
+            index.json       cabecera: versión, formato, dimensión, total y nombres
+            manifest.json    firmas del dataset usadas por el entrenamiento incremental
+
+Cada versión se escribe completa en un directorio temporal y se publica con un
+rename atómico; después se reemplaza CURRENT (también con rename). Un lector nunca
+ve una versión a medio escribir, y varios procesos pueden abrir la misma versión
+con np.load(mmap_mode="r") compartiendo las páginas del sistema operativo.
+"""
+import datetime
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+MODEL_DIR = "modelo"
+FORMATO = 1
+DIMENSION = 128
+VERSIONES_A_CONSERVAR = 3
+
+
+def _nombre_version(version):
+    return f"v{version:06d}"
+
+
+def version_actual(base_dir=MODEL_DIR):
+    """Número de la versión publicada, o None si todavía no hay modelo."""
+    try:
+        with open(os.path.join(base_dir, "CURRENT"), "r", encoding="utf-8") as f:
+            return int(f.read().strip().lstrip("v"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _versiones(base_dir):
+    if not os.path.isdir(base_dir):
+        return []
+    versiones = []
+    for nombre in os.listdir(base_dir):
+        if nombre.startswith("v") and nombre[1:].isdigit():
+            versiones.append(int(nombre[1:]))
+    return sorted(versiones)
+
+
+def publicar(encodings, ids, names, manifiesto=None, base_dir=MODEL_DIR):
+    """Escribe una nueva versión del modelo y la marca como actual. Devuelve su número."""
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, DIMENSION)
+    ids = np.asarray(ids, dtype=np.int64)
+    names = list(names)
+
+    # ✅ Se guarda ordenado por empleado para que la galería pueda usarlo sin copiar
+    orden = np.argsort(ids, kind="stable")
+    encodings = np.ascontiguousarray(encodings[orden])
+    ids = ids[orden]
+    names = [names[i] for i in orden]
+
+    os.makedirs(base_dir, exist_ok=True)
+    tmp_dir = os.path.join(base_dir, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        np.save(os.path.join(tmp_dir, "encodings.npy"), encodings)
+        np.save(os.path.join(tmp_dir, "ids.npy"), ids)
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifiesto or {}, f, indent=2, ensure_ascii=False)
+
+        # Reintenta si otro entrenamiento publicó el mismo número de versión
+        while True:
+            version = max(_versiones(base_dir) + [version_actual(base_dir) or 0]) + 1
+            with open(os.path.join(tmp_dir, "index.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": version,
+                    "formato": FORMATO,
+                    "dimension": DIMENSION,
+                    "total": int(len(ids)),
+                    "creado": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "names": names,
+                }, f, ensure_ascii=False)
+            try:
+                os.rename(tmp_dir, os.path.join(base_dir, _nombre_version(version)))
+                break
+            except OSError:
+                if not os.path.isdir(os.path.join(base_dir, _nombre_version(version))):
+                    raise
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _avanzar_current(base_dir, version)
+    limpiar_versiones(base_dir)
+    return version
+
+
+def _avanzar_current(base_dir, version):
+    """
+    Apunta CURRENT a `version` solo si es mayor que la publicada: un entrenamiento
+    lento que termina después de otro más nuevo no debe hacer retroceder el modelo.
+    Tras escribir se vuelve a revisar, por si otro proceso escribió en medio una menor.
+    """
+    while (version_actual(base_dir) or 0) < version:
+        current_tmp = os.path.join(base_dir, f"CURRENT.{uuid.uuid4().hex}")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(_nombre_version(version))
+        os.replace(current_tmp, os.path.join(base_dir, "CURRENT"))
+        version = max(_versiones(base_dir) + [version])
+
+
+def cargar(base_dir=MODEL_DIR, version=None, mmap=True):
+    """
+    Abre una versión del modelo (la actual por defecto).
+    Con mmap=True la matriz se mapea en memoria en solo lectura (carga sin copia).
+    """
+    if version is None:
+        version = version_actual(base_dir)
+    if version is None:
+        return None
+
+    version_dir = os.path.join(base_dir, _nombre_version(version))
+    with open(os.path.join(version_dir, "index.json"), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("formato") != FORMATO or index.get("dimension") != DIMENSION:
+        raise ValueError(f"Formato de modelo no soportado en {version_dir}")
+
+    modo = "r" if mmap else None
+    return {
+        "version": index["version"],
+        "encodings": np.load(os.path.join(version_dir, "encodings.npy"), mmap_mode=modo),
+        "ids": np.load(os.path.join(version_dir, "ids.npy"), mmap_mode=modo),
+        "names": index["names"],
+    }
+
+
+def cargar_manifiesto(base_dir=MODEL_DIR, version=None):
+    if version is None:
+        version = version_actual(base_dir)
+    if version is None:
+        return {}
+    ruta = os.path.join(base_dir, _nombre_version(version), "manifest.json")
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def limpiar_versiones(base_dir=MODEL_DIR, conservar=VERSIONES_A_CONSERVAR):
+    """
+    Borra versiones antiguas. Se conservan las últimas `conservar` para que los
+    procesos que aún las tengan mapeadas terminen sus peticiones en curso.
+    """
+    actual = version_actual(base_dir)
+    for version in _versiones(base_dir)[:-conservar]:
+        if version != actual:
+            shutil.rmtree(os.path.join(base_dir, _nombre_version(version)), ignore_errors=True)
@@ -0,0 +1,105 @@
+"""
+Trabajos que se ejecutan en la cola de recognition/jobs.py.
+
+Cada función recibe el Job como primer argumento para informar avance y revisar
+si fue cancelado. Los módulos de tools/ se importan la primera vez que se usan y
+quedan cargados en el proceso para los siguientes trabajos.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+CAPTURA_VENTANA = os.getenv("CAPTURA_VENTANA", "0") == "1"  # cv2.imshow fuera del hilo principal no es seguro en macOS
+TRAIN_WORKERS = int(os.getenv("TRAIN_WORKERS", "1"))
+EMBEDDINGS_BD = os.getenv("EMBEDDINGS_BD", "0") == "1"  # Escribir también en ohem_embeddings
+
+# Entrenar, eliminar e importar leen el modelo vigente, lo modifican y publican uno nuevo:
+# si dos corren a la vez, el que publica último pisa los cambios del otro.
+_modelo_lock = threading.Lock()
+
+
+@contextmanager
+def _modelo_exclusivo(job):
+    """Un solo trabajo que escribe el modelo a la vez; los demás esperan su turno."""
+    if not _modelo_lock.acquire(blocking=False):
+        job.actualizar(mensaje="Esperando a que termine otro trabajo sobre el modelo...")
+        _modelo_lock.acquire()
+    try:
+        yield
+    finally:
+        _modelo_lock.release()
+
+
+def tarea_captura(job, emp_id, nombre, sesion_id, entrenar=True):
+    """
+    Captura los rostros del empleado con la cámara de su sesión de enrolamiento,
+    deja la mejor muestra en la sesión y, si se pide, entrena de forma incremental.
+    """
+    from recognition.enrolamiento import sesiones
+    from tools.captura_rostros import capturar_rostros
+
+    sesion = sesiones.obtener(sesion_id)
+    if sesion is None:
+        raise RuntimeError("La sesión de enrolamiento venció o no existe.")
+
+    # La captura ocupa la primera mitad del avance y el entrenamiento la segunda
+    peso = 0.5 if entrenar else 1.0
+    try:
+        capturas = capturar_rostros(
+            emp_id, nombre,
+            mostrar=CAPTURA_VENTANA,
+            progreso=lambda p, msg: job.actualizar(p * peso, msg),
+            cancelado=job.cancelado,
+            fuente=sesion.fuente,
+            referencia=lambda jpeg: sesiones.guardar_imagen(sesion_id, jpeg),
+        )
+    finally:
+        sesiones.fin_captura(sesion)
+    if job.cancelado():
+        return {"capturas": capturas}
+    if capturas == 0:
+        raise RuntimeError("No se detectó ningún rostro.")
+    sesion.capturas = capturas
+
+    resultado = {"capturas": capturas, "sesion_id": sesion_id}
+    if entrenar:
+        resultado["version_modelo"] = tarea_entrenamiento(job, incremental=True, inicio=0.5)["version_modelo"]
+    return resultado
+
+
+def tarea_entrenamiento(job, incremental=False, inicio=0.0):
+    from tools.entrenar_modelo import entrenar_modelo
+
+    with _modelo_exclusivo(job):
+        version = entrenar_modelo(
+            incremental=incremental,
+            workers=TRAIN_WORKERS,
+            progreso=lambda p, msg: job.actualizar(inicio + p * (1.0 - inicio), msg),
+            cancelado=job.cancelado,
+            guardar_bd=EMBEDDINGS_BD,
+        )
+    return {"version_modelo": version}
+
+
+def tarea_eliminar_del_modelo(job, emp_id):
+    from tools.entrenar_modelo import eliminar_empleado
+
+    with _modelo_exclusivo(job):
+        return {"version_modelo": eliminar_empleado(emp_id, guardar_bd=EMBEDDINGS_BD)}
+
+
+def tarea_importacion(job, filas, ruta_zip):
+    """Importación masiva de empleados; el reporte por fila queda en job.resultado."""
+    from tools.importar_empleados import importar_empleados
+
+    try:
+        with _modelo_exclusivo(job):
+            return importar_empleados(
+                filas, ruta_zip,
+                workers=TRAIN_WORKERS,
+                guardar_bd=EMBEDDINGS_BD,
+                progreso=job.actualizar,
+                cancelado=job.cancelado,
+            )
+    finally:
+        os.remove(ruta_zip)
@@ -0,0 +1,102 @@
+"""
+Seguimiento de rostros entre frames de una misma cámara.
+
+Las cajas detectadas en cada frame se asocian con los tracks existentes por IoU.
+Un track conserva la identidad ya decidida y solo se vuelve a codificar cuando es
+nuevo o cuando su identificación es más vieja que el tiempo de reverificación.
+Mientras la misma persona sigue frente a la cámara no se paga el encoding de dlib
+en cada frame.
+"""
+import itertools
+import time
+
+import numpy as np
+
+
+def iou(cajas_a, cajas_b):
+    """IoU (A x B) entre cajas en formato (top, right, bottom, left)."""
+    a = np.asarray(cajas_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(cajas_b, dtype=np.float32).reshape(-1, 4)
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    interseccion = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 1] - a[:, 3]) * (a[:, 2] - a[:, 0])
+    area_b = (b[:, 1] - b[:, 3]) * (b[:, 2] - b[:, 0])
+    union = area_a[:, None] + area_b[None, :] - interseccion
+    return np.where(union > 0, interseccion / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    _ids = itertools.count(1)
+
+    def __init__(self, caja):
+        self.id = next(Track._ids)
+        self.caja = caja
+        self.resultado = None        # Último resultado de reconocimiento del track
+        self.identificado_en = None  # Momento del último encoding
+        self.perdidos = 0            # Frames seguidos sin detección asociada
+
+    @property
+    def access(self):
+        return bool(self.resultado and self.resultado.get("access"))
+
+
+class FaceTracker:
+    def __init__(self, iou_min=0.3, max_perdidos=5, reverificar_s=3.0, reintentar_s=0.5):
+        """
+        - iou_min: IoU mínimo para considerar que una caja es el mismo rostro.
+        - max_perdidos: frames sin detección antes de descartar el track.
+        - reverificar_s: antigüedad máxima de una identidad reconocida.
+        - reintentar_s: cada cuánto se reintenta un track aún no reconocido.
+        """
+        self.iou_min = iou_min
+        self.max_perdidos = max_perdidos
+        self.reverificar_s = reverificar_s
+        self.reintentar_s = reintentar_s
+        self.tracks = []
+
+    def actualizar(self, cajas, ahora=None):
+        """
+        Asocia las cajas del frame a los tracks. Devuelve la lista de tracks visibles
+        en este frame (en el mismo orden que `cajas`).
+        """
+        ahora = ahora if ahora is not None else time.monotonic()
+        asignados = [None] * len(cajas)
+        libres = set(range(len(self.tracks)))
+
+        if cajas and self.tracks:
+            matriz = iou(cajas, [t.caja for t in self.tracks])
+            # Asociación voraz: primero los pares con mayor IoU
+            for idx in np.argsort(matriz, axis=None)[::-1]:
+                i, j = np.unravel_index(idx, matriz.shape)
+                if matriz[i, j] < self.iou_min:
+                    break
+                if asignados[i] is None and j in libres:
+                    asignados[i] = self.tracks[j]
+                    libres.discard(j)
+
+        for i, caja in enumerate(cajas):
+            if asignados[i] is None:
+                asignados[i] = Track(caja)
+                self.tracks.append(asignados[i])
+            else:
+                asignados[i].caja = caja
+                asignados[i].perdidos = 0
+
+        for j in libres:
+            self.tracks[j].perdidos += 1
+        self.tracks = [t for t in self.tracks if t.perdidos <= self.max_perdidos]
+        return asignados
+
+    def necesita_codificar(self, track, ahora=None):
+        ahora = ahora if ahora is not None else time.monotonic()
+        if track.identificado_en is None:
+            return True
+        limite = self.reverificar_s if track.access else self.reintentar_s
+        return ahora - track.identificado_en >= limite
+
+    def asignar(self, track, resultado, ahora=None):
+        track.resultado = resultado
+        track.identificado_en = ahora if ahora is not None else time.monotonic()
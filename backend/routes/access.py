@@ -1,13 +1,124 @@
-from fastapi import APIRouter
-# from fastapi import UploadFile, File
-# from fastapi.responses import JSONResponse
-# from backend_fastapi_face_access.recognition.detector import recognize_face
-
-router = APIRouter()
-
-# Ruta para validar rostro (desactivada temporalmente)
-# @router.post("/validate")
-# async def validate_face(image: UploadFile = File(...)):
-#     contents = await image.read()
-#     result = recognize_face(contents)
-#     return JSONResponse(content=result)
\ No newline at end of file
+import asyncio
+import functools
+import os
+from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from recognition import metricas
+from recognition.batcher import batcher
+from recognition.detection import config_default
+from recognition.eventos import eventos
+from recognition.executor import executor, ColaLlena
+from recognition.perfilador import perfilar
+from recognition.pipeline import reconocer_lote_con_tiempos
+
+router = APIRouter(prefix="/acceso", tags=["Acceso"])
+
+# Máximo de frames aceptados en una sola llamada a /validate/lote
+MAX_FRAMES_POR_LLAMADA = 32
+# ?perfil=true solo se acepta si se habilitó explícitamente
+PERFILADO_HABILITADO = os.getenv("PERFILADO_HABILITADO", "0") == "1"
+
+
+def _servicio_ocupado(detalle):
+    return HTTPException(status_code=503, detail=detalle, headers={"Retry-After": "1"})
+
+
+def _validar_perfil(perfil):
+    if perfil and not PERFILADO_HABILITADO:
+        raise HTTPException(status_code=403, detail="El perfilado está deshabilitado (PERFILADO_HABILITADO=1).")
+
+
+def _procesar_lote(dispositivo, frames):
+    """reconocer_lote_con_tiempos con la puerta de todos los frames de la llamada."""
+    if dispositivo is None:
+        return reconocer_lote_con_tiempos
+    return functools.partial(reconocer_lote_con_tiempos, dispositivos=[dispositivo] * len(frames))
+
+
+async def _reconocer_con_perfil(frames, dispositivo=None):
+    """Procesa el lote fuera del micro-batcher, muestreando la pila dentro del worker."""
+    ((resultados, tiempos), perfil), tiempos_ejecutor = await executor.ejecutar(
+        perfilar, _procesar_lote(dispositivo, frames), frames
+    )
+    tiempos = {**tiempos, **tiempos_ejecutor}
+    metricas.observar_tiempos(tiempos, len(frames))
+    return resultados, tiempos, perfil
+
+
+@router.post("/validate")
+async def validate_face(
+    image: UploadFile = File(...),
+    dispositivo: int = Query(None, description="DeviceID de la puerta: se compara primero contra su departamento"),
+    perfil: bool = Query(False, description="Devuelve un perfil por muestreo (requiere PERFILADO_HABILITADO=1)"),
+):
+    """✅ Valida un frame. Las llamadas concurrentes se agrupan en micro-lotes."""
+    _validar_perfil(perfil)
+    contents = await image.read()
+    datos_perfil = None
+    try:
+        if perfil:
+            resultados, tiempos, datos_perfil = await _reconocer_con_perfil([contents], dispositivo)
+            resultado = resultados[0]
+        else:
+            resultado, tiempos = await batcher.enviar(contents, dispositivo)
+    except ColaLlena:
+        metricas.solicitudes.incrementar("rechazado")
+        raise _servicio_ocupado("Reconocimiento saturado, intenta de nuevo.")
+    except asyncio.TimeoutError:
+        metricas.solicitudes.incrementar("expirado")
+        raise _servicio_ocupado("Tiempo de reconocimiento agotado.")
+    metricas.contar_resultado(resultado)
+    if resultado["access"]:
+        eventos.registrar(resultado["empID"], contents)  # No bloquea: lo escribe un hilo aparte
+    respuesta = {**resultado, "tiempos": tiempos}
+    if datos_perfil is not None:
+        respuesta["perfil"] = datos_perfil
+    return respuesta
+
+
+@router.post("/validate/lote")
+async def validate_faces(
+    images: List[UploadFile] = File(...),
+    dispositivo: int = Query(None, description="DeviceID de la puerta: se compara primero contra su departamento"),
+    perfil: bool = Query(False, description="Devuelve un perfil por muestreo (requiere PERFILADO_HABILITADO=1)"),
+):
+    """✅ Valida varios frames en una sola llamada; devuelve un resultado por frame."""
+    _validar_perfil(perfil)
+    if len(images) > MAX_FRAMES_POR_LLAMADA:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_FRAMES_POR_LLAMADA} imágenes por llamada.")
+    frames = [await image.read() for image in images]
+    datos_perfil = None
+    try:
+        if perfil:
+            resultados, tiempos, datos_perfil = await _reconocer_con_perfil(frames, dispositivo)
+        else:
+            (resultados, tiempos), tiempos_ejecutor = await executor.ejecutar(
+                _procesar_lote(dispositivo, frames), frames
+            )
+            tiempos = {**tiempos, **tiempos_ejecutor}
+            metricas.observar_tiempos(tiempos, len(frames))
+    except ColaLlena:
+        metricas.solicitudes.incrementar("rechazado", cantidad=len(frames))
+        raise _servicio_ocupado("Reconocimiento saturado, intenta de nuevo.")
+    except asyncio.TimeoutError:
+        metricas.solicitudes.incrementar("expirado", cantidad=len(frames))
+        raise _servicio_ocupado("Tiempo de reconocimiento agotado.")
+    for frame, resultado in zip(frames, resultados):
+        metricas.contar_resultado(resultado)
+        if resultado["access"]:
+            eventos.registrar(resultado["empID"], frame)
+    respuesta = {"resultados": resultados, "tiempos": tiempos}
+    if datos_perfil is not None:
+        respuesta["perfil"] = datos_perfil
+    return respuesta
+
+
+@router.get("/estado")
+def estado_reconocimiento():
+    """Ocupación del ejecutor de reconocimiento, frames esperando lote, configuración de detección y registro de eventos."""
+    return {
+        **executor.estado(),
+        "pendientes_lote": batcher.pendientes,
+        "deteccion": config_default.to_dict(),
+        "eventos": eventos.estado(),
+    }
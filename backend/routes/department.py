@@ -1,46 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from database.db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.db import get_async_db
+from database.cache import CatalogCache, responder
+from database.paginacion import LIMITE_MAX, keyset
 from models.department import Department
 from schemas.department import DepartmentCreate, DepartmentUpdate, DepartmentOut
 
 router = APIRouter(prefix="/departamentos", tags=["Departamentos"])
 
+# ✅ Catálogo pequeño y casi estático: se sirve desde memoria
+cache = CatalogCache("departamentos")
+
+
 @router.get("/", response_model=list[DepartmentOut])
-def listar_departamentos(
+async def listar_departamentos(
+    request: Request,
     estado: str = Query("activos", description="Filtra por: activos, eliminados o todos"),
-    db: Session = Depends(get_db)
+    despues_de: int = Query(None, description="Cursor: Code del último elemento de la página anterior"),
+    limite: int = Query(None, ge=1, le=LIMITE_MAX, description="Tamaño de página (sin límite = lista completa)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista los departamentos según el estado:
     - activos (default)
     - eliminados
     - todos
+    Con `limite` pagina por Code; el cursor de la siguiente página va en el header X-Siguiente.
     """
-    query = db.query(Department)
+    query = select(Department)
 
     if estado == "activos":
-        query = query.filter(Department.Active == True)
+        query = query.where(Department.Active == True)
     elif estado == "eliminados":
-        query = query.filter(Department.Active == False)
+        query = query.where(Department.Active == False)
     elif estado == "todos":
         pass  # Trae todos
     else:
         raise HTTPException(status_code=400, detail="Estado no válido. Usa: activos, eliminados o todos.")
 
-    return query.all()
+    query = keyset(query, Department.Code, despues_de)
+    if limite is not None:
+        query = query.limit(limite)
+
+    async def cargar():
+        result = await db.execute(query)
+        return [DepartmentOut.model_validate(dep).model_dump(mode="json") for dep in result.scalars().all()]
+
+    entrada = await cache.obtener(("lista", estado, despues_de, limite), cargar)
+    respuesta = responder(request, entrada)
+    # Página llena => puede haber más (en el peor caso la siguiente viene vacía)
+    if limite is not None and len(entrada.valor) == limite:
+        respuesta.headers["X-Siguiente"] = str(entrada.valor[-1]["Code"])
+    return respuesta
+
+
+@router.get("/cache")
+def estado_cache():
+    """Aciertos/fallos de la caché de departamentos."""
+    return cache.estado()
 
 
 @router.get("/{code}", response_model=DepartmentOut)
-def obtener_departamento(code: int, db: Session = Depends(get_db)):
-    dep = db.query(Department).filter(Department.Code == code, Department.Active == True).first()
-    if not dep:
+async def obtener_departamento(code: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def cargar():
+        result = await db.execute(select(Department).where(Department.Code == code, Department.Active == True))
+        dep = result.scalars().first()
+        return DepartmentOut.model_validate(dep).model_dump(mode="json") if dep else None
+
+    entrada = await cache.obtener(("codigo", code), cargar)
+    if entrada.valor is None:
         raise HTTPException(status_code=404, detail="Departamento no encontrado")
-    return dep
+    return responder(request, entrada)
 
 
 @router.post("/", response_model=DepartmentOut)
-def crear_departamento(departamento: DepartmentCreate, db: Session = Depends(get_db)):
+async def crear_departamento(departamento: DepartmentCreate, db: AsyncSession = Depends(get_async_db)):
     nuevo = Department(
         Name=departamento.Name,
         Remarks=departamento.Remarks,
@@ -49,37 +84,44 @@ def crear_departamento(departamento: DepartmentCreate, db: Session = Depends(get
         Active=True  # ✅ Siempre activo al crear
     )
     db.add(nuevo)
-    db.commit()
-    db.refresh(nuevo)
+    await db.commit()
+    cache.invalidar()
+    await db.refresh(nuevo)
     return nuevo
 
 
 @router.put("/{code}", response_model=DepartmentOut)
-def actualizar_departamento(code: int, datos: DepartmentUpdate, db: Session = Depends(get_db)):
-    dep = db.query(Department).filter(Department.Code == code, Department.Active == True).first()
+async def actualizar_departamento(code: int, datos: DepartmentUpdate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Department).where(Department.Code == code, Department.Active == True))
+    dep = result.scalars().first()
     if not dep:
         raise HTTPException(status_code=404, detail="Departamento no encontrado")
     for key, value in datos.dict(exclude_unset=True).items():
         setattr(dep, key, value)
-    db.commit()
-    db.refresh(dep)
+    await db.commit()
+    cache.invalidar()
+    await db.refresh(dep)
     return dep
 
 
 @router.delete("/{code}")
-def eliminar_departamento(code: int, db: Session = Depends(get_db)):
-    dep = db.query(Department).filter(Department.Code == code, Department.Active == True).first()
+async def eliminar_departamento(code: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Department).where(Department.Code == code, Department.Active == True))
+    dep = result.scalars().first()
     if not dep:
         raise HTTPException(status_code=404, detail="Departamento no encontrado")
     dep.Active = False  # ✅ Borrado lógico
-    db.commit()
+    await db.commit()
+    cache.invalidar()
     return {"mensaje": "Departamento eliminado (borrado lógico)"}
 
 @router.put("/{code}/restaurar")
-def restaurar_departamento(code: int, db: Session = Depends(get_db)):
-    dep = db.query(Department).filter(Department.Code == code, Department.Active == False).first()
+async def restaurar_departamento(code: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Department).where(Department.Code == code, Department.Active == False))
+    dep = result.scalars().first()
     if not dep:
         raise HTTPException(status_code=404, detail="Departamento no encontrado o ya está activo")
     dep.Active = True
-    db.commit()
+    await db.commit()
+    cache.invalidar()
     return {"mensaje": "Departamento restaurado correctamente"}
\ No newline at end of file
@@ -1,42 +1,175 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Body
-from sqlalchemy.orm import Session
-from database.db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Form, Body, Header, Query, UploadFile, File
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.db import get_async_db
+from database import blob_store
+from database.cache import coincide_etag
+from database.paginacion import LIMITE_DEFAULT, LIMITE_MAX, keyset, cortar
 from models.employee import Employee
+from recognition.enrolamiento import sesiones
+from recognition.jobs import jobs
+from recognition.tareas import tarea_captura, tarea_importacion
 import datetime
-import subprocess
 import os
+import shutil
+import uuid
+import zipfile
 
 router = APIRouter(prefix="/empleados", tags=["Empleados"])
 
-# 📂 Ruta donde se guardará temporalmente la mejor imagen capturada
-temp_image_path = "temp/temp_image.jpg"
+# Columnas que se pueden pedir en el listado; BiometricImage nunca se selecciona
+CAMPOS_LISTADO = [c.name for c in Employee.__table__.columns if c.name != "BiometricImage"]
+CAMPOS_DEFAULT = [
+    "empID", "firstName", "lastName", "sex", "jobTitle", "dept", "mobile", "email",
+    "type_emp", "biometric_status", "Active", "CreateDate", "UpdateDate",
+]
 
-@router.post("/capturar-rostro")
+
+@router.get("/")
+async def listar_empleados(
+    despues_de: int = Query(None, description="Cursor: empID del último empleado de la página anterior"),
+    limite: int = Query(LIMITE_DEFAULT, ge=1, le=LIMITE_MAX),
+    dept: int = Query(None),
+    jobTitle: int = Query(None),
+    type_emp: str = Query(None, description="E (empleado) o V (visitante)"),
+    biometric_status: int = Query(None, description="1: PENDING, 2: REGISTERED, 3: TRAINED"),
+    Active: str = Query(None, description="Y o N"),
+    campos: str = Query(None, description="Columnas separadas por coma, ej: empID,firstName,lastName"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    ✅ Lista empleados paginando por empID (keyset): la respuesta trae `siguiente`,
+    que se manda como `despues_de` para pedir la próxima página (None = última).
+    """
+    if campos:
+        seleccion = [c.strip() for c in campos.split(",") if c.strip()]
+        invalidos = [c for c in seleccion if c not in CAMPOS_LISTADO]
+        if invalidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campos no válidos: {', '.join(invalidos)}. Disponibles: {', '.join(CAMPOS_LISTADO)}",
+            )
+    else:
+        seleccion = list(CAMPOS_DEFAULT)
+    if "empID" not in seleccion:
+        seleccion.insert(0, "empID")  # El cursor siempre lo necesita
+
+    query = select(*[getattr(Employee, c) for c in seleccion])
+    filtros = {"dept": dept, "jobTitle": jobTitle, "type_emp": type_emp,
+               "biometric_status": biometric_status, "Active": Active}
+    for columna, valor in filtros.items():
+        if valor is not None:
+            query = query.where(getattr(Employee, columna) == valor)
+
+    result = await db.execute(keyset(query, Employee.empID, despues_de, limite))
+    filas, siguiente = cortar(result.mappings().all(), limite, lambda fila: fila["empID"])
+
+    return {"datos": [dict(fila) for fila in filas], "siguiente": siguiente, "limite": limite}
+
+
+def _sesion_vigente(sesion_id):
+    sesion = sesiones.obtener(sesion_id)
+    if sesion is None:
+        raise HTTPException(status_code=404, detail="Sesión de enrolamiento no encontrada o vencida.")
+    return sesion
+
+
+@router.post("/enrolamiento", status_code=201)
+def crear_sesion_enrolamiento(data: dict = Body(None)):
+    """
+    ✅ Abre una sesión de enrolamiento. La captura y el registro usan su sesion_id,
+    así varias estaciones pueden dar de alta empleados al mismo tiempo.
+    """
+    try:
+        sesion = sesiones.crear((data or {}).get("estacion"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return sesion.to_dict()
+
+
+@router.get("/enrolamiento/{sesion_id}")
+def obtener_sesion_enrolamiento(sesion_id: str):
+    return _sesion_vigente(sesion_id).to_dict()
+
+
+@router.get("/enrolamiento/{sesion_id}/imagen")
+def obtener_imagen_enrolamiento(sesion_id: str):
+    """✅ Vista previa de la imagen capturada en la sesión, antes de registrar."""
+    sesion = _sesion_vigente(sesion_id)
+    if sesion.imagen is None:
+        raise HTTPException(status_code=404, detail="La sesión aún no tiene imagen capturada.")
+    return Response(content=sesion.imagen, media_type="image/jpeg", headers={"Cache-Control": "no-store"})
+
+
+@router.delete("/enrolamiento/{sesion_id}")
+def cerrar_sesion_enrolamiento(sesion_id: str):
+    """Descarta la sesión (y cancela su captura si sigue en proceso)."""
+    if not sesiones.cerrar(sesion_id):
+        raise HTTPException(status_code=404, detail="Sesión de enrolamiento no encontrada o vencida.")
+    return {"mensaje": "Sesión de enrolamiento cerrada.", "sesion_id": sesion_id}
+
+
+@router.post("/capturar-rostro", status_code=202)
 def capturar_y_entrenar_rostro(data: dict = Body(...)):
-    """✅ Captura imágenes del rostro, entrena el modelo y guarda una imagen temporal."""
+    """
+    ✅ Encola la captura del rostro y el entrenamiento; el avance se consulta en /trabajos/{job_id}.
+    Si no se manda sesion_id se abre una sesión nueva y se devuelve en la respuesta.
+    """
     emp_id = data.get("emp_id")
     nombre = data.get("nombre")
 
     if not emp_id or not nombre:
         raise HTTPException(status_code=400, detail="Datos de captura incompletos.")
 
-    try:
-        # ✅ Captura de rostros (esto también guardará una imagen en temp/)
-        subprocess.run(
-            ["python", "tools/captura_rostros.py", str(emp_id), nombre],
-            check=True
-        )
+    if data.get("sesion_id"):
+        sesion = _sesion_vigente(data["sesion_id"])
+    else:
+        try:
+            sesion = sesiones.crear(data.get("estacion"))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        # ✅ Entrenamiento de modelo
-        subprocess.run(
-            ["python", "tools/entrenar_modelo.py"],
-            check=True
-        )
+    # ✅ Captura de rostros (la mejor imagen queda en la sesión) + entrenamiento incremental
+    job = sesiones.iniciar_captura(sesion, lambda: jobs.enviar(
+        "captura", tarea_captura, str(emp_id), nombre, sesion.id, descripcion=f"{emp_id} {nombre}"
+    ))
+    if job is None:
+        # Una cámara no puede atender dos capturas a la vez
+        raise HTTPException(status_code=409, detail="La cámara de esta estación ya está capturando.")
+
+    return {"mensaje": "Captura y entrenamiento en proceso.", "job_id": job.id, "sesion_id": sesion.id}
+
+
+@router.post("/importar", status_code=202)
+def importar_empleados(
+    manifiesto: UploadFile = File(..., description="CSV o JSON con una fila por empleado"),
+    imagenes: UploadFile = File(..., description="Zip con las fotos referenciadas en la columna imagen"),
+):
+    """
+    ✅ Importación masiva: inserta los empleados por lotes, codifica sus rostros en
+    paralelo y los marca como REGISTERED. El reporte por fila se consulta en /trabajos/{job_id}.
+    """
+    from tools.importar_empleados import leer_manifiesto
 
-        return {"mensaje": "Captura y entrenamiento completados exitosamente."}
+    try:
+        filas = leer_manifiesto(manifiesto.file.read(), manifiesto.filename or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Manifiesto no válido: {e}")
+    if not filas:
+        raise HTTPException(status_code=400, detail="El manifiesto no tiene filas.")
+    if not zipfile.is_zipfile(imagenes.file):
+        raise HTTPException(status_code=400, detail="Las imágenes deben venir en un archivo .zip")
+
+    # El zip se copia a disco: el trabajo lo lee después de que termina la petición
+    os.makedirs(os.path.join("temp", "importaciones"), exist_ok=True)
+    ruta_zip = os.path.join("temp", "importaciones", f"{uuid.uuid4().hex}.zip")
+    imagenes.file.seek(0)
+    with open(ruta_zip, "wb") as destino:
+        shutil.copyfileobj(imagenes.file, destino)
 
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=500, detail=f"Error durante captura/entrenamiento: {str(e)}")
+    job = jobs.enviar("importacion", tarea_importacion, filas, ruta_zip, descripcion=f"{len(filas)} empleados")
+    return {"mensaje": f"Importación de {len(filas)} empleados en proceso.", "job_id": job.id}
 
 
 @router.post("/")
@@ -49,16 +182,18 @@ async def registrar_empleado(
     dept: int = Form(...),
     mobile: str = Form(None),
     email: str = Form(None),
-    db: Session = Depends(get_db)
+    sesion_id: str = Form(..., description="Sesión de enrolamiento donde quedó la imagen capturada"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """✅ Registra al empleado en la base de datos, incluyendo la imagen capturada."""
+    """✅ Registra al empleado en la base de datos, con la imagen capturada en su sesión de enrolamiento."""
 
-    # 🖼️ Leemos la imagen temporal capturada
-    if not os.path.exists(temp_image_path):
-        raise HTTPException(status_code=400, detail="No se encontró imagen de rostro capturada.")
+    # 🖼️ Tomamos la imagen de la sesión: otra estación no puede pisarla ni usarla
+    contenido_imagen = sesiones.tomar_imagen(sesion_id)
+    if contenido_imagen is None:
+        raise HTTPException(status_code=400, detail="No se encontró imagen de rostro capturada en la sesión.")
 
-    with open(temp_image_path, "rb") as f:
-        contenido_imagen = f.read()
+    # ✅ La imagen se guarda en el almacén por contenido; en ohem solo va el hash
+    hash_imagen = blob_store.guardar(contenido_imagen)
 
     nuevo = Employee(
         firstName=firstName,
@@ -71,17 +206,21 @@ async def registrar_empleado(
         email=email,
         CreateDate=datetime.datetime.now(),
         UpdateDate=datetime.datetime.now(),
-        BiometricImage=contenido_imagen,
+        BiometricHash=hash_imagen,
         Active='Y',  # 🔥 Se activa automáticamente
         biometric_status=2  # 👈 Aquí DEBE ser 'status', no 'biometric_status'
     )
 
     db.add(nuevo)
-    db.commit()
-    db.refresh(nuevo)
+    try:
+        await db.commit()
+    except Exception:
+        sesiones.guardar_imagen(sesion_id, contenido_imagen)  # El operador puede reintentar sin recapturar
+        raise
+    await db.refresh(nuevo)
 
-    # 🧹 Limpia la imagen temporal después de registrar
-    os.remove(temp_image_path)
+    # 🧹 La sesión termina con el registro
+    sesiones.cerrar(sesion_id)
 
     return {
         "mensaje": "Empleado registrado correctamente ✅",
@@ -92,15 +231,16 @@ async def registrar_empleado(
 
 
 @router.put("/{emp_id}/estado")
-def actualizar_estado_empleado(
+async def actualizar_estado_empleado(
     emp_id: int,
     nuevo_estado: int = Body(..., embed=True),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     ✅ Actualiza el estado biométrico de un empleado (1: PENDING, 2: REGISTERED, 3: TRAINED).
     """
-    empleado = db.query(Employee).filter(Employee.empID == emp_id).first()
+    result = await db.execute(select(Employee).where(Employee.empID == emp_id))
+    empleado = result.scalars().first()
     if not empleado:
         raise HTTPException(status_code=404, detail="Empleado no encontrado.")
 
@@ -110,11 +250,49 @@ def actualizar_estado_empleado(
     empleado.status = nuevo_estado  # 👈 Siempre status en el modelo SQLAlchemy
     empleado.UpdateDate = datetime.datetime.now()
 
-    db.commit()
-    db.refresh(empleado)
+    await db.commit()
+    await db.refresh(empleado)
 
     return {
         "mensaje": f"Estado actualizado correctamente a {nuevo_estado}.",
         "empID": empleado.empID,
         "estado_actual": nuevo_estado
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/{emp_id}/imagen")
+async def obtener_imagen_empleado(
+    emp_id: int,
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    ✅ Devuelve la imagen biométrica del empleado desde el almacén en disco.
+    El ETag es el hash de la imagen, así el navegador recibe 304 si no cambió.
+    """
+    result = await db.execute(select(Employee.BiometricHash).where(Employee.empID == emp_id))
+    hash_imagen = result.scalar_one_or_none()
+
+    if hash_imagen is None:
+        # Empleados aún no migrados: la imagen sigue en la columna heredada
+        result = await db.execute(select(Employee.BiometricImage).where(Employee.empID == emp_id))
+        contenido = result.scalar_one_or_none()
+        if contenido is None:
+            raise HTTPException(status_code=404, detail="El empleado no tiene imagen biométrica.")
+        hash_imagen = blob_store.guardar(contenido)
+        # Se migra en la primera lectura (como tools/migrar_biometria.py) para no volver a hashearla
+        await db.execute(
+            update(Employee)
+            .where(Employee.empID == emp_id, Employee.BiometricHash.is_(None))
+            .values(BiometricHash=hash_imagen, BiometricImage=None)
+        )
+        await db.commit()
+
+    etag = f'"{hash_imagen}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if not blob_store.existe(hash_imagen):
+        raise HTTPException(status_code=404, detail="Imagen biométrica no encontrada en el almacén.")
+    return FileResponse(blob_store.ruta(hash_imagen), media_type="image/jpeg", headers=headers)
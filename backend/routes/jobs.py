@@ -0,0 +1,30 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from recognition.jobs import jobs
+
+router = APIRouter(prefix="/trabajos", tags=["Trabajos"])
+
+
+@router.get("/")
+def listar_trabajos(tipo: Optional[str] = None):
+    """Lista los trabajos en cola, en proceso y los terminados recientemente."""
+    return [job.to_dict() for job in jobs.listar(tipo)]
+
+
+@router.get("/{job_id}")
+def obtener_trabajo(job_id: str):
+    """Estado y avance de un trabajo."""
+    job = jobs.obtener(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job.to_dict()
+
+
+@router.delete("/{job_id}")
+def cancelar_trabajo(job_id: str):
+    """Solicita la cancelación de un trabajo pendiente o en proceso."""
+    if not jobs.obtener(job_id):
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    if not jobs.cancelar(job_id):
+        raise HTTPException(status_code=409, detail="El trabajo ya terminó")
+    return {"mensaje": "Cancelación solicitada", "job_id": job_id}
@@ -1,70 +1,110 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from database.db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.db import get_async_db
+from database.cache import CatalogCache, responder
+from database.paginacion import LIMITE_MAX, keyset
 from models.position import Position
 from schemas.position import PositionCreate, PositionUpdate, PositionOut
 
 router = APIRouter(prefix="/puestos", tags=["Puestos"])
 
+# ✅ Catálogo pequeño y casi estático: se sirve desde memoria
+cache = CatalogCache("puestos")
+
+
 @router.get("/", response_model=list[PositionOut])
-def listar_puestos(
+async def listar_puestos(
+    request: Request,
     estado: str = Query("activos", description="Filtra por: activos, eliminados o todos"),
-    db: Session = Depends(get_db)
+    despues_de: int = Query(None, description="Cursor: jobTitle del último elemento de la página anterior"),
+    limite: int = Query(None, ge=1, le=LIMITE_MAX, description="Tamaño de página (sin límite = lista completa)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lista los puestos según el estado:
     - activos (default)
     - eliminados
     - todos
+    Con `limite` pagina por jobTitle; el cursor de la siguiente página va en el header X-Siguiente.
     """
-    query = db.query(Position)
+    query = select(Position)
 
     if estado == "activos":
-        query = query.filter(Position.Active == True)
+        query = query.where(Position.Active == True)
     elif estado == "eliminados":
-        query = query.filter(Position.Active == False)
+        query = query.where(Position.Active == False)
     elif estado == "todos":
         pass  # No aplicamos filtro, trae todo
     else:
         raise HTTPException(status_code=400, detail="Estado no válido. Usa: activos, eliminados o todos.")
 
-    return query.all()
+    query = keyset(query, Position.jobTitle, despues_de)
+    if limite is not None:
+        query = query.limit(limite)
+
+    async def cargar():
+        result = await db.execute(query)
+        return [PositionOut.model_validate(puesto).model_dump(mode="json") for puesto in result.scalars().all()]
+
+    entrada = await cache.obtener(("lista", estado, despues_de, limite), cargar)
+    respuesta = responder(request, entrada)
+    # Página llena => puede haber más (en el peor caso la siguiente viene vacía)
+    if limite is not None and len(entrada.valor) == limite:
+        respuesta.headers["X-Siguiente"] = str(entrada.valor[-1]["jobTitle"])
+    return respuesta
+
+
+@router.get("/cache")
+def estado_cache():
+    """Aciertos/fallos de la caché de puestos."""
+    return cache.estado()
 
 
 @router.get("/{jobTitle}", response_model=PositionOut)
-def obtener_puesto(jobTitle: int, db: Session = Depends(get_db)):
-    puesto = db.query(Position).filter(Position.jobTitle == jobTitle, Position.Active == True).first()
-    if not puesto:
+async def obtener_puesto(jobTitle: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def cargar():
+        result = await db.execute(select(Position).where(Position.jobTitle == jobTitle, Position.Active == True))
+        puesto = result.scalars().first()
+        return PositionOut.model_validate(puesto).model_dump(mode="json") if puesto else None
+
+    entrada = await cache.obtener(("jobTitle", jobTitle), cargar)
+    if entrada.valor is None:
         raise HTTPException(status_code=404, detail="Puesto no encontrado")
-    return puesto
+    return responder(request, entrada)
 
 
 @router.post("/", response_model=PositionOut)
-def crear_puesto(puesto: PositionCreate, db: Session = Depends(get_db)):
+async def crear_puesto(puesto: PositionCreate, db: AsyncSession = Depends(get_async_db)):
     nuevo = Position(**puesto.dict(), Active=True)  # 👈 Siempre inicia activo
     db.add(nuevo)
-    db.commit()
-    db.refresh(nuevo)
+    await db.commit()
+    cache.invalidar()
+    await db.refresh(nuevo)
     return nuevo
 
 
 @router.put("/{jobTitle}", response_model=PositionOut)
-def actualizar_puesto(jobTitle: int, datos: PositionUpdate, db: Session = Depends(get_db)):
-    puesto = db.query(Position).filter(Position.jobTitle == jobTitle, Position.Active == True).first()
+async def actualizar_puesto(jobTitle: int, datos: PositionUpdate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Position).where(Position.jobTitle == jobTitle, Position.Active == True))
+    puesto = result.scalars().first()
     if not puesto:
         raise HTTPException(status_code=404, detail="Puesto no encontrado")
     for key, value in datos.dict(exclude_unset=True).items():
         setattr(puesto, key, value)
-    db.commit()
-    db.refresh(puesto)
+    await db.commit()
+    cache.invalidar()
+    await db.refresh(puesto)
     return puesto
 
 
 @router.delete("/{jobTitle}")
-def eliminar_puesto(jobTitle: int, db: Session = Depends(get_db)):
-    puesto = db.query(Position).filter(Position.jobTitle == jobTitle, Position.Active == True).first()
+async def eliminar_puesto(jobTitle: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(Position).where(Position.jobTitle == jobTitle, Position.Active == True))
+    puesto = result.scalars().first()
     if not puesto:
         raise HTTPException(status_code=404, detail="Puesto no encontrado")
     puesto.Active = False  # 👈 Cambia a inactivo
-    db.commit()
+    await db.commit()
+    cache.invalidar()
     return {"mensaje": "Puesto eliminado (borrado lógico)"}
\ No newline at end of file
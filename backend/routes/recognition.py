@@ -1,21 +1,35 @@
 # routes/recognition.py
-from fastapi import APIRouter
-import subprocess
+from fastapi import APIRouter, HTTPException
+from recognition.enrolamiento import sesiones
+from recognition.gallery import estado_modelo
+from recognition.jobs import jobs
+from recognition.tareas import tarea_captura, tarea_entrenamiento, tarea_eliminar_del_modelo
 
 router = APIRouter(prefix="/reconocimiento", tags=["Reconocimiento Facial"])
 
-@router.post("/capturar/{emp_id}/{nombre}")
+@router.post("/capturar/{emp_id}/{nombre}", status_code=202)
 def capturar_rostro(emp_id: int, nombre: str):
-    try:
-        subprocess.run(["python", "scripts/captura_rostros.py", str(emp_id), nombre], check=True)
-        return {"mensaje": "Captura de rostro exitosa."}
-    except subprocess.CalledProcessError:
-        return {"error": "Error al capturar rostro."}
+    sesion = sesiones.crear()
+    job = sesiones.iniciar_captura(sesion, lambda: jobs.enviar(
+        "captura", tarea_captura, emp_id, nombre, sesion.id, entrenar=False, descripcion=f"{emp_id} {nombre}"
+    ))
+    if job is None:
+        sesiones.cerrar(sesion.id)
+        raise HTTPException(status_code=409, detail="La cámara ya está capturando.")
+    return {"mensaje": "Captura de rostro en proceso.", "job_id": job.id, "sesion_id": sesion.id}
 
-@router.post("/entrenar")
-def entrenar_modelo():
-    try:
-        subprocess.run(["python", "scripts/entrenar_modelo.py"], check=True)
-        return {"mensaje": "Entrenamiento de modelo completado exitosamente."}
-    except subprocess.CalledProcessError:
-        return {"error": "Error al entrenar el modelo."}
\ No newline at end of file
+@router.post("/entrenar", status_code=202)
+def entrenar_modelo(incremental: bool = False):
+    job = jobs.enviar("entrenamiento", tarea_entrenamiento, incremental=incremental)
+    return {"mensaje": "Entrenamiento de modelo en proceso.", "job_id": job.id}
+
+@router.delete("/modelo/{emp_id}", status_code=202)
+def eliminar_del_modelo(emp_id: int):
+    job = jobs.enviar("eliminar_encodings", tarea_eliminar_del_modelo, emp_id, descripcion=str(emp_id))
+    return {"mensaje": f"Eliminando encodings del empleado {emp_id} del modelo.", "job_id": job.id}
+
+
+@router.get("/modelo")
+def version_modelo():
+    """Versión del modelo cargada en este proceso y la última publicada en disco."""
+    return estado_modelo()
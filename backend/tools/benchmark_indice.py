@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recognition.index import ExactIndex, IVFIndex, DIMENSION
+
+
+def galeria_sintetica(empleados, muestras, rng):
+    """Encodings sintéticos: un centro por empleado y varias muestras con ruido alrededor."""
+    centros = rng.normal(scale=0.08, size=(empleados, DIMENSION)).astype(np.float32)
+    ids = np.repeat(np.arange(empleados, dtype=np.int64), muestras)
+    encodings = centros[ids] + rng.normal(scale=0.02, size=(len(ids), DIMENSION)).astype(np.float32)
+    return encodings, ids
+
+
+def medir(indice, consultas, **kwargs):
+    """Devuelve (ids top-1, latencias en ms por consulta)."""
+    top1 = np.empty(len(consultas), dtype=np.int64)
+    latencias = np.empty(len(consultas))
+    for i, probe in enumerate(consultas):
+        inicio = time.perf_counter()
+        _, ids = indice.search(probe[None, :], k=1, **kwargs)
+        latencias[i] = (time.perf_counter() - inicio) * 1000
+        top1[i] = ids[0, 0]
+    return top1, latencias
+
+
+def benchmark(empleados=20000, muestras=5, consultas=500, nlist=None, nprobes=(1, 4, 8, 16, 32), semilla=0):
+    rng = np.random.default_rng(semilla)
+    encodings, ids = galeria_sintetica(empleados, muestras, rng)
+    elegidas = rng.choice(len(ids), consultas, replace=False)
+    probes = encodings[elegidas] + rng.normal(scale=0.02, size=(consultas, DIMENSION)).astype(np.float32)
+    print(f"[INFO] Galería sintética: {len(ids)} encodings ({empleados} empleados x {muestras} muestras)")
+
+    exacto = ExactIndex().build(encodings, ids)
+    verdad, lat_exacto = medir(exacto, probes)
+    print(f"exacto      recall@1=1.000  p50={np.percentile(lat_exacto, 50):7.3f} ms  p99={np.percentile(lat_exacto, 99):7.3f} ms")
+
+    inicio = time.perf_counter()
+    ivf = IVFIndex(nlist=nlist).build(encodings, ids)
+    print(f"[INFO] IVF construido en {time.perf_counter() - inicio:.1f} s ({len(ivf.centroides)} cubetas)")
+
+    for nprobe in nprobes:
+        top1, latencias = medir(ivf, probes, nprobe=nprobe)
+        recall = float(np.mean(top1 == verdad))
+        print(f"ivf nprobe={nprobe:<3} recall@1={recall:.3f}  p50={np.percentile(latencias, 50):7.3f} ms  p99={np.percentile(latencias, 99):7.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@1 y latencia del índice IVF contra la búsqueda exacta")
+    parser.add_argument("--empleados", type=int, default=20000)
+    parser.add_argument("--muestras", type=int, default=5, help="Encodings por empleado")
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--nlist", type=int, default=None, help="Cubetas del IVF (default ~4·sqrt(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    benchmark(args.empleados, args.muestras, args.consultas, args.nlist, args.nprobe)
@@ -0,0 +1,255 @@
+"""
+Benchmark del reconocimiento por etapas: decodificar, detectar, codificar, comparar y registrar.
+
+- comparar: galerías sintéticas de distintos tamaños (1k a 1M encodings), probes de a
+  uno y en lote, más el tiempo de construcción y la memoria pico de cada galería.
+- decodificar / detectar / codificar: imágenes de una carpeta (--imagenes) o
+  sintéticas. Si el detector no encuentra rostro, se codifica una caja central para
+  medir igual el costo de dlib.
+- registrar: escritura del snapshot del evento (lo que hace el hilo de eventos).
+
+El resultado se guarda en JSON; con --comparar se muestran las diferencias contra
+una corrida anterior (p. ej. la de la versión previa, en la misma máquina).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recognition.gallery import FaceGallery, TOLERANCIA_DEFAULT
+from recognition.index import crear_indice, DIMENSION
+from tools.benchmark_indice import galeria_sintetica
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+
+def resumen(latencias_ms, elementos_por_llamada=1):
+    """p50/p99/media en ms y elementos procesados por segundo."""
+    latencias_ms = np.asarray(latencias_ms, dtype=np.float64)
+    if len(latencias_ms) == 0:
+        return {"n": 0}
+    total_s = latencias_ms.sum() / 1000
+    return {
+        "n": int(len(latencias_ms)),
+        "p50_ms": round(float(np.percentile(latencias_ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencias_ms, 99)), 4),
+        "media_ms": round(float(latencias_ms.mean()), 4),
+        "por_segundo": round(len(latencias_ms) * elementos_por_llamada / total_s, 1) if total_s > 0 else None,
+    }
+
+
+def _imprimir(nombre, r):
+    if r.get("n"):
+        print(f"{nombre:<28} p50={r['p50_ms']:9.3f} ms  p99={r['p99_ms']:9.3f} ms  {r['por_segundo']:>10} /s")
+
+
+def _rss_pico_mb():
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def benchmark_galeria(tamano, muestras, consultas, lote, tipo_indice, rng):
+    """Construye una galería sintética de `tamano` encodings y mide el matcher."""
+    empleados = max(1, tamano // muestras)
+    encodings, ids = galeria_sintetica(empleados, muestras, rng)
+    names = [f"Empleado {i}" for i in range(empleados)]
+    names = [names[i] for i in ids]
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    galeria = FaceGallery(encodings, ids, names, version="sintetica",
+                          indice=crear_indice(tipo_indice) if tipo_indice else None)
+    construccion_s = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    elegidas = rng.choice(len(ids), consultas, replace=True)
+    probes = encodings[elegidas] + rng.normal(scale=0.02, size=(consultas, DIMENSION)).astype(np.float32)
+
+    individuales = []
+    for probe in probes:
+        t0 = time.perf_counter()
+        galeria.match_batch([probe], tolerance=TOLERANCIA_DEFAULT)
+        individuales.append((time.perf_counter() - t0) * 1000)
+
+    en_lote = []
+    for i in range(0, consultas, lote):
+        t0 = time.perf_counter()
+        galeria.match_batch(probes[i:i + lote], tolerance=TOLERANCIA_DEFAULT)
+        en_lote.append((time.perf_counter() - t0) * 1000)
+
+    resultado = {
+        "tamano": int(len(ids)),
+        "empleados": empleados,
+        "indice": tipo_indice or "exacto_por_empleado",
+        "construccion_s": round(construccion_s, 3),
+        "memoria_encodings_mb": round(encodings.nbytes / (1024 * 1024), 1),
+        "memoria_construccion_mb": round(pico / (1024 * 1024), 1),  # Norma, índice y copias al construir
+        "comparar": resumen(individuales),
+        f"comparar_lote_{lote}": resumen(en_lote, elementos_por_llamada=lote),
+    }
+    print(f"[GALERÍA] {len(ids)} encodings ({resultado['memoria_encodings_mb']} MB), construida en "
+          f"{construccion_s:.2f} s, memoria pico al construir {resultado['memoria_construccion_mb']} MB")
+    _imprimir("  comparar (1 probe)", resultado["comparar"])
+    _imprimir(f"  comparar (lote {lote})", resultado[f"comparar_lote_{lote}"])
+    return resultado
+
+
+def imagenes_de_prueba(carpeta, cantidad, resolucion, rng):
+    """JPEGs de la carpeta de fixtures o, si no hay, imágenes sintéticas."""
+    import cv2
+
+    if carpeta:
+        rutas = sorted(os.path.join(carpeta, f) for f in os.listdir(carpeta) if f.lower().endswith(EXTENSIONES))
+        if not rutas:
+            raise SystemExit(f"No hay imágenes en {carpeta}")
+        imagenes = []
+        for ruta in rutas[:cantidad]:
+            with open(ruta, "rb") as f:
+                imagenes.append(f.read())
+        return imagenes, "fixtures"
+
+    ancho, alto = resolucion
+    imagenes = []
+    for _ in range(cantidad):
+        # Fondo suave con ruido y un óvalo claro al centro: comprime como una foto real
+        frame = np.full((alto, ancho, 3), rng.integers(40, 200, size=3), dtype=np.uint8)
+        frame = np.clip(frame + rng.normal(scale=12, size=frame.shape), 0, 255).astype(np.uint8)
+        cv2.ellipse(frame, (ancho // 2, alto // 2), (ancho // 8, alto // 5), 0, 0, 360, (170, 190, 220), -1)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        imagenes.append(jpeg.tobytes())
+    return imagenes, "sinteticas"
+
+
+def benchmark_imagenes(imagenes, repeticiones):
+    """Mide decodificar, detectar, codificar y el snapshot del evento por imagen."""
+    from recognition.detection import config_default, detectar, codificar
+    from recognition.eventos import EventLogger
+    from recognition.pipeline import decodificar
+
+    tiempos = {"decodificar": [], "detectar": [], "codificar": [], "registrar": []}
+    rostros = 0
+    logger = EventLogger()
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeticiones):
+            for n, image_bytes in enumerate(imagenes):
+                t0 = time.perf_counter()
+                rgb = decodificar(image_bytes)
+                t1 = time.perf_counter()
+                if rgb is None:
+                    continue
+                ubicaciones = detectar(rgb, config_default)
+                t2 = time.perf_counter()
+                rostros += len(ubicaciones)
+                if not ubicaciones:
+                    alto, ancho = rgb.shape[:2]
+                    ubicaciones = [(alto // 4, ancho * 3 // 4, alto * 3 // 4, ancho // 4)]
+                codificar(rgb, ubicaciones, config_default)
+                t3 = time.perf_counter()
+                logger._guardar_imagen(os.path.join(tmp, f"{n}.jpg"), image_bytes)
+                t4 = time.perf_counter()
+
+                tiempos["decodificar"].append((t1 - t0) * 1000)
+                tiempos["detectar"].append((t2 - t1) * 1000)
+                tiempos["codificar"].append((t3 - t2) * 1000)
+                tiempos["registrar"].append((t4 - t3) * 1000)
+
+    resultado = {etapa: resumen(latencias) for etapa, latencias in tiempos.items()}
+    resultado["rostros_detectados"] = rostros
+    resultado["deteccion"] = config_default.to_dict()
+    for etapa in ("decodificar", "detectar", "codificar", "registrar"):
+        _imprimir(etapa, resultado[etapa])
+    return resultado
+
+
+def comparar(actual, anterior):
+    """Imprime el cambio de p50/p99 por etapa contra una corrida anterior."""
+    def etapas(reporte):
+        salida = {f"imagen.{k}": v for k, v in reporte.get("imagenes", {}).items() if isinstance(v, dict) and "p50_ms" in v}
+        for g in reporte.get("galerias", []):
+            for k, v in g.items():
+                if isinstance(v, dict) and "p50_ms" in v:
+                    salida[f"galeria_{g['tamano']}.{k}"] = v
+        return salida
+
+    nuevas, viejas = etapas(actual), etapas(anterior)
+    print(f"\n[COMPARACIÓN] contra {anterior.get('fecha')}")
+    for nombre in sorted(set(nuevas) & set(viejas)):
+        for p in ("p50_ms", "p99_ms"):
+            antes, ahora = viejas[nombre][p], nuevas[nombre][p]
+            cambio = (ahora - antes) / antes * 100 if antes else 0.0
+            marca = "⚠️" if cambio > 10 else "  "
+            print(f"{marca} {nombre:<40} {p}: {antes:9.3f} -> {ahora:9.3f} ms ({cambio:+.1f}%)")
+
+
+def benchmark(tamanos=(1000, 10000, 100000), muestras=5, consultas=200, lote=8, tipo_indice=None,
+              imagenes=None, cantidad_imagenes=20, resolucion=(640, 480), repeticiones=3,
+              solo_galeria=False, semilla=0):
+    rng = np.random.default_rng(semilla)
+    reporte = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "entorno": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "procesador": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "parametros": {
+            "tamanos": list(tamanos), "muestras": muestras, "consultas": consultas, "lote": lote,
+            "indice": tipo_indice, "semilla": semilla,
+        },
+        "galerias": [],
+    }
+
+    for tamano in tamanos:
+        reporte["galerias"].append(benchmark_galeria(tamano, muestras, consultas, lote, tipo_indice, rng))
+
+    if not solo_galeria:
+        fotos, origen = imagenes_de_prueba(imagenes, cantidad_imagenes, resolucion, rng)
+        print(f"[IMÁGENES] {len(fotos)} {origen} x {repeticiones} repeticiones")
+        reporte["imagenes"] = {"origen": origen, "cantidad": len(fotos), **benchmark_imagenes(fotos, repeticiones)}
+
+    reporte["memoria_pico_rss_mb"] = _rss_pico_mb()
+    print(f"[MEMORIA] pico del proceso: {reporte['memoria_pico_rss_mb']} MB")
+    return reporte
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latencia por etapa del reconocimiento facial")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Encodings de cada galería sintética (hasta 1000000)")
+    parser.add_argument("--muestras", type=int, default=5, help="Encodings por empleado")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--lote", type=int, default=8, help="Probes por llamada en la medición en lote")
+    parser.add_argument("--indice", choices=["exacto", "ivf"], default=None,
+                        help="Índice de la galería (default: búsqueda exacta por empleado)")
+    parser.add_argument("--imagenes", default=None, help="Carpeta con imágenes de prueba (default: sintéticas)")
+    parser.add_argument("--cantidad-imagenes", type=int, default=20)
+    parser.add_argument("--resolucion", type=int, nargs=2, default=[640, 480], metavar=("ANCHO", "ALTO"))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--solo-galeria", action="store_true", help="Solo mide el matcher (no requiere OpenCV ni dlib)")
+    parser.add_argument("--salida", default="benchmark_reconocimiento.json")
+    parser.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    reporte = benchmark(args.tamanos, args.muestras, args.consultas, args.lote, args.indice,
+                        args.imagenes, args.cantidad_imagenes, tuple(args.resolucion), args.repeticiones,
+                        args.solo_galeria)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+    print(f"✅ Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(reporte, json.load(f))
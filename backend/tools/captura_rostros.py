@@ -1,62 +1,148 @@
 import cv2
+import face_recognition
+import glob
 import os
 import sys
 
-# Argumentos enviados desde FastAPI
-emp_id = sys.argv[1]
-nombre = sys.argv[2]
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recognition.calidad import CALIDAD_MINIMA, LADO, Candidato, SeleccionMuestras, puntuar
+from recognition.fuentes import FUENTE_DEFAULT, abrir_fuente
 
-# Crear carpetas necesarias
-dataset_dir = "dataset"
-temp_dir = "temp"
-os.makedirs(dataset_dir, exist_ok=True)
-os.makedirs(temp_dir, exist_ok=True)
-
-# Crear carpeta específica para el empleado
-folder_name = f"{emp_id}_{nombre.replace(' ', '_')}"
-employee_dir = os.path.join(dataset_dir, folder_name)
-os.makedirs(employee_dir, exist_ok=True)
-
-# Inicializar cámara y detector de rostros
-cap = cv2.VideoCapture(0)
+# Clasificador Haar: se carga una sola vez por proceso
 face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
 
-contador = 0
-max_capturas = 10  # Número de imágenes a capturar
-
-rostro_guardado = False
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("Error al abrir la cámara.")
-        break
-
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    rostros = face_cascade.detectMultiScale(gray, 1.3, 5)
-
-    for (x, y, w, h) in rostros:
-        rostro = frame[y:y+h, x:x+w]
-        rostro = cv2.resize(rostro, (150, 150))
-
-        img_path = os.path.join(employee_dir, f"{emp_id}_{nombre}_{contador}.jpg")
-        cv2.imwrite(img_path, rostro)
-        contador += 1
-
-        # Guardar la primera imagen detectada en temp/
-        if not rostro_guardado:
-            temp_image_path = os.path.join(temp_dir, "temp_image.jpg")
-            cv2.imwrite(temp_image_path, rostro)
-            rostro_guardado = True
-
-        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-
-    cv2.imshow("Capturando Rostro...", frame)
-
-    if cv2.waitKey(1) == ord('q') or contador >= max_capturas:
-        break
-
-cap.release()
-cv2.destroyAllWindows()
-
-print("✅ Captura de rostros completada.")
\ No newline at end of file
+MARGEN = 0.15  # Margen alrededor de la caja Haar al recortar el rostro
+
+
+def _recortar(frame, x, y, w, h):
+    """Recorte con margen, cuadrado y dentro del frame, normalizado a LADO x LADO."""
+    m = int(max(w, h) * MARGEN)
+    alto, ancho = frame.shape[:2]
+    x0, y0 = max(0, x - m), max(0, y - m)
+    x1, y1 = min(ancho, x + w + m), min(alto, y + h + m)
+    return cv2.resize(frame[y0:y1, x0:x1], (LADO, LADO), interpolation=cv2.INTER_AREA)
+
+
+def capturar_rostros(emp_id, nombre, dataset_dir="dataset", temp_dir="temp", max_capturas=10,
+                     mostrar=True, progreso=None, cancelado=None, max_frames=300, frames_estables=45,
+                     fuente=None, referencia=None):
+    """
+    Captura rostros desde `fuente` y guarda en dataset/<emp_id>_<nombre>/ las
+    `max_capturas` mejores muestras distintas entre sí:
+      - Cada detección se puntúa por nitidez, tamaño, pose y exposición
+        (recognition/calidad.py); las de puntaje bajo se descartan sin codificar.
+      - Las que pasan se codifican y se descartan las casi-duplicadas por distancia
+        entre encodings.
+    La captura termina cuando la selección está llena y no mejora durante
+    `frames_estables` frames, o al llegar a `max_frames`. La mejor muestra es la
+    imagen de referencia del empleado: se entrega como JPEG a `referencia(bytes)`
+    (la sesión de enrolamiento) o, sin callback, se guarda en temp/temp_image.jpg.
+    - progreso(fraccion, mensaje): callback opcional de avance.
+    - cancelado(): callback opcional; si devuelve True se detiene la captura.
+    - fuente: FrameSource u origen para abrir_fuente (webcam, rtsp://, video o
+      carpeta); por defecto CAMARA_FUENTE. Con mostrar=False no abre ventanas.
+    Devuelve el número de imágenes guardadas.
+    """
+    # Crear carpetas necesarias
+    os.makedirs(dataset_dir, exist_ok=True)
+
+    # Crear carpeta específica para el empleado
+    folder_name = f"{emp_id}_{nombre.replace(' ', '_')}"
+    employee_dir = os.path.join(dataset_dir, folder_name)
+    os.makedirs(employee_dir, exist_ok=True)
+
+    # Inicializar fuente de frames (lee en su propio hilo)
+    fuente = abrir_fuente(FUENTE_DEFAULT if fuente is None else fuente).iniciar()
+
+    seleccion = SeleccionMuestras(max_capturas)
+    frames = 0
+    sin_cambios = 0
+    evaluados = 0
+    descartados_calidad = 0
+
+    try:
+        while frames < max_frames:
+            if cancelado is not None and cancelado():
+                print("⚠️ Captura cancelada.")
+                break
+
+            frame = fuente.leer()
+            if frame is None:
+                print("⚠️ La fuente de frames terminó.")
+                break
+            frames += 1
+
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            rostros = face_cascade.detectMultiScale(gray, 1.3, 5)
+
+            cambio = False
+            rgb = None
+            for (x, y, w, h) in rostros:
+                evaluados += 1
+                rostro = _recortar(frame, x, y, w, h)
+                puntajes = puntuar(rostro, w)
+                color = (0, 255, 0) if puntajes["total"] >= CALIDAD_MINIMA else (0, 0, 255)
+
+                if puntajes["total"] < CALIDAD_MINIMA:
+                    descartados_calidad += 1  # ✅ No se gasta un encoding en un frame malo
+                else:
+                    if rgb is None:
+                        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    encodings = face_recognition.face_encodings(rgb, known_face_locations=[(y, x + w, y + h, x)])
+                    if encodings and seleccion.agregar(Candidato(rostro, puntajes, encodings[0])):
+                        cambio = True
+
+                if mostrar:
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+                    cv2.putText(frame, f"{puntajes['total']:.2f}", (x, max(15, y - 8)),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+            lleno = len(seleccion) >= max_capturas
+            sin_cambios = 0 if cambio or not lleno else sin_cambios + 1
+
+            if progreso is not None:
+                progreso(
+                    min(len(seleccion), max_capturas) / max_capturas,
+                    f"{len(seleccion)}/{max_capturas} rostros seleccionados ({evaluados} evaluados)",
+                )
+
+            if mostrar:
+                cv2.imshow("Capturando Rostro...", frame)
+                if cv2.waitKey(1) == ord('q'):
+                    break
+
+            if lleno and sin_cambios >= frames_estables:
+                break
+    finally:
+        fuente.detener()
+        if mostrar:
+            cv2.destroyAllWindows()
+
+    muestras = seleccion.ordenadas()
+    if muestras:
+        # 🧹 Las muestras de una captura anterior se reemplazan, no se acumulan
+        for anterior in glob.glob(os.path.join(employee_dir, "*.jpg")):
+            os.remove(anterior)
+        for contador, muestra in enumerate(muestras):
+            img_path = os.path.join(employee_dir, f"{emp_id}_{nombre}_{contador}.jpg")
+            cv2.imwrite(img_path, muestra.imagen)
+
+        # La mejor muestra es la imagen de referencia del empleado
+        if referencia is not None:
+            ok, jpeg = cv2.imencode(".jpg", muestras[0].imagen)
+            if ok:
+                referencia(jpeg.tobytes())
+        else:
+            os.makedirs(temp_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(temp_dir, "temp_image.jpg"), muestras[0].imagen)
+
+    print(
+        f"✅ Captura de rostros completada: {len(muestras)} muestras guardadas de {evaluados} detecciones "
+        f"({descartados_calidad} por baja calidad, {seleccion.duplicados} casi-duplicadas)."
+    )
+    return len(muestras)
+
+
+if __name__ == "__main__":
+    # Argumentos enviados desde la terminal: <emp_id> <nombre> [fuente]
+    capturar_rostros(sys.argv[1], sys.argv[2], fuente=sys.argv[3] if len(sys.argv) > 3 else None)
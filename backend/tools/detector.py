@@ -1,91 +1,154 @@
-import face_recognition
-import numpy as np
 import cv2
-import datetime
 import os
-# from backend_fastapi_face_access.database.db import get_connection, log_event
-from PIL import Image
-import io
-# import pickle
+import sys
 
-# Cargar datos previamente entrenados
-# with open("modelo/known_encodings.pkl", "rb") as f:
-#     known_data = pickle.load(f)
-
-# known_encodings = known_data["encodings"]
-# known_ids = known_data["ids"]
-# known_names = known_data["names"]
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recognition.pipeline import reconocer_lote
+from recognition.eventos import eventos
 
 def recognize_face(image_bytes):
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    face_locations = face_recognition.face_locations(rgb_frame)
-    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-    for face_encoding, face_location in zip(face_encodings, face_locations):
-        # Simulación de coincidencia falsa (para pruebas sin modelo)
-        matches = []
-        face_distances = []
-
-        # if True in matches:
-        #     best_match_index = np.argmin(face_distances)
-        #     empleado_id = known_ids[best_match_index]
-        #     empleado_nombre = known_names[best_match_index]
-
-        #     # Guardar imagen del evento
-        #     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        #     filename = f"events/{empleado_id}_{timestamp}.jpg"
-        #     os.makedirs("events", exist_ok=True)
-        #     cv2.imwrite(filename, frame)
-
-        #     # Registrar evento en base de datos
-        #     log_event(empleado_id, filename)
-
-        #     print(f"[ACCESO PERMITIDO] Empleado: {empleado_nombre} (ID: {empleado_id})")
-        #     print(f"[EVENTO] Imagen guardada: {filename}")
-        #     print("🚪 PUERTA ABIERTA\n")
-
-        #     return {"access": True, "empleado": empleado_nombre}
+    # ✅ Mismo pipeline que usa la API (la galería se carga una sola vez por proceso)
+    resultado = reconocer_lote([image_bytes])[0]
+
+    if resultado["access"]:
+        empleado_id = resultado["empID"]
+        empleado_nombre = resultado["empleado"]
+
+        # ✅ Snapshot + registro en event_log en segundo plano; la puerta no espera
+        eventos.registrar(empleado_id, image_bytes)
+
+        print(f"[ACCESO PERMITIDO] Empleado: {empleado_nombre} (ID: {empleado_id})")
+        print("🚪 PUERTA ABIERTA\n")
+        return resultado
+
+    print("[ACCESO DENEGADO] Rostro no reconocido.\n")
+    return resultado
+
+def procesar_fuente(fuente, ultimos=None, detener=None, dispositivo=None):
+    """
+    Reconoce en continuo los frames de una fuente (una cámara, un video, una carpeta).
+    Cada fuente tiene su propio tracker, así que varias pueden correr en hilos del
+    mismo proceso. Si `ultimos` es un dict, deja ahí el último frame anotado para
+    que el hilo principal lo muestre. Con `dispositivo` (DeviceID) se compara primero
+    contra el departamento de esa puerta. Devuelve las estadísticas de la fuente.
+    """
+    from recognition.pipeline import reconocer_frame_rastreado
+    from recognition.tracker import FaceTracker
+
+    # ✅ El tracker evita recodificar a la misma persona en cada frame
+    tracker = FaceTracker()
+    anunciados = set()
+    procesados = 0
+
+    with fuente:
+        for frame in fuente:
+            if detener is not None and detener.is_set():
+                break
+            procesados += 1
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+            for track, (top, right, bottom, left) in reconocer_frame_rastreado(rgb_frame, tracker, dispositivo=dispositivo):
+                if track.access:
+                    label = f"{track.resultado['empleado']} - PUERTA ABIERTA"
+                    color = (0, 255, 0)
+                    if track.id not in anunciados:
+                        anunciados.add(track.id)
+                        eventos.registrar(track.resultado["empID"], frame.copy())
+                        print(f"[ACCESO PERMITIDO] [{fuente.nombre}] Empleado: {track.resultado['empleado']} "
+                              f"(ID: {track.resultado['empID']})")
+                        print("🚪 PUERTA ABIERTA\n")
+                else:
+                    label = "Desconocido - ACCESO DENEGADO"
+                    color = (0, 0, 255)
+
+                if ultimos is not None:
+                    cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+                    cv2.putText(frame, label, (left, max(20, top - 10)),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+
+            if ultimos is not None:
+                ultimos[fuente.nombre] = frame
+
+    estado = fuente.estado()
+    estado["procesados"] = procesados
+    return estado
 
-        # print("[ACCESO DENEGADO] Rostro no reconocido.\n")
-        return {"access": False}
 
 # 🔽 Bloque de ejecución directa desde terminal
-# if __name__ == "__main__":
-#     print("[INFO] Iniciando cámara para reconocimiento facial...")
-#     print("[INFO] Presiona 'q' para salir.\n")
-#     cap = cv2.VideoCapture(0)
-
-#     if not cap.isOpened():
-#         print("[ERROR] No se pudo abrir la cámara.")
-#         exit()
-
-#     while True:
-#         ret, frame = cap.read()
-#         if not ret:
-#             break
-
-#         _, buffer = cv2.imencode('.jpg', frame)
-#         image_bytes = buffer.tobytes()
-
-#         result = recognize_face(image_bytes)
-
-#         if result["access"]:
-#             label = f"{result['empleado']} - PUERTA ABIERTA"
-#             color = (0, 255, 0)
-#         else:
-#             label = "Desconocido - ACCESO DENEGADO"
-#             color = (0, 0, 255)
-
-#         cv2.putText(frame, label, (10, 30),
-#                     cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-#         cv2.imshow("Reconocimiento Facial", frame)
-
-#         if cv2.waitKey(1) & 0xFF == ord("q"):
-#             print("[CIERRE] Reconocimiento detenido por el usuario.")
-#             break
-
-#     cap.release()
-#     cv2.destroyAllWindows()
\ No newline at end of file
+if __name__ == "__main__":
+    import argparse
+    import threading
+    import time
+
+    from recognition.fuentes import FUENTE_DEFAULT, abrir_fuente
+
+    parser = argparse.ArgumentParser(description="Reconocimiento facial en continuo desde una o varias fuentes.")
+    parser.add_argument("--fuente", action="append",
+                        help="Índice de webcam, URL rtsp://, archivo de video o carpeta de imágenes (repetible)")
+    parser.add_argument("--dispositivo", type=int, action="append",
+                        help="DeviceID de cada fuente, en el mismo orden que --fuente (shard por departamento)")
+    parser.add_argument("--sin-ventana", action="store_true", help="No abrir ventanas (servidores sin pantalla)")
+    parser.add_argument("--fps", type=float, default=None, help="Frames por segundo máximos por fuente")
+    parser.add_argument("--tiempo-real", action="store_true",
+                        help="Reproducir videos y carpetas al ritmo original (pruebas de carga)")
+    parser.add_argument("--repetir", action="store_true", help="Repetir las carpetas de imágenes en bucle")
+    args = parser.parse_args()
+
+    origenes = args.fuente or [FUENTE_DEFAULT]
+    dispositivos = args.dispositivo or []
+    if len(dispositivos) > len(origenes):
+        parser.error("Hay más --dispositivo que --fuente.")
+    dispositivos += [None] * (len(origenes) - len(dispositivos))
+    fuentes = []
+    for origen in origenes:
+        opciones = {"fps_max": args.fps, "tiempo_real": args.tiempo_real}
+        if args.repetir and os.path.isdir(origen):
+            opciones["repetir"] = True
+        fuentes.append(abrir_fuente(origen, **opciones))
+
+    # cv2.imshow solo desde el hilo principal: los hilos dejan su último frame aquí
+    ultimos = None if args.sin_ventana else {}
+    detener = threading.Event()
+    estadisticas = {}
+
+    def _correr(fuente, dispositivo):
+        try:
+            estadisticas[fuente.nombre] = procesar_fuente(fuente, ultimos, detener, dispositivo)
+        except Exception as e:
+            print(f"[ERROR] Fuente {fuente.nombre}: {e}")
+
+    hilos = [
+        threading.Thread(target=_correr, args=(f, d), name=f"detector-{f.nombre}", daemon=True)
+        for f, d in zip(fuentes, dispositivos)
+    ]
+    print(f"[INFO] Reconocimiento facial en {len(fuentes)} fuente(s): {', '.join(f.nombre for f in fuentes)}")
+    print("[INFO] Presiona 'q' (o Ctrl+C) para salir.\n")
+    for hilo in hilos:
+        hilo.start()
+
+    try:
+        while any(h.is_alive() for h in hilos):
+            if ultimos is None:
+                time.sleep(0.2)
+                continue
+            for nombre, frame in list(ultimos.items()):
+                cv2.imshow(f"Reconocimiento Facial - {nombre}", frame)
+            if cv2.waitKey(30) & 0xFF == ord("q"):
+                print("[CIERRE] Reconocimiento detenido por el usuario.")
+                break
+    except KeyboardInterrupt:
+        print("[CIERRE] Reconocimiento detenido por el usuario.")
+
+    detener.set()
+    for fuente in fuentes:
+        fuente.detener()
+    for hilo in hilos:
+        hilo.join(timeout=5)
+    if ultimos is not None:
+        cv2.destroyAllWindows()
+    eventos.detener()
+
+    for nombre, estado in estadisticas.items():
+        print(f"[RESUMEN] {nombre}: {estado['procesados']} frames procesados, "
+              f"{estado['descartados']} descartados por atraso, {estado['decimados']} por límite de fps, "
+              f"{estado['fps_entregados']} fps")
@@ -1,14 +1,28 @@
 import face_recognition
 import os
+import sys
+import hashlib
+import time
+import argparse
 import numpy as np
-import pickle
+from concurrent.futures import ProcessPoolExecutor
 
-def entrenar_modelo(dataset_dir='dataset', output_file='modelo/known_encodings.pkl'):
-    known_encodings = []
-    known_ids = []
-    known_names = []
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recognition import store
+from recognition.cache_encodings import abrir_cache
 
-    for folder in os.listdir(dataset_dir):
+# Cómo se generan los encodings de codificar_imagen; si cambia, el caché no reutiliza nada
+VERSION_CODIFICADOR = (
+    f"dlib_face_recognition_resnet_model_v1|hog|upsample=1|jitters=1"
+    f"|face_recognition={getattr(face_recognition, '__version__', '?')}"
+)
+LOTE_CACHE = 500  # Encodings nuevos que se escriben al caché de una vez
+
+
+def listar_empleados(dataset_dir):
+    """Agrupa las carpetas del dataset por empleado: {emp_id: (nombre, [carpetas])}"""
+    empleados = {}
+    for folder in sorted(os.listdir(dataset_dir)):
         folder_path = os.path.join(dataset_dir, folder)
         if not os.path.isdir(folder_path):
             continue
@@ -20,26 +34,311 @@ def entrenar_modelo(dataset_dir='dataset', output_file='modelo/known_encodings.p
             print(f"Nombre de carpeta inválido: {folder}")
             continue
 
-        for image_name in os.listdir(folder_path):
-            image_path = os.path.join(folder_path, image_name)
-            image = face_recognition.load_image_file(image_path)
-            encodings = face_recognition.face_encodings(image)
-            if len(encodings) > 0:
-                known_encodings.append(encodings[0])
-                known_ids.append(empleado_id)
-                known_names.append(nombre.replace("_", " "))
-
-    data = {
-        "encodings": known_encodings,
-        "ids": known_ids,
-        "names": known_names
+        if empleado_id in empleados:
+            empleados[empleado_id][1].append(folder_path)
+        else:
+            empleados[empleado_id] = (nombre.replace("_", " "), [folder_path])
+    return empleados
+
+
+def firma_empleado(nombre, carpetas):
+    """Huella de las imágenes de un empleado a partir de nombre, tamaño y mtime de cada archivo."""
+    h = hashlib.sha1(nombre.encode("utf-8"))
+    for carpeta in carpetas:
+        for image_name in sorted(os.listdir(carpeta)):
+            st = os.stat(os.path.join(carpeta, image_name))
+            h.update(f"{carpeta}/{image_name}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def rutas_empleado(carpetas):
+    rutas = []
+    for carpeta in carpetas:
+        for image_name in sorted(os.listdir(carpeta)):
+            rutas.append(os.path.join(carpeta, image_name))
+    return rutas
+
+
+def codificar_imagen(image_path):
+    """Devuelve el primer encoding encontrado en la imagen, o None."""
+    image = face_recognition.load_image_file(image_path)
+    found = face_recognition.face_encodings(image)
+    if len(found) > 0:
+        return found[0]
+    return None
+
+
+def _claves_cache(cache, rutas):
+    """Clave de caché por ruta (hash del contenido); None si el archivo no se pudo leer."""
+    claves = []
+    for ruta in rutas:
+        try:
+            with open(ruta, "rb") as f:
+                claves.append(cache.clave(f.read()))
+        except OSError:
+            claves.append(None)
+    return claves
+
+
+def codificar_imagenes(rutas, workers=1, reportar_cada=50, progreso=None, usar_cache=True):
+    """
+    Generador de (ruta, encoding) en el mismo orden de `rutas`.
+    Con workers > 1 la decodificación y el encoding se reparten en un pool de
+    procesos; los resultados se entregan conforme van terminando (en orden), así
+    que la salida es idéntica a la del camino serial.
+    - progreso(fraccion, mensaje): callback opcional de avance.
+    - usar_cache: las imágenes ya codificadas antes (mismo contenido y misma
+      VERSION_CODIFICADOR) salen del caché persistente; solo se codifican las nuevas.
+    """
+    total = len(rutas)
+    inicio = time.perf_counter()
+
+    cache = abrir_cache(VERSION_CODIFICADOR) if usar_cache and total else None
+    claves = _claves_cache(cache, rutas) if cache is not None else [None] * total
+    guardados = cache.buscar(claves) if cache is not None else {}
+    faltantes = [ruta for ruta, clave in zip(rutas, claves) if clave not in guardados]
+
+    if workers > 1 and len(faltantes) > 1:
+        chunksize = max(1, min(16, len(faltantes) // (workers * 4)))
+        executor = ProcessPoolExecutor(max_workers=workers)
+        resultados = executor.map(codificar_imagen, faltantes, chunksize=chunksize)
+    else:
+        executor = None
+        resultados = map(codificar_imagen, faltantes)
+
+    nuevos = []
+    try:
+        for hechos, (ruta, clave) in enumerate(zip(rutas, claves), start=1):
+            if clave in guardados:
+                encoding = guardados[clave]
+            else:
+                encoding = next(resultados)
+                if cache is not None:
+                    nuevos.append((clave, encoding))
+                    if len(nuevos) >= LOTE_CACHE:
+                        cache.guardar(nuevos)
+                        nuevos = []
+            yield ruta, encoding
+            if hechos % reportar_cada == 0 or hechos == total:
+                transcurrido = time.perf_counter() - inicio
+                velocidad = hechos / transcurrido if transcurrido > 0 else 0.0
+                print(f"[PROGRESO] {hechos}/{total} imágenes ({velocidad:.1f} img/s)")
+                if progreso is not None:
+                    progreso(hechos / total, f"{hechos}/{total} imágenes ({velocidad:.1f} img/s)")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if cache is not None:
+            # ✅ Lo ya codificado se conserva aunque el entrenamiento se cancele a la mitad
+            cache.guardar(nuevos)
+            cache.cerrar()
+            print(
+                f"[CACHE] {cache.aciertos} encodings reutilizados y {cache.fallos} calculados "
+                f"(tasa de aciertos {cache.tasa_aciertos:.1%}, {cache.desalojados} entradas desalojadas)."
+            )
+
+
+def cargar_modelo(model_dir):
+    """Devuelve (data, manifiesto) de la versión publicada, o estructuras vacías si no hay modelo."""
+    data = store.cargar(model_dir, mmap=False)
+    if data is None:
+        return modelo_vacio(), {}
+    return data, store.cargar_manifiesto(model_dir, version=data["version"])
+
+
+def modelo_vacio():
+    return {
+        "encodings": np.empty((0, store.DIMENSION), dtype=np.float32),
+        "ids": np.empty(0, dtype=np.int64),
+        "names": [],
+    }
+
+
+def quitar_empleados(data, emp_ids):
+    """Filtra del modelo las muestras de los empleados indicados."""
+    conservar = ~np.isin(data["ids"], list(emp_ids))
+    return {
+        "encodings": data["encodings"][conservar],
+        "ids": data["ids"][conservar],
+        "names": [n for n, c in zip(data["names"], conservar) if c],
     }
 
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    with open(output_file, "wb") as f:
-        pickle.dump(data, f)
 
-    print(f"Modelo entrenado con {len(known_ids)} rostros. Guardado en: {output_file}")
+def entrenar_modelo(dataset_dir='dataset', model_dir=store.MODEL_DIR, incremental=False, workers=1,
+                    progreso=None, cancelado=None, guardar_bd=False, usar_cache=True):
+    """
+    Genera el modelo de encodings y devuelve la versión publicada.
+    - incremental=False: recodifica todo el dataset.
+    - incremental=True: solo recodifica empleados nuevos o con imágenes modificadas
+      y elimina los que ya no tienen carpeta; el resto se conserva tal cual.
+    - workers: número de procesos para codificar (1 = serial).
+    - progreso(fraccion, mensaje) / cancelado(): callbacks opcionales; si se cancela
+      no se publica nada y se devuelve None.
+    - guardar_bd: también escribe los encodings cambiados en ohem_embeddings.
+    - usar_cache: reutiliza los encodings de imágenes ya vistas (recognition/cache_encodings.py).
+    """
+    empleados = listar_empleados(dataset_dir)
+
+    if incremental:
+        data, manifiesto_anterior = cargar_modelo(model_dir)
+    else:
+        data, manifiesto_anterior = modelo_vacio(), {}
+
+    manifiesto = {}
+    pendientes = []
+    for empleado_id, (nombre, carpetas) in empleados.items():
+        firma = firma_empleado(nombre, carpetas)
+        manifiesto[str(empleado_id)] = {"nombre": nombre, "firma": firma}
+        if manifiesto_anterior.get(str(empleado_id), {}).get("firma") != firma:
+            pendientes.append(empleado_id)
+
+    eliminados = [int(e) for e in manifiesto_anterior if int(e) not in empleados]
+
+    if incremental and not pendientes and not eliminados and store.version_actual(model_dir) is not None:
+        print(f"Modelo sin cambios ({len(empleados)} empleados). Se conserva la versión {store.version_actual(model_dir)}.")
+        if guardar_bd:
+            sembrar_bd(data)  # La primera corrida con --bd puede no tener cambios que escribir
+        return store.version_actual(model_dir)
+
+    # 🧹 Quitamos lo viejo de los empleados que cambiaron o desaparecieron
+    data = quitar_empleados(data, pendientes + eliminados)
+
+    rutas = []
+    propietarios = []
+    for empleado_id in pendientes:
+        nombre, carpetas = empleados[empleado_id]
+        for ruta in rutas_empleado(carpetas):
+            rutas.append(ruta)
+            propietarios.append((empleado_id, nombre))
+
+    nuevos_encodings, nuevos_ids, nuevos_nombres = [], [], []
+    codificados = codificar_imagenes(rutas, workers=workers, progreso=progreso, usar_cache=usar_cache)
+    for (empleado_id, nombre), (_, encoding) in zip(propietarios, codificados):
+        if cancelado is not None and cancelado():
+            codificados.close()
+            print("⚠️ Entrenamiento cancelado, no se publicó ninguna versión.")
+            return None
+        if encoding is not None:
+            nuevos_encodings.append(encoding)
+            nuevos_ids.append(empleado_id)
+            nuevos_nombres.append(nombre)
+    codificados.close()  # zip no agota el generador: así se cierran ya el pool y el caché
+
+    version = store.publicar(
+        np.concatenate([data["encodings"], np.asarray(nuevos_encodings, dtype=np.float32).reshape(-1, store.DIMENSION)]),
+        np.concatenate([data["ids"], np.asarray(nuevos_ids, dtype=np.int64)]),
+        list(data["names"]) + nuevos_nombres,
+        manifiesto=manifiesto,
+        base_dir=model_dir,
+    )
+
+    print(
+        f"Modelo entrenado con {len(data['ids']) + len(nuevos_ids)} rostros "
+        f"({len(pendientes)} empleados codificados, {len(eliminados)} eliminados, "
+        f"{len(empleados) - len(pendientes)} sin cambios). Publicado como versión {version} en: {model_dir}/"
+    )
+
+    if guardar_bd:
+        por_empleado = {empleado_id: (empleados[empleado_id][0], []) for empleado_id in pendientes}
+        for empleado_id, encoding in zip(nuevos_ids, nuevos_encodings):
+            por_empleado[empleado_id][1].append(encoding)
+        guardar_en_bd(por_empleado, eliminados, completo=not incremental)
+
+    return version
+
+
+def agregar_empleados(nuevos, dataset_dir='dataset', model_dir=store.MODEL_DIR, guardar_bd=False):
+    """
+    Agrega (o reemplaza) empleados ya codificados sin recorrer el resto del dataset.
+    - nuevos: {emp_id: (nombre, [encodings])}
+    Su firma queda en el manifiesto, así el próximo entrenamiento incremental no los recodifica.
+    """
+    data, manifiesto = cargar_modelo(model_dir)
+    data = quitar_empleados(data, list(nuevos))
+    carpetas = listar_empleados(dataset_dir)
+
+    nuevos_encodings, nuevos_ids, nuevos_nombres = [], [], []
+    for empleado_id, (nombre, encodings) in nuevos.items():
+        if empleado_id in carpetas:
+            nombre = carpetas[empleado_id][0]
+            manifiesto[str(empleado_id)] = {"nombre": nombre, "firma": firma_empleado(*carpetas[empleado_id])}
+        for encoding in encodings:
+            nuevos_encodings.append(encoding)
+            nuevos_ids.append(empleado_id)
+            nuevos_nombres.append(nombre)
+
+    version = store.publicar(
+        np.concatenate([data["encodings"], np.asarray(nuevos_encodings, dtype=np.float32).reshape(-1, store.DIMENSION)]),
+        np.concatenate([data["ids"], np.asarray(nuevos_ids, dtype=np.int64)]),
+        list(data["names"]) + nuevos_nombres,
+        manifiesto=manifiesto,
+        base_dir=model_dir,
+    )
+    print(f"{len(nuevos)} empleados agregados al modelo ({len(nuevos_ids)} rostros). Versión {version}.")
+
+    if guardar_bd:
+        guardar_en_bd(nuevos)
+    return version
+
+
+def guardar_en_bd(por_empleado, eliminados=(), completo=False):
+    from database.db import SessionLocal
+    from recognition import embeddings_db
+
+    db = SessionLocal()
+    try:
+        filas = embeddings_db.guardar_embeddings(db, por_empleado, eliminados, completo=completo)
+    finally:
+        db.close()
+    print(f"[BD] {filas} encodings escritos en ohem_embeddings ({len(por_empleado)} empleados, {len(eliminados)} dados de baja).")
+
+
+def sembrar_bd(data):
+    """
+    Si ohem_embeddings no tiene tantos encodings activos como el modelo publicado,
+    la reescribe completa desde el modelo (sin recodificar nada).
+    """
+    from database.db import SessionLocal
+    from recognition import embeddings_db
+
+    db = SessionLocal()
+    try:
+        activos = embeddings_db.contar_activos(db)
+    finally:
+        db.close()
+    if activos == len(data["ids"]):
+        return
+    por_empleado = {}
+    for empleado_id, nombre, encoding in zip(data["ids"].tolist(), data["names"], data["encodings"]):
+        por_empleado.setdefault(empleado_id, (nombre, []))[1].append(encoding)
+    guardar_en_bd(por_empleado, completo=True)
+
+
+def eliminar_empleado(emp_id, model_dir=store.MODEL_DIR, guardar_bd=False):
+    """Quita los encodings de un solo empleado sin tocar los de los demás."""
+    data, manifiesto = cargar_modelo(model_dir)
+    antes = len(data["ids"])
+    data = quitar_empleados(data, [emp_id])
+    manifiesto.pop(str(emp_id), None)
+    version = store.publicar(data["encodings"], data["ids"], data["names"], manifiesto=manifiesto, base_dir=model_dir)
+    print(f"Empleado {emp_id}: {antes - len(data['ids'])} rostros eliminados del modelo (versión {version}).")
+    if guardar_bd:
+        guardar_en_bd({}, [emp_id])
+    return version
+
 
 if __name__ == "__main__":
-    entrenar_modelo()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Entrenamiento del modelo de reconocimiento facial")
+    parser.add_argument("--incremental", action="store_true", help="Solo codifica empleados nuevos o modificados")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para codificar (0 = todos los núcleos)")
+    parser.add_argument("--bd", action="store_true", help="Escribe también los encodings en ohem_embeddings")
+    parser.add_argument("--sin-cache", action="store_true", help="Recodifica todo sin usar el caché de encodings")
+    parser.add_argument("--eliminar", type=int, metavar="EMP_ID", help="Quita los encodings de un empleado")
+    args = parser.parse_args()
+
+    if args.eliminar is not None:
+        eliminar_empleado(args.eliminar, guardar_bd=args.bd)
+    else:
+        workers = args.workers if args.workers > 0 else os.cpu_count()
+        entrenar_modelo(incremental=args.incremental, workers=workers, guardar_bd=args.bd,
+                        usar_cache=not args.sin_cache)
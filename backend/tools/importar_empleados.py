@@ -0,0 +1,279 @@
+"""
+Importación masiva de empleados: un manifiesto (CSV o JSON) más un zip con las fotos.
+
+Columnas del manifiesto: firstName, lastName, sex (M/F), type_emp (E/V), jobTitle,
+dept, imagen y opcionalmente mobile y email. `imagen` es el nombre del archivo
+dentro del zip; se pueden indicar varias separadas por ';'.
+
+Flujo:
+  1. Valida cada fila (campos y que sus imágenes existan en el zip).
+  2. Inserta los empleados válidos en transacciones por lote (PENDING).
+  3. Extrae las fotos a dataset/<empID>_<nombre>/ y las codifica en paralelo.
+  4. Publica los encodings en una sola versión del modelo y marca como
+     REGISTERED, con un UPDATE por lote, a quienes se les encontró rostro.
+Devuelve un reporte con el resultado de cada fila.
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import sys
+import zipfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import update
+from database.db import SessionLocal
+from database import blob_store
+from models.employee import Employee
+from models.biometric_status import BiometricStatus  # noqa: F401 (FK de ohem.biometric_status)
+from recognition import store
+from tools.entrenar_modelo import codificar_imagenes, agregar_empleados
+
+FILAS_POR_LOTE = 200
+OBLIGATORIOS = ("firstName", "lastName", "sex", "type_emp", "jobTitle", "dept", "imagen")
+PENDING, REGISTERED = 1, 2
+
+
+def leer_manifiesto(contenido, nombre_archivo):
+    """Convierte el manifiesto (bytes) en una lista de dicts. Lanza ValueError si el formato no es válido."""
+    texto = contenido.decode("utf-8-sig")
+    if nombre_archivo.lower().endswith(".json"):
+        filas = json.loads(texto)
+        if not isinstance(filas, list) or not all(isinstance(f, dict) for f in filas):
+            raise ValueError("El manifiesto JSON debe ser una lista de objetos.")
+        return filas
+    if nombre_archivo.lower().endswith(".csv"):
+        lector = csv.DictReader(io.StringIO(texto))
+        faltantes = [c for c in OBLIGATORIOS if c not in (lector.fieldnames or [])]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+        return list(lector)
+    raise ValueError("El manifiesto debe ser .csv o .json")
+
+
+def _validar(fila, archivos_zip):
+    """Devuelve (datos para Employee, [imágenes]) o lanza ValueError con el motivo."""
+    faltantes = [c for c in OBLIGATORIOS if not str(fila.get(c) or "").strip()]
+    if faltantes:
+        raise ValueError(f"Campos vacíos: {', '.join(faltantes)}")
+
+    sexo = str(fila["sex"]).strip().upper()
+    tipo = str(fila["type_emp"]).strip().upper()
+    if sexo not in ("M", "F"):
+        raise ValueError("sex debe ser M o F")
+    if tipo not in ("E", "V"):
+        raise ValueError("type_emp debe ser E o V")
+    try:
+        job_title, dept = int(fila["jobTitle"]), int(fila["dept"])
+    except (TypeError, ValueError):
+        raise ValueError("jobTitle y dept deben ser numéricos")
+
+    imagenes = [i.strip() for i in str(fila["imagen"]).split(";") if i.strip()]
+    no_encontradas = [i for i in imagenes if i not in archivos_zip]
+    if no_encontradas:
+        raise ValueError(f"Imágenes no encontradas en el zip: {', '.join(no_encontradas)}")
+
+    datos = {
+        "firstName": str(fila["firstName"]).strip(),
+        "lastName": str(fila["lastName"]).strip(),
+        "sex": sexo,
+        "type_emp": tipo,
+        "jobTitle": job_title,
+        "dept": dept,
+        "mobile": (str(fila.get("mobile") or "").strip() or None),
+        "email": (str(fila.get("email") or "").strip() or None),
+    }
+    return datos, imagenes
+
+
+def _carpeta_empleado(emp_id, nombre):
+    nombre = "".join(c for c in nombre if c not in '/\\:*?"<>|')
+    return f"{emp_id}_{nombre.replace(' ', '_')}"
+
+
+def _en_lotes(elementos, tamano):
+    for i in range(0, len(elementos), tamano):
+        yield elementos[i:i + tamano]
+
+
+def importar_empleados(filas, ruta_zip, dataset_dir="dataset", model_dir=store.MODEL_DIR, workers=1,
+                       guardar_bd=False, progreso=None, cancelado=None):
+    """
+    Importa las filas del manifiesto y devuelve el reporte.
+    - progreso(fraccion, mensaje) / cancelado(): callbacks opcionales.
+    """
+    def avisar(fraccion, mensaje):
+        if progreso is not None:
+            progreso(fraccion, mensaje)
+
+    def fue_cancelado():
+        return cancelado is not None and cancelado()
+
+    reporte = [{"fila": i, "estado": "pendiente"} for i in range(1, len(filas) + 1)]
+
+    with zipfile.ZipFile(ruta_zip) as zf:
+        archivos_zip = {info.filename for info in zf.infolist() if not info.is_dir()}
+
+        # 1️⃣ Validación
+        validas = []
+        for i, fila in enumerate(filas):
+            try:
+                validas.append((i, *_validar(fila, archivos_zip)))
+            except ValueError as e:
+                reporte[i].update(estado="error", detalle=str(e))
+        avisar(0.05, f"{len(validas)}/{len(filas)} filas válidas")
+
+        # 2️⃣ Inserción por lotes: una transacción por lote en lugar de una por empleado
+        insertados = []  # (índice, empID, nombre, imágenes)
+        db = SessionLocal()
+        try:
+            for lote in _en_lotes(validas, FILAS_POR_LOTE):
+                if fue_cancelado():
+                    break
+                ahora = datetime.datetime.now()
+                empleados, aceptadas = [], []
+                for i, datos, imagenes in lote:
+                    # La primera foto queda como imagen biométrica del empleado
+                    try:
+                        hash_imagen = blob_store.guardar(zf.read(imagenes[0]))
+                    except Exception as e:  # Zip dañado, sin espacio, etc.: solo falla esta fila
+                        reporte[i].update(estado="error", detalle=f"No se pudo leer {imagenes[0]}: {e}")
+                        continue
+                    aceptadas.append((i, datos, imagenes))
+                    empleados.append(Employee(
+                        **datos,
+                        CreateDate=ahora,
+                        UpdateDate=ahora,
+                        BiometricHash=hash_imagen,
+                        Active="Y",
+                        biometric_status=PENDING,
+                    ))
+                lote = aceptadas
+                if not lote:
+                    continue
+                try:
+                    db.add_all(empleados)
+                    db.flush()
+                    emp_ids = [empleado.empID for empleado in empleados]  # Antes del commit, que expira los objetos
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    for i, _, _ in lote:
+                        reporte[i].update(estado="error", detalle=f"Error al insertar el lote: {e}")
+                    continue
+
+                for (i, datos, imagenes), emp_id in zip(lote, emp_ids):
+                    nombre = f"{datos['firstName']} {datos['lastName']}"
+                    insertados.append((i, emp_id, nombre, imagenes))
+                    reporte[i].update(estado="insertado", empID=emp_id)
+                avisar(0.05 + 0.15 * len(insertados) / max(1, len(validas)), f"{len(insertados)} empleados insertados")
+        finally:
+            db.close()
+
+        # 3️⃣ Fotos al dataset
+        rutas, propietarios = [], []
+        for i, emp_id, nombre, imagenes in insertados:
+            # El nombre de archivo sale de la carpeta ya saneada, nunca del CSV tal cual
+            nombre_carpeta = _carpeta_empleado(emp_id, nombre)
+            carpeta = os.path.join(dataset_dir, nombre_carpeta)
+            rutas_fila = []
+            try:
+                os.makedirs(carpeta, exist_ok=True)
+                for n, imagen in enumerate(imagenes):
+                    extension = os.path.splitext(imagen)[1].lower()
+                    if not extension[1:].isalnum():
+                        extension = ".jpg"
+                    ruta = os.path.join(carpeta, f"{nombre_carpeta}_{n}{extension}")
+                    with zf.open(imagen) as origen, open(ruta, "wb") as destino:
+                        shutil.copyfileobj(origen, destino)
+                    rutas_fila.append(ruta)
+            except Exception as e:
+                # El empleado ya quedó insertado como PENDING; se reporta y se sigue con el resto
+                reporte[i].update(estado="error", detalle=f"No se pudieron extraer las fotos: {e}")
+                shutil.rmtree(carpeta, ignore_errors=True)
+                continue
+            rutas.extend(rutas_fila)
+            propietarios.extend((i, emp_id, nombre) for _ in rutas_fila)
+
+    if fue_cancelado():
+        print("⚠️ Importación cancelada antes de codificar.")
+        return _resumen(reporte, None)
+
+    # 4️⃣ Encodings en paralelo (mismo pool que el entrenamiento)
+    encontrados = {}
+    codificados = codificar_imagenes(rutas, workers=workers,
+                                     progreso=lambda p, msg: avisar(0.2 + 0.7 * p, msg))
+    for (i, emp_id, nombre), (_, encoding) in zip(propietarios, codificados):
+        if fue_cancelado():
+            codificados.close()
+            print("⚠️ Importación cancelada, no se publicó ninguna versión.")
+            return _resumen(reporte, None)
+        if encoding is not None:
+            encontrados.setdefault(emp_id, (i, nombre, []))[2].append(encoding)
+    codificados.close()  # zip no agota el generador: así se cierran ya el pool y el caché
+
+    for i, emp_id, nombre, _ in insertados:
+        if reporte[i]["estado"] == "error":
+            continue
+        if emp_id in encontrados:
+            reporte[i].update(estado="registrado", rostros=len(encontrados[emp_id][2]))
+        else:
+            # Sin rostro no se agrega al dataset; el empleado queda PENDING
+            reporte[i].update(estado="sin_rostro", detalle="No se detectó ningún rostro en las imágenes.")
+            shutil.rmtree(os.path.join(dataset_dir, _carpeta_empleado(emp_id, nombre)), ignore_errors=True)
+
+    version = None
+    if encontrados:
+        avisar(0.9, "Publicando modelo")
+        version = agregar_empleados(
+            {emp_id: (nombre, encodings) for emp_id, (_, nombre, encodings) in encontrados.items()},
+            dataset_dir=dataset_dir, model_dir=model_dir, guardar_bd=guardar_bd,
+        )
+
+        # 5️⃣ biometric_status en bloque
+        db = SessionLocal()
+        try:
+            ahora = datetime.datetime.now()
+            for lote in _en_lotes(list(encontrados), FILAS_POR_LOTE):
+                db.execute(
+                    update(Employee)
+                    .where(Employee.empID.in_(lote))
+                    .values(biometric_status=REGISTERED, UpdateDate=ahora)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    resumen = _resumen(reporte, version)
+    print(f"✅ Importación completada: {resumen['registrados']} registrados, "
+          f"{resumen['sin_rostro']} sin rostro, {resumen['errores']} con error.")
+    return resumen
+
+
+def _resumen(reporte, version):
+    conteo = lambda estado: sum(1 for r in reporte if r["estado"] == estado)
+    return {
+        "total": len(reporte),
+        "registrados": conteo("registrado"),
+        "sin_rostro": conteo("sin_rostro"),
+        "errores": conteo("error"),
+        "version_modelo": version,
+        "filas": reporte,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importación masiva de empleados con sus fotos")
+    parser.add_argument("manifiesto", help="Archivo .csv o .json")
+    parser.add_argument("imagenes", help="Zip con las fotos")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para codificar (0 = todos los núcleos)")
+    parser.add_argument("--bd", action="store_true", help="Escribe también los encodings en ohem_embeddings")
+    args = parser.parse_args()
+
+    with open(args.manifiesto, "rb") as f:
+        filas = leer_manifiesto(f.read(), args.manifiesto)
+    resultado = importar_empleados(filas, args.imagenes, workers=args.workers or os.cpu_count(), guardar_bd=args.bd)
+    print(json.dumps({k: v for k, v in resultado.items() if k != "filas"}, indent=2))
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import select, update
+from database.db import SessionLocal
+from database import blob_store
+from models.employee import Employee
+
+
+def migrar_biometria(lote=100):
+    """Mueve las imágenes de ohem.BiometricImage al almacén en disco, de a `lote` filas."""
+    db = SessionLocal()
+    migrados = 0
+    try:
+        while True:
+            filas = db.execute(
+                select(Employee.empID, Employee.BiometricImage)
+                .where(Employee.BiometricImage.isnot(None))
+                .limit(lote)
+            ).all()
+            if not filas:
+                break
+
+            for emp_id, imagen in filas:
+                hash_imagen = blob_store.guardar(imagen)
+                db.execute(
+                    update(Employee)
+                    .where(Employee.empID == emp_id)
+                    .values(BiometricHash=hash_imagen, BiometricImage=None)
+                )
+            db.commit()
+            migrados += len(filas)
+            print(f"[PROGRESO] {migrados} imágenes migradas")
+    finally:
+        db.close()
+
+    print(f"✅ Migración completada: {migrados} imágenes movidas a {blob_store.BIOMETRIA_DIR}/")
+
+
+if __name__ == "__main__":
+    migrar_biometria()
@@ -16,6 +16,7 @@ function Empleado() {
   const [puestos, setPuestos] = useState([]);
   const [departamentos, setDepartamentos] = useState([]);
   const [rostroCapturado, setRostroCapturado] = useState(false);
+  const [sesionId, setSesionId] = useState(null); // Sesión de enrolamiento de esta estación
   const [estadoRegistro, setEstadoRegistro] = useState('Pending');
   const [activo, setActivo] = useState('Y');
 
@@ -47,16 +48,33 @@ function Empleado() {
     setForm({ ...form, [name]: value });
   };
 
+  // La captura y el entrenamiento corren en segundo plano; consultamos su estado
+  const esperarTrabajo = async (jobId) => {
+    while (true) {
+      const res = await axios.get(`http://localhost:8000/trabajos/${jobId}`);
+      if (['completado', 'error', 'cancelado'].includes(res.data.estado)) {
+        return res.data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const capturarRostro = async () => {
     if (!form.firstName || !form.lastName) {
       alert("Primero llena el Nombre y Apellido del empleado.");
       return;
     }
     try {
-      await axios.post('http://localhost:8000/empleados/capturar-rostro', {
+      const res = await axios.post('http://localhost:8000/empleados/capturar-rostro', {
         emp_id: '0', // Seguimos enviando 0 ya que es nuevo
         nombre: form.firstName + "_" + form.lastName,
+        sesion_id: sesionId, // null la primera vez: el backend abre una sesión nueva
       });
+      setSesionId(res.data.sesion_id);
+      const trabajo = await esperarTrabajo(res.data.job_id);
+      if (trabajo.estado !== 'completado') {
+        throw new Error(trabajo.error || `Trabajo ${trabajo.estado}`);
+      }
       setRostroCapturado(true);
       setEstadoRegistro('Registered');
       alert('✅ Rostro capturado y modelo entrenado. Ahora puedes registrar el empleado.');
@@ -77,6 +95,7 @@ function Empleado() {
     for (const key in form) {
       formData.append(key, form[key]);
     }
+    formData.append('sesion_id', sesionId);
 
     try {
       const res = await axios.post('http://localhost:8000/empleados/', formData, {
@@ -97,6 +116,7 @@ function Empleado() {
         email: '',
       });
       setRostroCapturado(false);
+      setSesionId(null);
       setEstadoRegistro('Pending');
       setActivo('Y');
     } catch (error) {